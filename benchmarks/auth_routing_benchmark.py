@@ -0,0 +1,171 @@
+"""
+Per-request overhead of deciding the authentication requirement of a request: the previous
+Authenticator.should_skip_authentication (regex, split of the path and getattr of the method name) with its
+role check, against the lookup of the RouteAuth table built by the RouteLoader, on routes shaped like the ones
+of the API. Checks both give the same decisions for every role.
+
+No database is needed, the decisions are measured on requests routed by falcon.
+Usage: python -m benchmarks.auth_routing_benchmark [requests]
+"""
+import re
+import sys
+import time
+
+import falcon
+from falcon import testing
+
+from engine.RouteLoader import RouteLoader
+
+
+def no_authorization_needed(func):
+    # Decorators.no_authorization_needed, core.Hooks loads the models from the database
+    func.skip_auth = True
+    return func
+
+
+ADMIN, USER, IMAGES = 1, 2, 3
+ROLE_ACCESS = {ADMIN: {}, USER: {}, IMAGES: {"BenchFileController"}}
+
+
+class BenchSessionController:
+    def on_get(self, req, resp):
+        pass
+
+    @no_authorization_needed
+    def on_post_login(self, req, resp):
+        pass
+
+    def on_post_logout(self, req, resp):
+        pass
+
+
+class BenchUserController:
+    def on_get(self, req, resp, id: int = None):
+        pass
+
+    @no_authorization_needed
+    def on_post(self, req, resp):
+        pass
+
+
+class BenchPasswordRecoveryController:
+    @no_authorization_needed
+    def on_post(self, req, resp, action: str):
+        pass
+
+
+class BenchFileController:
+    def on_get(self, req, resp, id: int = None):
+        pass
+
+    def on_get_base64(self, req, resp, id: int = None):
+        pass
+
+
+class BenchHealthCheckController:
+    skip_auth = True
+
+    def on_get(self, req, resp, action: str):
+        pass
+
+
+ROUTES = [
+    (BenchSessionController, "/v1/sessions", None),
+    (BenchSessionController, "/v1/sessions/login", "login"),
+    (BenchSessionController, "/v1/sessions/logout", "logout"),
+    (BenchUserController, "/v1/users", None),
+    (BenchUserController, "/v1/users/{id:int}", None),
+    (BenchPasswordRecoveryController, "/v1/password-recovery/{action}", None),
+    (BenchFileController, "/v1/files/local/{id:int}", None),
+    (BenchFileController, "/v1/files/local/base64/{id:int}", "base64"),
+    (BenchHealthCheckController, "/v1/health-check/{action}", None),
+]
+
+REQUESTS = [
+    ("GET", "/v1/sessions"),
+    ("POST", "/v1/sessions/login"),
+    ("POST", "/v1/sessions/logout"),
+    ("POST", "/v1/users"),
+    ("GET", "/v1/users/25"),
+    ("POST", "/v1/users/25"),
+    ("POST", "/v1/password-recovery/request"),
+    ("GET", "/v1/files/local/7"),
+    ("GET", "/v1/files/local/base64/7"),
+    ("GET", "/v1/health-check/ping"),
+]
+
+
+def legacy_decision(req, resource, params, role_id):
+    """ Authenticator.should_skip_authentication and the role check before the RouteAuth table """
+    if getattr(resource, 'skip_auth', False):
+        return True, False
+
+    url_parts = req.path.split('/')
+    version_pattern = re.compile(r'^v\d+$')
+    version_index = next((i for i, part in enumerate(url_parts) if version_pattern.match(part)), None)
+    if version_index is not None:
+        url_parts = url_parts[version_index + 1:]
+    if params:
+        for value in params.values():
+            if value in url_parts:
+                url_parts.remove(value)
+    method_name = 'on_' + req.method.lower()
+    suffix = url_parts[-1] if len(url_parts) > 1 else None
+    if suffix:
+        method_name += '_' + suffix.replace('-', '_')
+    if hasattr(resource, method_name) and getattr(getattr(resource, method_name), 'skip_auth', False):
+        return True, False
+
+    forbidden = False
+    if role_accesses := ROLE_ACCESS.get(role_id):
+        forbidden = resource.__class__.__name__ not in role_accesses
+    return False, forbidden
+
+
+def table_decision(auth_routes, req, resource, params, role_id):
+    route_auth = auth_routes[(req.uri_template, req.method)]
+    if route_auth.skip_auth:
+        return True, False
+    return False, role_id in route_auth.forbidden_roles
+
+
+def routed_requests(app):
+    routed = []
+    for method, path in REQUESTS:
+        resource, _, params, uri_template = app._router.find(path)
+        req = testing.create_req(method=method, path=path)
+        req.uri_template = uri_template
+        routed.append((req, resource, params))
+    return routed
+
+
+def measure(decide, routed, count):
+    start = time.perf_counter()
+    for number in range(count):
+        req, resource, params = routed[number % len(routed)]
+        decide(req, resource, params, IMAGES)
+    return (time.perf_counter() - start) * 1e9 / count
+
+
+def main(count=200_000):
+    app = falcon.App()
+    route_loader = RouteLoader(app, ROLE_ACCESS)
+    for cls, route, suffix in ROUTES:
+        route_loader(route, suffix=suffix)(cls)
+    routed = routed_requests(app)
+
+    def table(req, resource, params, role_id):
+        return table_decision(route_loader.auth_routes, req, resource, params, role_id)
+
+    for req, resource, params in routed:
+        for role_id in ROLE_ACCESS:
+            assert legacy_decision(req, resource, params, role_id) == table(req, resource, params, role_id), req.path
+
+    legacy_ns = measure(legacy_decision, routed, count)
+    table_ns = measure(table, routed, count)
+    print(f"legacy    {legacy_ns:>8.0f} ns/request")
+    print(f"table     {table_ns:>8.0f} ns/request   {legacy_ns / table_ns:.1f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,49 @@
+"""
+Cost of getting an S3 handler, as FileManager did before (a new boto3 Session, resource and Bucket per call)
+against the clients of AwsClientRegistry, cold (first call) and warm, and the latency of a head_bucket against moto.
+
+Usage: python -m benchmarks.aws_client_benchmark [calls]
+"""
+import statistics
+import sys
+import time
+
+import boto3
+from moto import mock_aws
+
+from core.classes.aws.AwsClientRegistry import AwsClientRegistry
+from core.classes.aws.S3Handler import S3Handler
+
+BUCKET = "bench-bucket"
+REGION = "us-east-1"
+
+
+def legacy_handler():
+    session = boto3.Session()
+    return session.resource("s3", region_name=REGION).Bucket(BUCKET)
+
+
+def measure(function, calls):
+    times = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main(calls=50):
+    with mock_aws():
+        boto3.client("s3", region_name=REGION).create_bucket(Bucket=BUCKET)
+
+        legacy = measure(lambda: legacy_handler().meta.client.head_bucket(Bucket=BUCKET), calls)
+        registry = measure(lambda: S3Handler(BUCKET, REGION).client.head_bucket(Bucket=BUCKET), calls)
+
+        print(f"legacy     first: {legacy[0]:>8.2f} ms   median: {statistics.median(legacy):>8.2f} ms")
+        print(f"registry   first: {registry[0]:>8.2f} ms   median: {statistics.median(registry):>8.2f} ms")
+        for key, stats in AwsClientRegistry.get_instance().stats().items():
+            print(f"{key:<30} {stats}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,64 @@
+"""
+Peak memory and time of a base64 file listing: the previous FileLocalController.on_get_base64 (every file read,
+encoded and the whole list dumped to one string) against FileResponse.base64_json, which encodes one chunk at a time.
+The streamed response is checked to be the same JSON.
+
+Usage: python -m benchmarks.base64_response_benchmark [files] [size_mb]
+"""
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from core.classes.FileResponse import FileResponse
+
+
+def legacy_response(paths):
+    data = []
+    for index, path in enumerate(paths):
+        with open(path, "rb") as file_object:
+            file_content = base64.b64encode(file_object.read())
+            data.append({"id": index, "name": os.path.basename(path), "base64": str(file_content)[2:-1]})
+    return json.dumps(data, ensure_ascii=False)
+
+
+def streamed_response(paths, output):
+    items = [({"id": index, "name": os.path.basename(path)}, lambda path=path: open(path, "rb")) for index, path in enumerate(paths)]
+    for chunk in FileResponse.base64_json(items, {"per_page": len(paths), "next_cursor": None}):
+        output.write(chunk)
+
+
+def measure(function, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak, elapsed
+
+
+def main(files=20, size_mb=5):
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for number in range(files):
+            path = os.path.join(directory, f"file-{number}")
+            with open(path, "wb") as file:
+                file.write(os.urandom(size_mb * 1_000_000 + number))
+            paths.append(path)
+
+        legacy, peak, elapsed = measure(legacy_response, paths)
+        print(f"legacy     {files} x {size_mb} MB   peak: {peak / 1_000_000:>8.1f} MB   {elapsed:.2f}s")
+
+        with tempfile.TemporaryFile() as output:
+            _, peak, elapsed = measure(streamed_response, paths, output)
+            print(f"streamed   {files} x {size_mb} MB   peak: {peak / 1_000_000:>8.1f} MB   {elapsed:.2f}s")
+            output.seek(0)
+            assert json.load(output)["data"] == json.loads(legacy)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
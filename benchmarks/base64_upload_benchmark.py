@@ -0,0 +1,84 @@
+"""
+Peak memory and time of a base64 upload: the previous FileController.on_post_base64 (the body read and parsed
+with json.loads, then decoded and sniffed) against Base64JsonReader written to a StagedUpload as it is received,
+and how much of an upload larger than the max file size is read before it is rejected.
+
+Usage: python -m benchmarks.base64_upload_benchmark [size_mb]
+"""
+import base64
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import filetype
+
+from core.classes.Base64JsonReader import Base64JsonReader
+from core.classes.StagedUpload import FileSizeGreaterThanAllowed, StagedUpload
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR"
+
+
+class CountingStream(io.BytesIO):
+    """ The body of the request, counting the bytes read from it """
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def legacy_upload(stream, directory, max_file_size):
+    data = json.loads(stream.read())
+    base64_info = data.get("base64")
+    if (len(base64_info) * 3) / 4 - base64_info.count("=", -1, -5) > max_file_size:
+        raise FileSizeGreaterThanAllowed(max_file_size)
+    content = base64.b64decode(base64_info)
+    filetype.guess(content)
+    with tempfile.NamedTemporaryFile(dir=directory) as file:
+        file.write(content)
+
+
+def streamed_upload(stream, directory, max_file_size):
+    reader = Base64JsonReader(stream, check_head=lambda head: filetype.guess(head))
+    with StagedUpload.from_stream(reader, directory, max_file_size):
+        pass
+
+
+def measure(function, body, directory, max_file_size):
+    stream = CountingStream(body)
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        function(stream, directory, max_file_size)
+        result = "stored"
+    except FileSizeGreaterThanAllowed:
+        result = "rejected"
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak, elapsed, stream.bytes_read
+
+
+def main(size_mb=20):
+    content = PNG_HEADER + os.urandom(size_mb * 1_000_000)
+    body = json.dumps({"file_name": "image.png", "base64": base64.b64encode(content).decode()}).encode()
+    with tempfile.TemporaryDirectory() as directory:
+        for max_file_size in (2 * len(content), len(content) // 4):
+            for name, function in (("legacy", legacy_upload), ("streamed", streamed_upload)):
+                result, peak, elapsed, bytes_read = measure(function, body, directory, max_file_size)
+                print(
+                    f"{name:<9} {size_mb} MB {result:<9} peak: {peak / 1_000_000:>7.1f} MB"
+                    f"   body read: {bytes_read / 1_000_000:>6.1f} MB   {elapsed:.2f}s"
+                )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
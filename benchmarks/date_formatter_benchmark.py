@@ -0,0 +1,74 @@
+"""
+Microbenchmark of Utils.date_formatter against the previous pytz implementation.
+Checks both outputs are identical on the same timestamps.
+
+Usage: python -m benchmarks.date_formatter_benchmark [timestamps] [distinct]
+"""
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import pytz
+
+from core.Utils import Utils
+
+
+def legacy_date_formatter(value):
+    """ The implementation of Utils.date_formatter before the zoneinfo fast path """
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+
+    today = datetime.now(pytz.timezone("America/Mexico_City"))
+    if (
+        isinstance(value, datetime)
+        and value.hour == 0
+        and value.minute == 0
+        and value.second == 0
+        and value.day == today.day
+    ):
+        return value.isoformat(timespec="seconds")
+
+    if not isinstance(value, datetime):
+        return value
+
+    if not value.tzinfo:
+        value = pytz.utc.localize(value)
+    return value.astimezone(pytz.timezone("America/Mexico_City")).isoformat(timespec="seconds")
+
+
+def build_values(count: int, distinct: int) -> list:
+    """
+    Naive UTC-0 datetimes like the ones read from the database, plus some aware datetimes,
+    dates and midnights. *distinct* sets how many different timestamps there are.
+    """
+    random.seed(10)
+    start = datetime(2020, 1, 1)
+    pool = [start + timedelta(seconds=random.randint(0, 5 * 365 * 24 * 3600), microseconds=random.randint(0, 999999)) for _ in range(distinct)]
+    pool += [value.replace(tzinfo=timezone.utc) for value in pool[: distinct // 10]]
+    pool += [value.date() for value in pool[: distinct // 10]]
+    today = datetime.now()
+    pool += [today.replace(hour=0, minute=0, second=0, microsecond=0), date.today()]
+    return [random.choice(pool) for _ in range(count)]
+
+
+def measure(function, values):
+    start = time.perf_counter()
+    output = [function(value) for value in values]
+    return output, time.perf_counter() - start
+
+
+def main(count=100_000, distinct=2_000):
+    for label, distinct_values in (("repeated timestamps", distinct), ("unique timestamps", count)):
+        values = build_values(count, distinct_values)
+        legacy_output, legacy_time = measure(legacy_date_formatter, values)
+        new_output, new_time = measure(Utils.date_formatter, values)
+        assert legacy_output == new_output, f"Outputs differ with {label}"
+        print(
+            f"{label:<20} {count} values  legacy: {legacy_time * 1000:8.1f} ms   "
+            f"fast path: {new_time * 1000:8.1f} ms   x{legacy_time / new_time:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
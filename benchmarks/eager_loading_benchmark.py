@@ -0,0 +1,66 @@
+"""
+Query count harness of the recursive serialization: serializes pages of users with their role and
+devices loading the relationships lazily and with Serializer.load_options, checks both outputs are
+equal and that the eager version runs a constant number of queries whatever the page size.
+
+Runs on an in-memory SQLite database.
+Usage: python -m benchmarks.eager_loading_benchmark [rows]
+"""
+import sys
+import time
+
+from sqlalchemy import create_engine
+
+from benchmarks.serializer_benchmark import BenchBase, BenchUser, build_rows
+from core.database import count_queries
+from core.database import db_session as DB
+from core.Serializer import Serializer
+from core.Utils import Utils
+
+SETTINGS = {"recursive": True, "recursiveLimit": 3}
+# One query for the users with their role joined, one SELECT ... IN for the devices
+EAGER_MAX_QUERIES = 2
+
+
+def seed(count: int):
+    rows = build_rows(count)
+    DB.add_all(rows)
+    DB.commit()
+    DB.expunge_all()
+
+
+def serialize_page(per_page: int, options=None):
+    rows = BenchUser.get_all(order_by=BenchUser.id, limit=per_page, options=options)
+    return Utils.serialize_model(rows, **SETTINGS)
+
+
+def run(per_page: int, eager: bool):
+    DB.expunge_all()
+    options = Serializer.load_options(BenchUser, **SETTINGS) if eager else None
+    start = time.perf_counter()
+    with count_queries(max_queries=EAGER_MAX_QUERIES if eager else None) as stats:
+        output = serialize_page(per_page, options)
+    return output, stats.count, (time.perf_counter() - start) * 1000
+
+
+def main(count=500):
+    engine = create_engine("sqlite://")
+    DB.configure(bind=engine)
+    BenchBase.metadata.create_all(engine)
+    seed(count)
+
+    for per_page in (10, 50, count):
+        lazy_output, lazy_queries, lazy_ms = run(per_page, eager=False)
+        eager_output, eager_queries, eager_ms = run(per_page, eager=True)
+        assert lazy_output == eager_output, f"Outputs differ for {per_page} rows"
+        print(
+            f"{per_page:>5} rows   lazy: {lazy_queries:>4} queries {lazy_ms:>8.1f} ms"
+            f"   eager: {eager_queries:>2} queries {eager_ms:>8.1f} ms"
+        )
+
+    DB.remove()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,96 @@
+"""
+Download throughput of a large local file served by gevent.pywsgi, as FileLocalController did before
+(the file object iterated by falcon in 8KiB blocks) against FileResponse with the FileWrapper of run.py.
+Also checks the 206 and 304 answers.
+
+Usage: python -m benchmarks.file_download_benchmark [size_mb] [downloads]
+"""
+import http.client
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import falcon
+from gevent.pywsgi import WSGIServer
+
+from core.classes.FileResponse import FileResponse, FileWrapper
+
+ETAG = "0123456789abcdef"
+
+
+class LegacyResource:
+    def __init__(self, path):
+        self.path = path
+
+    def on_get(self, req, resp):
+        resp.stream = open(self.path, "rb")
+        resp.content_length = os.stat(self.path).st_size
+        resp.content_type = "video/mp4"
+
+
+class FileResource(LegacyResource):
+    def on_get(self, req, resp):
+        FileResponse.send(req, resp, self.path, ETAG, "video/mp4", "video.mp4")
+
+
+def start_server(app) -> int:
+    ready = threading.Event()
+    address = {}
+
+    def serve():
+        server = WSGIServer(("127.0.0.1", 0), app, log=None)
+        server.start()
+        address["port"] = server.server_port
+        ready.set()
+        server.serve_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+    return address["port"]
+
+
+def download(port: int, headers: dict = None):
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    connection.request("GET", "/file", headers=headers or {})
+    response = connection.getresponse()
+    size = 0
+    while chunk := response.read(1024 * 1024):
+        size += len(chunk)
+    connection.close()
+    return response, size
+
+
+def main(size_mb=200, downloads=5):
+    with tempfile.NamedTemporaryFile() as file:
+        block = os.urandom(1024 * 1024)
+        for _ in range(size_mb):
+            file.write(block)
+        file.flush()
+
+        for name, resource, wrap in (
+            ("legacy", LegacyResource(file.name), False),
+            ("file-wrapper", FileResource(file.name), True),
+        ):
+            app = falcon.App()
+            app.add_route("/file", resource)
+            port = start_server(FileWrapper.middleware(app) if wrap else app)
+            download(port)
+            start = time.perf_counter()
+            for _ in range(downloads):
+                _, size = download(port)
+                assert size == size_mb * 1024 * 1024
+            elapsed = time.perf_counter() - start
+            print(f"{name:<14} {downloads} x {size_mb} MB   {downloads * size_mb / elapsed:>8.0f} MB/s")
+
+        response, size = download(port, {"Range": "bytes=1000-1999"})
+        print(f"range          {response.status} {response.getheader('Content-Range')} {size} bytes")
+        response, size = download(port, {"Range": f"bytes={size_mb * 1024 * 1024}-"})
+        print(f"out of range   {response.status} {response.getheader('Content-Range')}")
+        response, size = download(port, {"If-None-Match": f'"{ETAG}"'})
+        print(f"conditional    {response.status} {size} bytes")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,135 @@
+"""
+Benchmark of the generic_on_get filter strategies on a seeded user table: the legacy
+leading-wildcard LIKE (contains) against the exact and prefix operators backed by an index,
+and the FULLTEXT search of the name field.
+
+Runs on a temporary SQLite database by default, where the search field is measured with an
+FTS5 table since MATCH ... AGAINST is MySQL only. Pass a MySQL url to run it on MySQL
+(the bench_user table is created and dropped).
+
+Usage: python -m benchmarks.filter_strategy_benchmark [rows] [database_url]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import BigInteger, Index, String, create_engine, insert, text
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from core.database import db_session as DB
+from core.Model import Model
+
+FIRST_NAMES = ["Ana", "Luis", "Maria", "Jose", "Carlos", "Sofia", "Diego", "Lucia", "Pedro", "Elena"]
+LAST_NAMES = ["Garcia", "Lopez", "Trejo", "Martinez", "Hernandez", "Perez", "Sanchez", "Ramirez", "Flores", "Torres"]
+
+
+class BenchBase(DeclarativeBase):
+    pass
+
+
+class BenchUser(BenchBase, Model):
+    __tablename__ = "bench_user"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    # NOCASE makes the SQLite LIKE (case insensitive) able to use the index, as utf8_general_ci does in MySQL
+    username: Mapped[str] = mapped_column(String(100).with_variant(String(100, collation="NOCASE"), "sqlite"))
+    email: Mapped[str] = mapped_column(String(100).with_variant(String(100, collation="NOCASE"), "sqlite"))
+    first_name: Mapped[str] = mapped_column(String(45))
+    last_name: Mapped[str] = mapped_column(String(45))
+
+    filter_strategies = {
+        "email": ("exact", "prefix"),
+        "username": ("prefix", "exact"),
+    }
+    search_fields = {"name": ("first_name", "last_name")}
+
+    __table_args__ = (
+        Index("bench_user_email_idx", "email"),
+        Index("bench_user_username_idx", "username"),
+        Index("bench_user_name_ft_idx", "first_name", "last_name", mysql_prefix="FULLTEXT"),
+    )
+
+
+def seed(engine, count: int):
+    random.seed(1)
+    batch = []
+    with engine.begin() as connection:
+        for i in range(1, count + 1):
+            batch.append({
+                "id": i,
+                "username": f"user{i}",
+                "email": f"user{i}@mail{i % 97}.com",
+                "first_name": random.choice(FIRST_NAMES) if i != count // 2 else "Pachada",
+                "last_name": random.choice(LAST_NAMES),
+            })
+            if len(batch) == 10000:
+                connection.execute(insert(BenchUser), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(BenchUser), batch)
+
+        if engine.dialect.name == "sqlite":
+            connection.execute(text(
+                "CREATE VIRTUAL TABLE bench_user_fts USING fts5(first_name, last_name, "
+                "content='bench_user', content_rowid='id')"
+            ))
+            connection.execute(text("INSERT INTO bench_user_fts(bench_user_fts) VALUES ('rebuild')"))
+
+
+def measure(function, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best * 1000
+
+
+def main(count=1_000_000, url=None):
+    temp_dir = None
+    if url is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(temp_dir.name, 'bench.db')}"
+    engine = create_engine(url)
+    DB.configure(bind=engine)
+    BenchBase.metadata.drop_all(engine)
+    BenchBase.metadata.create_all(engine)
+
+    start = time.perf_counter()
+    seed(engine, count)
+    print(f"Seeded {count} users in {time.perf_counter() - start:.1f}s ({engine.dialect.name})")
+
+    target = count // 2
+    scenarios = [
+        ("email contains (legacy)", "email", "contains", f"user{target}@"),
+        ("email exact", "email", "exact", f"user{target}@mail{target % 97}.com"),
+        ("email prefix", "email", "prefix", f"user{target}@"),
+        ("username prefix", "username", "prefix", f"user{target}"),
+    ]
+    if engine.dialect.name == "mysql":
+        scenarios.append(("name search", "name", "search", "Pachada"))
+
+    for name, field, operator, value in scenarios:
+        filter = BenchUser.get_filter(field, operator, value)
+        rows, elapsed = measure(lambda: BenchUser.get_all(filter=filter, limit=50), 5)
+        DB.rollback()
+        print(f"{name:<26} {elapsed:>9.2f} ms   rows: {len(rows)}")
+
+    if engine.dialect.name == "sqlite":
+        query = text("SELECT rowid FROM bench_user_fts WHERE bench_user_fts MATCH :value LIMIT 50")
+        with engine.connect() as connection:
+            rows, elapsed = measure(lambda: connection.execute(query, {"value": "Pachada"}).all(), 5)
+        print(f"{'name search (fts5)':<26} {elapsed:>9.2f} ms   rows: {len(rows)}")
+
+    BenchBase.metadata.drop_all(engine)
+    DB.remove()
+    engine.dispose()
+    if temp_dir:
+        temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000, sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,61 @@
+"""
+Import cost of the API per module, from python -X importtime in a new interpreter importing engine.Server:
+the modules with the highest cumulative and self times, and the total per top level package.
+
+Fails if a dependency that must be imported lazily (see LazyModule) is imported at startup, so a new
+eager import of them is caught.
+
+Usage: python -m benchmarks.import_time_report [top] [module]
+"""
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+# Only imported on the first request that needs them
+LAZY_DEPENDENCIES = ("boto3", "botocore", "s3transfer", "PIL", "filetype", "jinja2", "onesignal_sdk")
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_times(module: str) -> list[tuple[str, int, int, int]]:
+    """
+    Returns (module, self us, cumulative us, depth) of every module imported by *module*.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=root, capture_output=True, text=True, check=True
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            times.append((match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2))
+    return times
+
+
+def main(top=20, module="engine.Server"):
+    times = import_times(module)
+    total = next(cumulative for name, _, cumulative, _ in times if name == module)
+    print(f"{module}: {total / 1000:.1f} ms, {len(times)} modules\n")
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, own, cumulative, depth in sorted(times, key=lambda item: item[2], reverse=True)[:top]:
+        print(f"{cumulative / 1000:>14.1f} {own / 1000:>9.1f}  {'  ' * depth}{name}")
+
+    packages = defaultdict(int)
+    for name, own, _, _ in times:
+        packages[name.split(".")[0]] += own
+    print(f"\n{'self ms':>9}  package")
+    for package, own in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"{own / 1000:>9.1f}  {package}")
+
+    eager = sorted({name.split(".")[0] for name, _, _, _ in times} & set(LAZY_DEPENDENCIES))
+    if eager:
+        print(f"\nImported at startup but should be lazy: {', '.join(eager)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]), *sys.argv[2:3])
@@ -0,0 +1,61 @@
+"""
+Per-request overhead of MetricsMiddleware: the same falcon app with and without it, called through WSGI,
+and the cost of Metrics.observe_request alone. Checks the rendered metrics count every request.
+
+No database is needed.
+Usage: python -m benchmarks.metrics_overhead_benchmark [requests]
+"""
+import sys
+import time
+
+import falcon
+from falcon import testing
+
+from core.classes.Metrics import Metrics
+from core.classes.middleware.MetricsMiddleware import MetricsMiddleware
+
+
+class BenchResource:
+    def on_get(self, req, resp, id: int):
+        resp.text = "{}"
+
+
+def build_app(metrics: Metrics = None):
+    app = falcon.App(middleware=[MetricsMiddleware(metrics)] if metrics else [])
+    app.add_route("/v1/users/{id:int}", BenchResource())
+    return app
+
+
+def call(app, count: int) -> float:
+    environ = testing.create_environ(path="/v1/users/25")
+
+    def start_response(status, headers):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(count):
+        for _ in app(dict(environ), start_response):
+            pass
+    return (time.perf_counter() - start) * 1e6 / count
+
+
+def main(count=100_000):
+    metrics = Metrics()
+    plain_us = min(call(build_app(), count) for _ in range(3))
+    metered_us = min(call(build_app(metrics), count) for _ in range(3))
+    print(f"without middleware   {plain_us:>6.2f} us/request")
+    print(f"with middleware      {metered_us:>6.2f} us/request   overhead: {metered_us - plain_us:.2f} us")
+
+    start = time.perf_counter()
+    for number in range(count):
+        metrics.observe_request("/v1/users/{id:int}", "GET", 200, number / count, 3, 0.002)
+    print(f"observe_request      {(time.perf_counter() - start) * 1e6 / count:>6.2f} us/call")
+
+    rendered = metrics.render()
+    expected = f'http_request_duration_seconds_count{{route="/v1/users/{{id:int}}",method="GET"}} {4 * count}'
+    assert expected in rendered, expected
+    assert metrics.in_flight == 0
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
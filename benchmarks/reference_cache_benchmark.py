@@ -0,0 +1,96 @@
+"""
+Latency of the lookups of reference data (templates, roles...) with Model.get() against Model.get_cached(),
+one lookup per simulated request, and the hit rate reported by ReferenceCache.stats().
+Also checks that a change saved by another process is seen after version_check_interval.
+
+Runs on a temporary SQLite database.
+Usage: python -m benchmarks.reference_cache_benchmark [requests]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import BigInteger, Text, create_engine, text
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from core.classes.ReferenceCache import ReferenceCache
+from core.database import count_queries
+from core.database import db_session as DB
+from core.Model import Model
+
+TEMPLATES = 20
+VERSION_CHECK_INTERVAL = 0.2
+
+
+class BenchBase(DeclarativeBase):
+    pass
+
+
+class BenchTemplate(BenchBase, Model):
+    __tablename__ = "bench_template"
+    cache_ttl = 300
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    subject: Mapped[str]
+    html: Mapped[str] = mapped_column(Text, deferred=True)
+
+
+def lookup(requests: int, cached: bool):
+    get = BenchTemplate.get_cached if cached else BenchTemplate.get
+    start = time.perf_counter()
+    with count_queries() as stats:
+        for number in range(requests):
+            template = get(number % TEMPLATES + 1)
+            assert template.html == f"<p>{template.subject}</p>"
+            # The session of each request is closed by SQLAlchemySessionManager
+            DB.remove()
+    return stats.count, (time.perf_counter() - start) * 1000
+
+
+def check_invalidation(cache: ReferenceCache):
+    # Another process: its own cache that saves the change and only increments the version
+    other = ReferenceCache(version_check_interval=VERSION_CHECK_INTERVAL)
+    template = BenchTemplate.get(1)
+    template.subject = "changed"
+    DB.commit()
+    other.invalidate(BenchTemplate)
+    DB.remove()
+
+    assert BenchTemplate.get_cached(1).subject != "changed"
+    DB.remove()
+    time.sleep(VERSION_CHECK_INTERVAL)
+    assert BenchTemplate.get_cached(1).subject == "changed"
+    DB.remove()
+    print(f"change of another process seen after {VERSION_CHECK_INTERVAL}s, version checks: {cache.version_checks}")
+
+
+def main(requests=5000):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        DB.configure(bind=engine)
+        BenchBase.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE cache_version (name VARCHAR(64) PRIMARY KEY, version BIGINT NOT NULL DEFAULT 0)"))
+        DB.add_all([BenchTemplate(id=number, subject=f"template {number}", html=f"<p>template {number}</p>") for number in range(1, TEMPLATES + 1)])
+        DB.commit()
+        DB.remove()
+
+        cache = ReferenceCache(version_check_interval=VERSION_CHECK_INTERVAL)
+        ReferenceCache._instance = cache
+
+        queries, elapsed = lookup(requests, cached=False)
+        print(f"get()          {requests} requests   {queries:>6} queries   {elapsed:>8.1f} ms   {elapsed * 1000 / requests:>6.1f} us/lookup")
+        queries, elapsed = lookup(requests, cached=True)
+        print(f"get_cached()   {requests} requests   {queries:>6} queries   {elapsed:>8.1f} ms   {elapsed * 1000 / requests:>6.1f} us/lookup")
+
+        model_stats = cache.stats()["models"][BenchTemplate.__tablename__]
+        print(f"hit rate: {model_stats['hit_rate']:.1%}   hits: {model_stats['hits']}   misses: {model_stats['misses']}")
+
+        check_invalidation(cache)
+        ReferenceCache._instance = None
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,56 @@
+"""
+Time to first byte and total time of an S3 download against moto, as FileS3Controller did before
+(S3Handler.download_file to a temporary file, then sent) against S3Handler.get_object_stream.
+Also checks the Range pass-through and the presigned URL of the redirect mode.
+
+Usage: python -m benchmarks.s3_download_benchmark [size_mb]
+"""
+import sys
+import time
+
+import boto3
+from moto import mock_aws
+
+from core.classes.aws.S3Handler import S3Handler
+
+BUCKET = "bench-bucket"
+KEY = "0123456789abcdef"
+BLOCK_SIZE = 256 * 1024
+
+
+def consume(stream):
+    start = time.perf_counter()
+    first_byte = None
+    size = 0
+    while chunk := stream.read(BLOCK_SIZE):
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+    stream.close()
+    return first_byte, time.perf_counter() - start, size
+
+
+def main(size_mb=50):
+    with mock_aws():
+        boto3.resource("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        handler = S3Handler(BUCKET, "us-east-1")
+        handler.bucket.put_object(Key=KEY, Body=b"x" * size_mb * 1024 * 1024)
+
+        for name, get_stream in (
+            ("temp file", lambda: handler.download_file(KEY)),
+            ("streaming", lambda: handler.get_object_stream(KEY)["Body"]),
+        ):
+            start = time.perf_counter()
+            stream = get_stream()
+            ready = time.perf_counter() - start
+            first_byte, elapsed, size = consume(stream)
+            assert size == size_mb * 1024 * 1024
+            print(f"{name:<10} {size_mb} MB   first byte: {(ready + first_byte) * 1000:>8.1f} ms   total: {(ready + elapsed) * 1000:>8.1f} ms")
+
+        s3_object = handler.get_object_stream(KEY, "bytes=100-199")
+        print(f"range      {s3_object['ContentRange']} {len(s3_object['Body'].read())} bytes")
+        print(f"presigned  {handler.generate_presigned_url(KEY, 300, 'video.mp4', 'video/mp4')[:80]}...")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
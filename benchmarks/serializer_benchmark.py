@@ -0,0 +1,163 @@
+"""
+Compares Utils.serialize_model (compiled serializer plans) against the previous
+implementation: checks both outputs are equal and measures rows/sec.
+
+Runs on transient model instances, no database is needed.
+Usage: python -m benchmarks.serializer_benchmark [rows] [repeat]
+"""
+import sys
+import time
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import BigInteger, ForeignKey
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+
+from core.Model import Model
+from core.Utils import Utils
+
+
+class BenchBase(DeclarativeBase):
+    pass
+
+
+class BenchRole(BenchBase, Model):
+    __tablename__ = "bench_role"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    name: Mapped[str]
+    created: Mapped[datetime]
+    updated: Mapped[datetime]
+    enable: Mapped[bool]
+
+
+class BenchUser(BenchBase, Model):
+    __tablename__ = "bench_user"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    username: Mapped[str]
+    password: Mapped[str]
+    salt: Mapped[Optional[str]]
+    email: Mapped[str]
+    role_id: Mapped[int] = mapped_column(BigInteger, ForeignKey(BenchRole.id))
+    birthday: Mapped[date]
+    created: Mapped[datetime]
+    updated: Mapped[datetime]
+    enable: Mapped[bool]
+
+    role: Mapped[BenchRole] = relationship(BenchRole)
+    devices: Mapped[List["BenchDevice"]] = relationship(back_populates="user")
+
+    attributes_blacklist = {"salt"}
+
+
+class BenchDevice(BenchBase, Model):
+    __tablename__ = "bench_device"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    uuid: Mapped[str]
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey(BenchUser.id))
+    created: Mapped[datetime]
+
+    user: Mapped[BenchUser] = relationship(back_populates="devices")
+
+
+def legacy_serialize_model(object, recursive=False, formatters=None, recursiveLimit=2, blacklist=None, attributes_blacklist=None):
+    """ The implementation of Utils.serialize_model before the serializer plans """
+    if not object:
+        if isinstance(object, list):
+            return []
+        return
+
+    if isinstance(object, list):
+        return [
+            legacy_serialize_model(
+                item,
+                recursive,
+                formatters,
+                recursiveLimit=recursiveLimit,
+                blacklist=blacklist,
+                attributes_blacklist=attributes_blacklist,
+            )
+            for item in object
+        ]
+
+    result = {}
+    if blacklist is None:
+        blacklist = getattr(object, 'blacklist', set())
+    if attributes_blacklist is None:
+        attributes_blacklist = getattr(object, 'attributes_blacklist', set())
+    if formatters is None:
+        formatters = getattr(object, "formatters", object.get_formatters())
+    for c in object.__table__.columns.keys():
+        if c == "password" or c in attributes_blacklist:
+            continue
+        value = getattr(object, str(c))
+        if c in formatters and value:
+            value = formatters[c](value)
+        result[c] = value
+    if recursive and recursiveLimit > 1:
+        limit = recursiveLimit - 1
+        for relation in object.__mapper__.relationships.keys():
+            if relation not in blacklist:
+                recursiveObj = getattr(object, relation)
+                blacklistModel = getattr(recursiveObj, "blacklist", blacklist)
+                result[relation] = legacy_serialize_model(
+                    recursiveObj,
+                    recursive,
+                    recursiveLimit=limit,
+                    blacklist=blacklistModel,
+                )
+
+    return result
+
+
+def build_rows(count: int) -> list:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    role = BenchRole(id=1, name="admin", created=now, updated=now, enable=True)
+    rows = []
+    for i in range(count):
+        user = BenchUser(
+            id=i,
+            username=f"user{i}",
+            password="secret",
+            salt="abc",
+            email=f"user{i}@mail.com",
+            role_id=1,
+            birthday=date(1990, 1, 1 + i % 28),
+            created=now,
+            updated=now,
+            enable=True,
+        )
+        user.role = role
+        user.devices = [BenchDevice(id=i * 2 + d, uuid=f"uuid-{i}-{d}", user_id=i, created=now) for d in range(2)]
+        rows.append(user)
+    return rows
+
+
+def measure(function, rows, repeat, **kwargs):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = function(rows, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return output, len(rows) / best
+
+
+def main(count=50, repeat=200):
+    rows = build_rows(count)
+    scenarios = {
+        "flat": {},
+        "recursive limit 3": {"recursive": True, "recursiveLimit": 3},
+        "recursive with blacklist": {"recursive": True, "recursiveLimit": 3, "blacklist": ["devices"]},
+    }
+    for name, kwargs in scenarios.items():
+        legacy_output, legacy_rate = measure(legacy_serialize_model, rows, repeat, **kwargs)
+        plan_output, plan_rate = measure(Utils.serialize_model, rows, repeat, **kwargs)
+        assert legacy_output == plan_output, f"Outputs differ for scenario '{name}'"
+        print(f"{name:<26} legacy: {legacy_rate:>10.0f} rows/s   plans: {plan_rate:>10.0f} rows/s   x{plan_rate / legacy_rate:.2f}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
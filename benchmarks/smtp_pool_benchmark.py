@@ -0,0 +1,106 @@
+"""
+Benchmark of the SMTP delivery: one connection per email (the previous send_now path), one connection
+sending the batch serially (the previous cron) and SmtpConnectionPool with several pool sizes.
+
+Uses a local debugging SMTP server that accepts and discards every message and answers each
+command after a fixed latency, standing in for the network round trip to a real server.
+Usage: python -m benchmarks.smtp_pool_benchmark [messages] [latency_ms]
+"""
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+from email.mime.text import MIMEText
+
+from core.classes.SmtpConnectionPool import SmtpConnectionPool
+
+
+class DebuggingSmtpHandler(socketserver.StreamRequestHandler):
+    latency = 0.005
+
+    def reply(self, line: str):
+        time.sleep(self.latency)
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 localhost debugging server")
+        while line := self.rfile.readline():
+            command = line[:4].decode("ascii", "ignore").upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                self.server.messages += 1
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                # MAIL, RCPT, RSET, NOOP
+                self.reply("250 OK")
+
+
+class DebuggingSmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), DebuggingSmtpHandler)
+        self.connections = 0
+        self.messages = 0
+
+
+def build_messages(count: int) -> list:
+    messages = []
+    for i in range(count):
+        msg = MIMEText(f"<p>Your code is {i:06d}</p>", "html")
+        msg["Subject"] = "OTP"
+        messages.append(("bench@localhost", f"user{i}@localhost", msg.as_string()))
+    return messages
+
+
+def connection_per_email(port: int, messages: list):
+    for message in messages:
+        with smtplib.SMTP("127.0.0.1", port) as server:
+            server.sendmail(*message)
+
+
+def single_connection(port: int, messages: list):
+    with smtplib.SMTP("127.0.0.1", port) as server:
+        for message in messages:
+            server.sendmail(*message)
+
+
+def measure(server: DebuggingSmtpServer, name: str, function, messages: list):
+    server.connections = server.messages = 0
+    start = time.perf_counter()
+    function(messages)
+    elapsed = time.perf_counter() - start
+    assert server.messages == len(messages), f"{name}: {server.messages} of {len(messages)} messages received"
+    print(f"{name:<28} {len(messages) / elapsed:>8.0f} emails/s   connections: {server.connections}")
+
+
+def main(count=400, latency_ms=5):
+    DebuggingSmtpHandler.latency = latency_ms / 1000
+    server = DebuggingSmtpServer()
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    messages = build_messages(count)
+
+    measure(server, "connection per email", lambda batch: connection_per_email(port, batch), messages[:count // 4])
+    measure(server, "single connection", lambda batch: single_connection(port, batch), messages)
+    for pool_size in (1, 4, 8, 16):
+        pool = SmtpConnectionPool("127.0.0.1", port, pool_size=pool_size, max_messages_per_connection=100, security="none")
+        measure(server, f"pool of {pool_size}", pool.send_many, messages)
+        pool.close()
+
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,42 @@
+"""
+Startup time of the API, as in a Lambda cold start: a new interpreter imports engine.Server and serves its first
+request (GET /v1/health-check/ping, which does not use the database). Each run is a separate process.
+
+The models are declared and not reflected, so no database is needed to start.
+Usage: python -m benchmarks.startup_benchmark [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+from engine.Server import server
+imported = time.perf_counter()
+from falcon import testing
+result = testing.TestClient(server).simulate_get("/v1/health-check/ping")
+assert result.status_code == 200, result.status
+print(json.dumps({"import": imported - start, "first_response": time.perf_counter() - start}))
+"""
+
+
+def run_once(root: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=root, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(runs=5):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = [run_once(root) for _ in range(runs)]
+    for key in ("import", "first_response"):
+        values = [result[key] * 1000 for result in results]
+        print(f"{key:<15} median: {statistics.median(values):>8.1f} ms   min: {min(values):>8.1f} ms   max: {max(values):>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
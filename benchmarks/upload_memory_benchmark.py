@@ -0,0 +1,87 @@
+"""
+Peak memory of concurrent uploads: the previous FileController.process_stream (chunks collected in a list,
+joined and then written to a temporary file) against StagedUpload.from_stream, measured with tracemalloc.
+
+Each upload reads from a stream that produces its content on demand, so only the memory used
+by the upload pipeline is measured.
+Usage: python -m benchmarks.upload_memory_benchmark [uploads] [size_mb]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from core.classes.StagedUpload import FileSizeGreaterThanAllowed, StagedUpload
+
+MAX_FILE_SIZE = 50_000_000
+
+
+class GeneratedStream:
+    """ A multipart part stream stand-in that returns *size* bytes without holding them """
+
+    def __init__(self, size: int):
+        self.remaining = size
+        self.block = os.urandom(64 * 1024)
+
+    def read(self, size: int = -1) -> bytes:
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        self.remaining -= size
+        return (self.block * (size // len(self.block) + 1))[:size]
+
+
+def legacy_process_stream(stream, directory: str):
+    """ The previous FileController.process_stream followed by the temporary file written before storing it """
+    read_so_far = 0
+    data = []
+    while chunk := stream.read(8192):
+        data.append(chunk)
+        read_so_far += len(chunk)
+        if read_so_far > MAX_FILE_SIZE:
+            raise FileSizeGreaterThanAllowed()
+
+    content = b"".join(data)
+    with tempfile.NamedTemporaryFile(dir=directory) as temp_file:
+        temp_file.write(content)
+
+
+def staged_process_stream(stream, directory: str):
+    with StagedUpload.from_stream(stream, directory, MAX_FILE_SIZE, "application/pdf"):
+        pass
+
+
+def measure(function, uploads: int, size: int, directory: str):
+    barrier = threading.Barrier(uploads)
+
+    def upload():
+        stream = GeneratedStream(size)
+        barrier.wait()
+        function(stream, directory)
+
+    threads = [threading.Thread(target=upload) for _ in range(uploads)]
+    tracemalloc.start()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main(uploads=8, size_mb=10):
+    size = size_mb * 1_000_000
+    with tempfile.TemporaryDirectory() as directory:
+        for name, function in (("legacy", legacy_process_stream), ("staged", staged_process_stream)):
+            peak, elapsed = measure(function, uploads, size, directory)
+            print(
+                f"{name:<8} {uploads} x {size_mb} MB   peak: {peak / 1_000_000:>8.1f} MB"
+                f"   per upload: {peak / uploads / 1_000_000:>6.2f} MB   {elapsed:.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -2,6 +2,8 @@ import os
 import time
 from random import randint
 
+from core.classes.FileManager import FileManager
+from core.classes.FileResponse import FileResponse
 from core.classes.FileUtils import (ROUTE_LOADER, File, FileAbstract,
                                     FileController, HTTPStatus, Request,
                                     Response, User, Utils, logger)
@@ -13,9 +15,14 @@ from models.Role import Role
 @ROUTE_LOADER('/v1/files/local/base64', suffix="base64")
 @ROUTE_LOADER('/v1/files/local/base64/{id:int}', suffix="base64")
 class FileLocalController(FileController, FileAbstract):
+    BASE64_PER_PAGE = 10
+    BASE64_MAX_PER_PAGE = 100
+
     def __init__(self):
         super().__init__()
         self.storage_path = self.config.get("FILES", "storage_path")
+        self.staging_path = self.storage_path
+        self.blob_path = os.path.join(self.storage_path, FileManager.CAS_PREFIX)
 
     def on_get(self, req: Request, resp: Response, id: int = None):
         if not id:
@@ -40,10 +47,7 @@ class FileLocalController(FileController, FileAbstract):
             self.response(resp, HTTPStatus.CONFLICT, error="File content not found")
             return
 
-        resp.set_header("content-disposition", f'inline; filename="{file.name}"')
-        resp.stream = open(file.object, "rb")
-        resp.content_length = file.size
-        resp.content_type = file.type
+        self.send_file(req, resp, file, file.object)
 
     def on_post(self, req: Request, resp: Response, id: int = None):
         return super().on_post(req, resp, id)
@@ -76,16 +80,46 @@ class FileLocalController(FileController, FileAbstract):
     # -------------------------------- base64 --------------------------------
 
     def on_get_base64(self, req: Request, resp: Response, id: int = None):
+        """
+        Streams the file, or a page of files with keyset pagination (cursor and per_page parameters),
+        with the content of each file encoded to base64 as it is read.
+        """
         try:
             if id:
                 file = File.get(id)
                 if not file:
                     self.response(resp, HTTPStatus.NOT_FOUND, message="No such file or directory")
                     return
-            else:
-                file = File.get_all()
 
-            self.response(resp, HTTPStatus.OK, self.__get_file_data_as_base64(file))
+                FileResponse.send_base64(resp, [self.__get_base64_item(file)])
+                return
+
+            try:
+                per_page = min(int(req.params.get("per_page", self.BASE64_PER_PAGE)), self.BASE64_MAX_PER_PAGE)
+            except ValueError:
+                self.response(resp, HTTPStatus.BAD_REQUEST, error="Invalid value for per_page. It must be an integer.")
+                return
+            if per_page <= 0:
+                self.response(resp, HTTPStatus.BAD_REQUEST, error="Invalid value for per_page. It must be greater than zero.")
+                return
+
+            after = None
+            cursor = req.params.get("cursor", self.FIRST_PAGE_CURSOR)
+            if cursor != self.FIRST_PAGE_CURSOR:
+                after = self.decode_cursor(cursor, File.id)
+                if after is None:
+                    self.response(resp, HTTPStatus.BAD_REQUEST, error=self.INVALID_CURSOR)
+                    return
+
+            # One extra row tells if there is a next page
+            files = File.get_all_after(after=after, order_column=File.id, limit=per_page + 1)
+            next_cursor = None
+            if len(files) > per_page:
+                files = files[:per_page]
+                next_cursor = self.encode_cursor(files[-1], File.id)
+
+            envelope = {"per_page": per_page, "next_cursor": next_cursor}
+            FileResponse.send_base64(resp, [self.__get_base64_item(file) for file in files], envelope)
 
         except Exception as exc:
             logger.error(exc)
@@ -93,40 +127,59 @@ class FileLocalController(FileController, FileAbstract):
 
     # -------------------------------- Utils --------------------------------
 
-    def __get_file_data_as_base64(self, file, base64=False):
-        """Returns the the information of the file
+    def __get_base64_item(self, file: File):
+        """Returns the item of the file for FileResponse.send_base64()
+
+        The file is serialized now, while the database session is open, and its content is read
+        when the response is sent.
 
         Parameters
         ----------
-        file : list or File
-            A list of File objects or a File object
-        base64: bool
-            if the info of the file is neede in base64
+        file : File
+            A File object
 
         Returns
         -------
-        list
-            a list of dictionaries containing the info of the files.
-        dict
-            a dict with the info of the file
+        tuple
+            the serialized file and a function that opens its content,
+            or a message and None if the content of the file does not exist.
         """
+        if not os.path.exists(file.object):
+            return {"id": file.id, "message": "No such file or directory"}, None
 
-        if isinstance(file, list):
-            return [self.__get_file_data_as_base64(item) for item in file]
+        path = file.object
+        return Utils.serialize_model(file), lambda: open(path, "rb")
 
-        elif isinstance(file, File):
+    def __store_blob(self, file: File, upload, encode_to_base64):
+        """Stores the upload in the blob of its content, unless it already exists
 
-            if not os.path.exists(file.object):
-                # self.__delete_file(file)
-                return {"id": file.id, "message": "No such file or directory"}
+        Parameters
+        ----------
+        file : File
+            The file of the upload, its hash and object are set to the blob
+        upload : StagedUpload
+            The staged upload
+        encode_to_base64: bool
+            if the content is stored in base64, a different blob than the raw content
 
-            with open(file.object, "rb") as file_object:
-                file_content = super().encode_to_base64(file_object.read())
-                data = Utils.serialize_model(file)
-                # The base64 has 'trash' in it, remove it with a trim [2:-1]
-                data["base64"] = str(file_content)[2:-1]
+        Returns
+        -------
+        None
+        """
+        blob_name = upload.sha256 + (".b64" if encode_to_base64 else "")
+        blob_path = os.path.join(self.blob_path, blob_name)
+        file.hash = blob_name
+        file.object = blob_path
+        if os.path.exists(blob_path):
+            # Same content already stored, refreshing its time keeps the reaper away while the file is saved
+            os.utime(blob_path)
+            return
 
-            return data
+        if encode_to_base64:
+            upload.encode_to_base64()
+        os.makedirs(self.blob_path, exist_ok=True)
+        # Concurrent uploads of the same content replace the blob with the same bytes
+        upload.move_to(blob_path)
 
     def __delete_file(self, file, soft_delete=True):
         """Soft deletes the file and removes the file content from the server.
@@ -150,7 +203,8 @@ class FileLocalController(FileController, FileAbstract):
                 file.soft_delete()
             else:
                 file.delete()
-            if os.path.exists(file.object):
+            # Other files may have the same content, the blob is removed by FileBlobReaperCrontab once unreferenced
+            if os.path.dirname(file.object) != self.blob_path and os.path.exists(file.object):
                 os.remove(file.object)
 
     def create_file(
@@ -164,56 +218,43 @@ class FileLocalController(FileController, FileAbstract):
         public=False,
         private=False
     ):
-        random_number = randint(0, 100000)
-        filename = (
-            str(random_number) + file_name[:-4] + str(time.time()) + file_name[-4:]
-        )
-        file_path = os.path.join(self.storage_path, filename)
-
-        # Write to a temporary file to prevent incomplete files
-        # from being used.
-        temp_file_path = file_path + "~"
-
-        file_content = super().format_file_content(file_content)
-
-        with open(temp_file_path, "wb") as temp_file:
-            temp_file.write(file_content)
-
-        # Now that we know the file has been fully saved to disk
-        # move it into place.
-        os.rename(temp_file_path, file_path)
-
-        file = File(
-            size=os.stat(file_path).st_size,
-            type=file_type,
-            name=file_name,
-            is_thumbnail=is_thumbnail,
-            user_who_uploaded_id=user.id,
-            is_private=private
-        )
-
-        hash_string = (
-            str(file.size)
-            + str(file.name)
-            + str(file.type)
-            + str(file.created)
-            + str(time.time())
-            + str(filename)
-        )
-        file.hash = Utils.get_hashed_string(hash_string)
-
-        file_path_hashed = os.path.join(self.storage_path, file.hash)
-        os.rename(file_path, file_path_hashed)
-        file.object = file_path_hashed
+        upload, staged_here = super().stage(file_content, file_type)
+        try:
+            file = File(
+                size=upload.size,
+                type=file_type,
+                name=file_name,
+                is_thumbnail=is_thumbnail,
+                user_who_uploaded_id=user.id,
+                is_private=private
+            )
+
+            if self.content_addressed:
+                self.__store_blob(file, upload, encode_to_base64)
+            else:
+                hash_string = (
+                    upload.sha256
+                    + str(file.name)
+                    + str(file.type)
+                    + str(time.time())
+                    + str(randint(0, 100000))
+                )
+                file.hash = Utils.get_hashed_string(hash_string)
+
+                if encode_to_base64:
+                    upload.encode_to_base64()
+
+                # The upload was fully written to the staging path, in the same file system,
+                # so moving it into place is an atomic rename
+                file_path_hashed = os.path.join(self.storage_path, file.hash)
+                upload.move_to(file_path_hashed)
+                file.object = file_path_hashed
+        finally:
+            if staged_here:
+                upload.cleanup()
 
         if not file.save():
             self.__delete_file(file, False)
             return None
 
-        if encode_to_base64:
-            # Now that we have the info of the file, encode it in base64
-            with open(file_path_hashed, "wb") as file_path_to_encode:
-                file_content = super().encode_to_base64(file_content)
-                file_path_to_encode.write(file_content)
-
         return file
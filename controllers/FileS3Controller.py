@@ -1,18 +1,24 @@
 import time
-from io import BufferedReader
 
 from core.classes.FileManager import FileManager
+from core.classes.FileResponse import FileResponse
 from core.classes.FileUtils import (ROUTE_LOADER, File, FileAbstract,
                                     FileController, HTTPStatus, Request,
-                                    Response, Utils)
+                                    Response, Utils, logger)
+from core.classes.LazyModule import LazyModule
 from models.User import Role, User
 
+botocore_exceptions = LazyModule("botocore.exceptions")
+
 
 @ROUTE_LOADER('/v1/files/s3')
 @ROUTE_LOADER('/v1/files/s3/{id:int}')
 @ROUTE_LOADER('/v1/files/s3/base64', suffix="base64")
 @ROUTE_LOADER('/v1/files/s3/base64/{id:int}', suffix="base64")
 class FileS3Controller(FileController, FileAbstract):
+    STREAM = "stream"
+    REDIRECT = "redirect"
+
     def __init__(self):
         super().__init__()
         #  AWS S3 info
@@ -20,23 +26,21 @@ class FileS3Controller(FileController, FileAbstract):
         self.public_bucket = self.config.get("S3", "public_bucket_name")
         self.region = self.config.get("S3", "region")
         self.profile = self.config.get("S3", "profile_name")
+        self.download_mode = self.config.get("S3", "download_mode", fallback=self.STREAM)
+        self.public_download_mode = self.config.get("S3", "public_download_mode", fallback=self.download_mode)
+        self.private_download_mode = self.config.get("S3", "private_download_mode", fallback=self.download_mode)
+        self.presigned_url_expiration = self.config.getint("S3", "presigned_url_expiration", fallback=300)
 
     def on_get(self, req: Request, resp: Response, id: int = None):
         if not id:
             self.response(resp, HTTPStatus.METHOD_NOT_ALLOWED)
             return
 
-        file, file_object = FileManager.get_file(self.bucket, id, self.region)
-
+        file = File.get(id)
         if not file:
             self.response(resp, HTTPStatus.NOT_FOUND, error="No file with that id")
             return
 
-        if not file_object:
-            self.response(resp, HTTPStatus.INTERNAL_SERVER_ERROR, error="Error geting file from s3")
-            return
-        
-        file: File = file
         session = self.get_session(req, resp)
         if not session:
             return
@@ -46,10 +50,77 @@ class FileS3Controller(FileController, FileAbstract):
             self.response(resp, HTTPStatus.FORBIDDEN, error="Private file")
             return
 
-        resp.set_header("content-disposition", f'inline; filename="{file.name}"')
-        resp.stream = BufferedReader(file_object)
-        resp.content_length = file.size
-        resp.content_type = file.type
+        if self.get_download_mode(file) == self.REDIRECT:
+            self.redirect_to_file(resp, file)
+        else:
+            self.stream_file(req, resp, file)
+
+    def get_download_mode(self, file: File):
+        if file.is_private:
+            return self.private_download_mode
+        if file.url:
+            return self.public_download_mode
+
+        return self.download_mode
+
+    def redirect_to_file(self, resp: Response, file: File):
+        """
+        Redirects to a presigned URL of the object, so S3 sends the file instead of the server.
+        """
+        try:
+            url = FileManager.get_download_url(
+                self.bucket, self.public_bucket, file, self.region, self.presigned_url_expiration
+            )
+        except Exception as exc:
+            logger.error(f"[ERROR-SIGNING-S3-URL] file: {file.id}, {exc}")
+            self.response(resp, HTTPStatus.INTERNAL_SERVER_ERROR, error="Error geting file from s3")
+            return
+
+        resp.status = HTTPStatus.FOUND
+        resp.location = url
+        # The URL expires, it must not be reused from a cache
+        resp.cache_control = ["private", "no-store"]
+
+    def stream_file(self, req: Request, resp: Response, file: File):
+        """
+        Sends the object as it is read from S3, passing the Range header through.
+        The hash of a file is its key and its content never changes, so it is used as its strong ETag.
+        """
+        resp.etag = file.hash
+        resp.accept_ranges = "bytes"
+        if FileResponse.not_modified(req, file.hash):
+            resp.status = HTTPStatus.NOT_MODIFIED
+            return
+
+        byte_range = None
+        if req.get_header("Range") is not None and req.range_unit == "bytes" and FileResponse.if_range_matches(req, file.hash):
+            # Raises 400 if the header is malformed, S3 answers only valid ranges
+            req.range
+            byte_range = req.get_header("Range")
+
+        try:
+            s3_object = FileManager.get_file_stream(
+                self.bucket, self.public_bucket, file, self.region, byte_range
+            )
+        except botocore_exceptions.ClientError as exc:
+            error = exc.response.get("Error", {})
+            if error.get("Code") == "InvalidRange":
+                FileResponse.range_not_satisfiable(resp, error.get("ActualObjectSize", "*"))
+                return
+            if error.get("Code") == "NoSuchKey":
+                self.response(resp, HTTPStatus.CONFLICT, error="File content not found")
+                return
+
+            logger.error(f"[ERROR-GETTING-FILE-FROM-S3] file: {file.id}, {exc}")
+            self.response(resp, HTTPStatus.INTERNAL_SERVER_ERROR, error="Error geting file from s3")
+            return
+
+        FileResponse.set_content_headers(resp, file.type, file.name)
+        resp.stream = s3_object["Body"]
+        resp.content_length = s3_object["ContentLength"]
+        if content_range := s3_object.get("ContentRange"):
+            resp.status = HTTPStatus.PARTIAL_CONTENT
+            resp.set_header("content-range", content_range)
 
     def on_post(self, req: Request, resp: Response, id: int = None):
         return super().on_post(req, resp, id)
@@ -93,19 +164,20 @@ class FileS3Controller(FileController, FileAbstract):
             self.response(resp, HTTPStatus.METHOD_NOT_ALLOWED)
             return
 
-        file, file_object = FileManager.get_file(self.bucket, id, self.region)
-
+        file = File.get(id)
         if not file:
             self.response(resp, HTTPStatus.NOT_FOUND, error="No file with that id")
             return
 
-        file_content = file_object.read()
-        file_object.close()
-        file_content_b64 = super().encode_to_base64(file_content)
-        data = Utils.serialize_model(file)
-        data["base64"] = str(file_content_b64)[2:-1]
+        try:
+            body = FileManager.get_file_stream(self.bucket, self.public_bucket, file, self.region)["Body"]
+        except Exception as exc:
+            logger.error(f"[ERROR-GETTING-FILE-FROM-S3] file: {file.id}, {exc}")
+            self.response(resp, HTTPStatus.INTERNAL_SERVER_ERROR, error="Error geting file from s3")
+            return
 
-        self.response(resp, HTTPStatus.OK, data)
+        # The body of the object is encoded to base64 as it is read from S3
+        FileResponse.send_base64(resp, [(Utils.serialize_model(file), lambda: body)])
 
     # -------------------------------- Utils --------------------------------
 
@@ -121,34 +193,41 @@ class FileS3Controller(FileController, FileAbstract):
         private=False,
         metadata=None
     ):
-        file_content = super().format_file_content(file_content)
-
-        hash_string = file_name + file_type + str(time.time()) + str(file_content)[:25]
-        file_hash = Utils.get_hashed_string(hash_string)
-
-        if encode_to_base64:
-            file_content = super().encode_to_base64(file_content)
-
-        bucket = self.bucket
-        url = None
-        # For public files, append file extension to key and setup public URL
-        if public:
-            bucket = self.public_bucket
-            file_type_new = file_type.split("/")[1]
-            file_hash = f"{file_hash}.{file_type_new}"
-            url = f"https://{bucket}.s3.amazonaws.com/{file_hash}"  # https://bucket_name.s3.amazonaws.com/6d9860c300a8744cbbf3f5.png
-            metadata = {'Content-Type': file_type}
-        
-        return FileManager.put_file(
-            bucket,
-            file_content,
-            file_hash,
-            user_id=user.id,
-            file_type=file_type,
-            file_name=file_name,
-            region=self.region,
-            is_thumbnail=is_thumbnail,
-            url=url,
-            is_private=private,
-            metadata=metadata
-        )
+        upload, staged_here = super().stage(file_content, file_type)
+        try:
+            if self.content_addressed:
+                file_hash = f"{FileManager.CAS_PREFIX}/{upload.sha256}" + (".b64" if encode_to_base64 else "")
+            else:
+                hash_string = file_name + file_type + str(time.time()) + upload.sha256
+                file_hash = Utils.get_hashed_string(hash_string)
+
+            if encode_to_base64:
+                upload.encode_to_base64()
+
+            bucket = self.bucket
+            url = None
+            # For public files, append file extension to key and setup public URL
+            if public:
+                bucket = self.public_bucket
+                file_type_new = file_type.split("/")[1]
+                file_hash = f"{file_hash}.{file_type_new}"
+                url = f"https://{bucket}.s3.amazonaws.com/{file_hash}"  # https://bucket_name.s3.amazonaws.com/6d9860c300a8744cbbf3f5.png
+                metadata = {'Content-Type': file_type}
+
+            return FileManager.put_file(
+                bucket,
+                upload,
+                file_hash,
+                user_id=user.id,
+                file_type=file_type,
+                file_name=file_name,
+                region=self.region,
+                is_thumbnail=is_thumbnail,
+                url=url,
+                is_private=private,
+                metadata=metadata,
+                skip_if_exists=self.content_addressed
+            )
+        finally:
+            if staged_here:
+                upload.cleanup()
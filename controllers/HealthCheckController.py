@@ -1,17 +1,26 @@
 from core.Controller import (ROUTE_LOADER, Controller, HTTPStatus, Request,
                              Response, Utils, datetime, timezone)
+from engine.WarmUp import WarmUp
 
 
-@ROUTE_LOADER('/v1/health-check/{action}')  # ping
+@ROUTE_LOADER('/v1/health-check/{action}')  # ping, ready
 class HealthCheckController(Controller):
     skip_auth = True
 
     def __init__(self):
-        self.actions = {"ping": self.__ping}
+        self.actions = {"ping": self.__ping, "ready": self.__ready}
 
     def __ping(self, req: Request, resp: Response):
         self.response(resp, HTTPStatus.OK, {"timestamp": Utils.date_formatter(datetime.now(timezone.utc))})
 
+    def __ready(self, req: Request, resp: Response):
+        # Ready once the warm-up completed, so the load balancer only sends traffic to warm processes
+        if not WarmUp.is_ready():
+            self.response(resp, HTTPStatus.SERVICE_UNAVAILABLE, error="Warming up")
+            return
+
+        self.response(resp, HTTPStatus.OK, {"timestamp": Utils.date_formatter(datetime.now(timezone.utc))})
+
     def on_post(self, req: Request, resp: Response, action: str):
         self.actions[action](req, resp)
 
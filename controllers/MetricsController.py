@@ -0,0 +1,51 @@
+from core.classes.aws.AwsClientRegistry import AwsClientRegistry
+from core.classes.JWT.JWTUtils import JWTUtils
+from core.classes.Metrics import Metrics
+from core.classes.ReferenceCache import ReferenceCache
+from core.Controller import (ROUTE_LOADER, Controller, Hooks, Request,
+                             Response, falcon)
+from core.database import engine
+from models.Role import Role
+
+
+@ROUTE_LOADER('/v1/metrics')
+class MetricsController(Controller):
+
+    @falcon.before(Hooks.check_privileges, allowed_roles_ids={Role.ADMIN})
+    def on_get(self, req: Request, resp: Response):
+        metrics = Metrics.get_instance()
+        resp.content_type = Metrics.CONTENT_TYPE
+        resp.text = metrics.render() + Metrics.render_pool(engine.pool) + self.__render_caches()
+
+    @staticmethod
+    def __render_caches() -> str:
+        lines = []
+        reference_cache = ReferenceCache.get_instance().stats()
+        jwt_cache = JWTUtils.get_cache_stats()
+        caches = [("reference", name, stats) for name, stats in reference_cache["models"].items()]
+        caches.append(("jwt", "tokens", jwt_cache["tokens"]))
+
+        for name, key, kind, help in (
+            ("cache_hits_total", "hits", "counter", "Lookups served by the cache."),
+            ("cache_misses_total", "misses", "counter", "Lookups not served by the cache."),
+            ("cache_size", "size", "gauge", "Entries in the cache."),
+        ):
+            Metrics.header(lines, name, kind, help)
+            for cache, cache_name, stats in caches:
+                lines.append(Metrics.sample(name, stats[key], {"cache": cache, "name": cache_name}))
+
+        Metrics.header(lines, "reference_cache_version_checks_total", "counter", "Checks of the versions changed by other processes.")
+        lines.append(Metrics.sample("reference_cache_version_checks_total", reference_cache["version_checks"]))
+        Metrics.header(lines, "jwt_key_loads_total", "counter", "Loads of the JWT keys from disk.")
+        lines.append(Metrics.sample("jwt_key_loads_total", jwt_cache["key_loads"]))
+
+        aws_clients = AwsClientRegistry.get_instance().stats()
+        for name, key, help in (
+            ("aws_clients_created_total", "created", "boto3 clients and resources created."),
+            ("aws_clients_reused_total", "reused", "Lookups of boto3 clients and resources already created."),
+        ):
+            Metrics.header(lines, name, "counter", help)
+            for client, stats in aws_clients.items():
+                lines.append(Metrics.sample(name, stats[key], {"client": client}))
+
+        return "\n".join(lines) + "\n"
@@ -85,7 +85,7 @@ class PasswordRecoveryController(Controller):
         session, token = Authenticator.login_by_otp(user_verification.user, device_uuid)
         data = {
             "Bearer": token,
-            "session": Utils.serialize_model(session, recursive=True, recursiveLimit=3, blacklist=["device"])
+            "session": self.serialize_session(session)
         }
         self.response(resp, HTTPStatus.OK, data, message="Session started")
 
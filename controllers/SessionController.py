@@ -1,6 +1,6 @@
 from core.classes.middleware.Authenticator import Authenticator
 from core.Controller import (ROUTE_LOADER, Controller, Decorators, Hooks,
-                             HTTPStatus, Request, Response, Utils, falcon)
+                             HTTPStatus, Request, Response, falcon)
 
 @ROUTE_LOADER('/v1/sessions')
 @ROUTE_LOADER('/v1/sessions/login', suffix="login")
@@ -12,7 +12,7 @@ class SessionController(Controller):
         if not session:
             return
 
-        data = {"session": Utils.serialize_model(session, recursive=True, recursiveLimit=3, blacklist=["device"])}
+        data = {"session": self.serialize_session(session)}
         self.response(resp, HTTPStatus.OK, data)
 
     @Decorators.no_authorization_needed
@@ -33,7 +33,7 @@ class SessionController(Controller):
 
         data = {
             "Bearer": token,
-            "session": Utils.serialize_model(session, recursive=True, recursiveLimit=3, blacklist=["device"])
+            "session": self.serialize_session(session)
         }
 
         self.response(resp, HTTPStatus.OK, data, message="Session started")
@@ -0,0 +1,30 @@
+from core.classes.SlowQueryLog import SlowQueryLog
+from core.Controller import (ROUTE_LOADER, Controller, Hooks, HTTPStatus,
+                             Request, Response, falcon)
+from models.Role import Role
+
+
+@ROUTE_LOADER('/v1/slow-queries')
+class SlowQueryController(Controller):
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 100
+
+    @falcon.before(Hooks.check_privileges, allowed_roles_ids={Role.ADMIN})
+    def on_get(self, req: Request, resp: Response):
+        try:
+            limit = min(int(req.params.get("limit", self.DEFAULT_LIMIT)), self.MAX_LIMIT)
+        except ValueError:
+            self.response(resp, HTTPStatus.BAD_REQUEST, error="Invalid value for limit. It must be an integer.")
+            return
+        if limit <= 0:
+            self.response(resp, HTTPStatus.BAD_REQUEST, error="Invalid value for limit. It must be greater than zero.")
+            return
+
+        slow_query_log = SlowQueryLog.get_instance()
+        data = {
+            "enabled": slow_query_log.enabled,
+            "threshold_ms": slow_query_log.threshold * 1000,
+            "recorded": len(slow_query_log.entries),
+            "slow_queries": slow_query_log.top(limit),
+        }
+        self.response(resp, HTTPStatus.OK, data)
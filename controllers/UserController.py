@@ -80,7 +80,7 @@ class UserController(Controller):
 
         data = {
             "Bearer": token,
-            "session": Utils.serialize_model(session, recursive=True, recursiveLimit=3, blacklist=["device"])
+            "session": self.serialize_session(session)
         }
         self.response(resp, HTTPStatus.CREATED, data, message="Session started")
         resp.append_header("content_location", f"/users/{user.id}")
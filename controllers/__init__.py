@@ -3,10 +3,12 @@ from .DeviceController import DeviceController
 from .FileLocalController import FileLocalController
 from .FileS3Controller import FileS3Controller
 from .HealthCheckController import HealthCheckController
+from .MetricsController import MetricsController
 from .NotificationController import NotificationController
 from .PasswordRecoveryController import PasswordRecoveryController
 from .RoleController import RoleController
 from .SessionController import SessionController
+from .SlowQueryController import SlowQueryController
 from .StatusController import StatusController
 from .TestController import TestController
 from .UserController import UserController
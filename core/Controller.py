@@ -1,13 +1,20 @@
+import base64
+import binascii
 import json
-from datetime import datetime, time, timedelta, timezone
+from datetime import date, datetime, time, timedelta, timezone
 from http import HTTPStatus
 
 from falcon import code_to_http_status, falcon
 from falcon.request import Request
 from falcon.response import Response
+from sqlalchemy import inspect
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
 
+from core.classes.middleware.Authenticator import Authenticator
 from core.Hooks import Decorators, Hooks
-from core.Model import Model, String, and_
+from core.Model import Model, and_
+from core.Serializer import Serializer
 from core.Utils import Utils, logger
 from engine.Server import route_loader as ROUTE_LOADER
 from models.Session import Session
@@ -37,16 +44,30 @@ class Controller:
     PROBLEM_SAVING_TO_DB = "Internal Server Error - problem saving to database."
     INVALID_JSON = "Bad Request - Invalid JSON"
     ID_NOT_FOUND = "Not Found - Invalid ID"
+    INVALID_CURSOR = "Bad Request - Invalid cursor"
+
+    # Value of the cursor parameter to request the first page in keyset pagination mode
+    FIRST_PAGE_CURSOR = "first"
 
     def get_session(self, req: Request, resp: Response) -> Session | None:
-        session_id = req.context.token_data.get("session_id")
-        session = Session.get(Session.id == session_id)
+        session = Authenticator.get_session(req)
         if not session:
             self.response(resp, HTTPStatus.UNAUTHORIZED, error="Session not found")
             return
 
         return session
 
+    def serialize_session(self, session: Session) -> dict:
+        """
+        Serializes the session with its user and role for the session responses. If they are not loaded,
+        e.g. the session was just saved, the session is loaded again with them in a single query.
+        """
+        settings = {"recursive": True, "recursiveLimit": 3, "blacklist": ["device"]}
+        if session is not None and "user" in inspect(session).unloaded:
+            session = Session.get(session.id, options=Serializer.load_options(Session, **settings))
+
+        return Utils.serialize_model(session, **settings)
+
     def response(self, resp: Response, http_code=200, data=None, message=None, error=None, error_code=None):
         resp.status = code_to_http_status(http_code)
         if isinstance(data, list) and not data:
@@ -87,13 +108,13 @@ class Controller:
         return data
 
     def get_model_object(
-        self, req: Request, resp: Response, model: Model, id: int = None
+        self, req: Request, resp: Response, model: Model, id: int = None, options=None
     ):
         if not id:
             self.response(resp, HTTPStatus.METHOD_NOT_ALLOWED)
             return
 
-        row = model.get(id)
+        row = model.get(id, options=options)
         if not row:
             self.response(resp, HTTPStatus.NOT_FOUND, error=self.ID_NOT_FOUND)
             return
@@ -117,34 +138,50 @@ class Controller:
         If an ID is provided, it returns the model object with that ID.
         If query parameters are provided, it returns the model objects that match those parameters.
         If neither ID nor query parameters are provided, it returns all model objects with pagination.
+
+        Pagination is by page number (page, per_page) by default. With the cursor parameter it
+        switches to keyset pagination: cursor=first returns the first page and every page returns the
+        next_cursor to request the following one (None on the last page), no total count is calculated.
+        With count=estimate the total is taken from the table statistics instead of counting the rows,
+        only when no filter is applied, otherwise the rows are counted; the count field of the response
+        tells which one was used.
         """
         row = None
-        if not isinstance(filters, list):
-            query = [filters] if filters is not None else []
+        # Loads the relationships the serialization walks with the rows, instead of one lazy load per relationship per row
+        options = Serializer.load_options(model, recursive, recursiveLimit)
+        query = list(filters) if isinstance(filters, list) else [filters] if filters is not None else []
 
         if id:
             # if an ID is provided, get the model object with that ID
-            if row := self.get_model_object(req, resp, model, id):
+            if row := self.get_model_object(req, resp, model, id, options=options):
                 self.response(resp, HTTPStatus.OK, Utils.serialize_model(row, recursive=recursive, recursiveLimit=recursiveLimit))
 
             return
 
         if req.params:
             # if query parameters are provided, add the filters to the query
-            valid_params = [c.key for c in model.__table__.columns]
-            page_parameters = ["page", "per_page"]
+            page_parameters = ["page", "per_page", "cursor", "count"]
             for key, value in req.params.items():
-                if key in valid_params:
-                    column = getattr(model, key)
-                    if isinstance(column.type, String):
-                        query.append(column.like(f"%{value}%"))
-                    else:
-                        query.append(column == value)
-                elif key not in page_parameters:
+                if key in page_parameters:
+                    continue
+                # The operator is given as a suffix (?email__prefix=), the first operator of the field is the default
+                field, _, operator = key.partition("__")
+                valid_operators = model.get_filter_operators(field)
+                if not valid_operators:
                     # handle the case where an invalid parameter is provided
+                    valid_params = [c.key for c in model.__table__.columns] + list(model.search_fields)
                     valid_params_str = ', '.join(page_parameters+valid_params)
                     self.response(resp, HTTPStatus.BAD_REQUEST, error=f"Invalid query parameter: {key}. Valid parameters are: {valid_params_str}")
                     return
+                if operator and operator not in valid_operators:
+                    error = f"Invalid operator for {field}: {operator}. Valid operators are: {', '.join(valid_operators)}"
+                    self.response(resp, HTTPStatus.BAD_REQUEST, error=error)
+                    return
+                if isinstance(value, list):
+                    self.response(resp, HTTPStatus.BAD_REQUEST, error=f"Query parameter {key} must be given once")
+                    return
+
+                query.append(model.get_filter(field, operator or valid_operators[0], value))
 
         # Get the model objects using the filters provides if any and hanldes the pagination
         try:
@@ -160,21 +197,152 @@ class Controller:
             self.response(resp, HTTPStatus.BAD_REQUEST, error="Invalid value for page or per_page. Both must be greater than zero.")
             return
 
+        count = req.params.get("count", "exact")
+        if count not in ("exact", "estimate"):
+            self.response(resp, HTTPStatus.BAD_REQUEST, error="Invalid value for count. Valid values are: exact, estimate")
+            return
+
+        if "cursor" in req.params:
+            self.keyset_on_get(req, resp, model, query, join, order_by, per_page, count, recursive, recursiveLimit, options)
+            return
+
         offset = (page - 1) * per_page
-        row = model.get_all(filter=and_(*query), join=join, order_by=order_by, limit=per_page, offset=offset)
+        row = model.get_all(filter=and_(*query), join=join, order_by=order_by, limit=per_page, offset=offset, options=options)
 
         # calculate the total number of pages
-        total_records = model.count(filter=and_(*query))
+        total_records, count = self.count_rows(model, query, count)
         max_page = (total_records + per_page - 1) // per_page
         data = {
             "max_page": max_page,
             "actual_page": page,
             "per_page": per_page,
+            "count": count,
             "data": Utils.serialize_model(row, recursive=recursive, recursiveLimit=recursiveLimit)
         }
 
         self.response(resp, HTTPStatus.OK, data)
 
+    def keyset_on_get(
+        self,
+        req: Request,
+        resp: Response,
+        model: Model,
+        query: list,
+        join,
+        order_by,
+        per_page: int,
+        count: str,
+        recursive: bool,
+        recursiveLimit: int,
+        options=None
+    ):
+        """
+        Keyset pagination mode of generic_on_get, seeks on the (order column, id) of the last row
+        of the previous page given in the cursor.
+        """
+        if isinstance(order_by, list):
+            if len(order_by) > 1:
+                logger.warning(f"Keyset pagination of {model.__name__} only orders by its first order_by column")
+            order_by = order_by[0] if order_by else None
+
+        descending = False
+        order_column = order_by
+        if isinstance(order_by, UnaryExpression):
+            descending = order_by.modifier is operators.desc_op
+            order_column = order_by.element
+        column = getattr(order_column, "expression", order_column)
+        if order_column is None:
+            order_column = model.id
+        elif getattr(column, "table", None) is not model.__table__ or column.nullable:
+            # The cursor stores the value of the row and compares it with a tuple, a column of a joined
+            # model can not be read from the row and NULL values would be skipped
+            logger.warning(f"Keyset pagination of {model.__name__} can not seek on {column}, ordering by id")
+            order_column = model.id
+        else:
+            # Use the mapped attribute, so the id column is recognized as the order column
+            order_column = getattr(model, column.key)
+
+        after = None
+        if req.params["cursor"] != self.FIRST_PAGE_CURSOR:
+            after = self.decode_cursor(req.params["cursor"], order_column)
+            if after is None:
+                self.response(resp, HTTPStatus.BAD_REQUEST, error=self.INVALID_CURSOR)
+                return
+
+        # One extra row tells if there is a next page
+        rows = model.get_all_after(
+            after=after,
+            order_column=order_column,
+            descending=descending,
+            limit=per_page + 1,
+            filter=and_(*query) if query else None,
+            join=join,
+            options=options
+        )
+        next_cursor = None
+        if len(rows) > per_page:
+            rows = rows[:per_page]
+            next_cursor = self.encode_cursor(rows[-1], order_column)
+
+        data = {
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "data": Utils.serialize_model(rows, recursive=recursive, recursiveLimit=recursiveLimit)
+        }
+        if count == "estimate":
+            total, count = self.count_rows(model, query, count)
+            data["count"] = count
+            data["estimated_total" if count == "estimate" else "total"] = total
+
+        self.response(resp, HTTPStatus.OK, data)
+
+    @staticmethod
+    def count_rows(model: Model, query: list, count: str) -> tuple[int, str]:
+        """
+        Returns the total of rows that match *query* and how it was calculated: "estimate" from the table
+        statistics, only without filters and when they can be read, or "exact" counting the rows.
+        """
+        if count == "estimate" and not query:
+            total = model.estimate_count()
+            if total is not None:
+                return total, "estimate"
+
+        return model.count(filter=and_(*query)), "exact"
+
+    @staticmethod
+    def encode_cursor(row: Model, order_column) -> str:
+        """
+        Returns the opaque cursor that points after *row*: the urlsafe base64 of the JSON [order value, id].
+        """
+        value = getattr(row, order_column.key)
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        cursor = json.dumps([value, row.id], default=str, separators=(",", ":"))
+        return base64.urlsafe_b64encode(cursor.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str, order_column):
+        """
+        Returns the (order value, id) stored in *cursor* with the value converted to the type of *order_column*,
+        None if the cursor is not valid.
+        """
+        try:
+            padding = "=" * (-len(cursor) % 4)
+            value, id = json.loads(base64.urlsafe_b64decode(cursor + padding))
+            if not isinstance(id, int):
+                return
+
+            python_type = order_column.type.python_type
+            if value is not None and not isinstance(value, python_type):
+                if python_type in (datetime, date):
+                    value = python_type.fromisoformat(value)
+                else:
+                    value = python_type(value)
+
+            return value, id
+        except (binascii.Error, ValueError, TypeError, NotImplementedError):
+            return
+
     def generic_on_post(self, req: Request, resp: Response, model: Model, content_location, id: int = None, data=None, extra_data: dict = None):
         if extra_data is None:
             extra_data = {}
@@ -2,13 +2,15 @@ from typing import List, Optional
 
 from sqlalchemy import (CHAR, BigInteger, Boolean, Date, DateTime, Float,
                         ForeignKey, Integer, SmallInteger, String, Text, and_,
-                        distinct, func, or_, select)
+                        distinct, func, or_, select, text, tuple_)
 from sqlalchemy.dialects import mysql
-from sqlalchemy.orm import Mapped, exc, mapped_column, relationship
+from sqlalchemy.orm import (Mapped, exc, joinedload, mapped_column, relationship,
+                            selectinload)
 from sqlalchemy.orm.util import has_identity, was_deleted
 from sqlalchemy.sql import func
 from sqlalchemy.sql.expression import Select
 
+from core.classes.ReferenceCache import ReferenceCache
 from core.database import Base
 from core.database import db_session as DB
 from core.database import engine
@@ -22,8 +24,79 @@ class Model:
     get one, get all, delete and save. The Model class inherits new models.
     """
 
-    def get_formatters(self):
-        return {attribute.name: Utils.date_formatter for attribute in self.__table__.columns if attribute.type.python_type in (datetime, date)}
+    # Operators that generic_on_get allows to filter each column by, the first one is used when
+    # the query parameter has no operator (?email=), any other is selected with ?email__prefix=.
+    # "contains" (a leading wildcard, always a full scan) is only allowed for the columns declared here
+    filter_strategies: dict = {}
+    # Virtual query parameters searched with MATCH ... AGAINST over the columns of a FULLTEXT index
+    search_fields: dict = {}
+
+    # Seconds the rows are kept in the ReferenceCache by get_cached() and cached(), 0 does not cache them.
+    # Only for small tables that rarely change, the rows are shared by every request of the process
+    cache_ttl: float = 0
+
+    # Operators of the columns not declared in filter_strategies
+    DEFAULT_STRING_FILTER = ("exact", "prefix")
+    DEFAULT_FILTER = ("exact",)
+
+    FILTER_OPERATORS = {
+        # Can use an index
+        "exact": lambda column, value: column == value,
+        # Can use an index, it is a range scan over the values starting with the prefix
+        "prefix": lambda column, value: column.like(f"{Model.escape_like(value)}%", escape="\\"),
+        # Leading wildcard, always a full scan
+        "contains": lambda column, value: column.like(f"%{Model.escape_like(value)}%", escape="\\"),
+    }
+
+    @classmethod
+    def get_filter_operators(cls, field: str) -> Optional[tuple]:
+        """
+        Returns the operators allowed to filter *field* by, the first one is the default. None if it is not a field of the model.
+        """
+        if field in cls.search_fields:
+            return ("search",)
+        if field not in cls.__table__.columns.keys():
+            return
+        if field in cls.filter_strategies:
+            return cls.filter_strategies[field]
+
+        return cls.DEFAULT_STRING_FILTER if isinstance(cls.__table__.columns[field].type, String) else cls.DEFAULT_FILTER
+
+    @classmethod
+    def get_filter(cls, field: str, operator: str, value):
+        """
+        Returns the expression to filter *field* by *value* with *operator*.
+
+        Parameters
+        ----------
+        field : `str`
+            A column of the model or a key of search_fields.
+        operator : `str`
+            One of the operators returned by get_filter_operators.
+        value : `str`
+            The value to filter by.
+
+        Returns
+        -------
+        `expr`
+            The expression to use in the where clause.
+        """
+        if operator == "search":
+            columns = [getattr(cls, column) for column in cls.search_fields[field]]
+            return mysql.match(*columns, against=value)
+
+        return cls.FILTER_OPERATORS[operator](getattr(cls, field), value)
+
+    @staticmethod
+    def escape_like(value: str) -> str:
+        """
+        Escapes the LIKE wildcards of *value*, so they are matched literally.
+        """
+        return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    @classmethod
+    def get_formatters(cls):
+        return {attribute.name: Utils.date_formatter for attribute in cls.__table__.columns if attribute.type.python_type in (datetime, date)}
 
     def exists_in_database(self):
         """
@@ -61,7 +134,7 @@ class Model:
                 file.delete_file_from_local()
 
     @classmethod
-    def get(cls, value, filter=None, deleted=False, join=None, order_by=None):
+    def get(cls, value, filter=None, deleted=False, join=None, order_by=None, options=None, session=None):
         """
         The get() method can process a query with some parameters to get a response.
 
@@ -77,6 +150,10 @@ class Model:
             A list of model to join the query with. None by default.
         order_by : `expr`
                 None by default.
+        options : `list`
+                Loader options to apply to the query, e.g. joinedload(Model.relation). None by default.
+        session : `Session`
+                The session that runs the query, the session of the request by default.
         with_for_update  :  `bool`
                 False by default.
 
@@ -98,11 +175,50 @@ class Model:
         query = query.where(cls.id == value) if isinstance(value, int) else query.where(value)
         if order_by is not None:
             query = query.order_by(order_by)
+        if options:
+            query = query.options(*options)
+
+        return (session or DB).scalars(query).first()
+
+    @classmethod
+    def get_cached(cls, id: int):
+        """
+        The get_cached() method returns the row with *id* from the ReferenceCache, querying it only on a miss.
+        Without a cache_ttl it is the same as get().
+
+        Parameters
+        ----------
+        id  :  `int`
+                The id of the row.
 
-        return DB.scalars(query).first()
+        Returns
+        ----------
+        `object`
+            The row, in the session of the caller, or None."""
+        return cls.cached(("id", id), lambda session, options: cls.get(id, options=options, session=session))
 
     @classmethod
-    def get_all(cls, filter=None, limit=None, offset=None, order_by=None, deleted=False, join=None, left_join=False, attributes=None):
+    def cached(cls, key, loader):
+        """
+        The cached() method returns the row cached in *key* from the ReferenceCache, calling loader(session, options)
+        on a miss.
+
+        Parameters
+        ----------
+        key  :  `hashable`
+                Identifies the row between the cached rows of the model, e.g. "actual_version".
+        loader  :  `function`
+                Receives a session of its own and the loader options of the cached rows, and returns the row
+                queried with that session.
+
+        Returns
+        ----------
+        `object`
+            The row, in the session of the caller, or None."""
+        return ReferenceCache.get_instance().get(cls, key, loader)
+
+    @classmethod
+    def get_all(cls, filter=None, limit=None, offset=None, order_by=None, deleted=False, join=None, left_join=False, attributes=None, options=None):
         """
         The get_all() method process a query and returns all found values.
 
@@ -124,6 +240,8 @@ class Model:
             If the join should be done as left outer join. False by default.
         attributes : `list`
             List of SQLAlchemy column objects to select. Selects all attributes if None.
+        options : `list`
+            Loader options to apply to the query, e.g. Serializer.load_options(). None by default.
 
         Returns
         -------
@@ -154,14 +272,90 @@ class Model:
             query = query.limit(limit)
         if offset is not None:
             query = query.offset(offset)
+        if options:
+            query = query.options(*options)
 
         return DB.scalars(query).all()
 
+    @classmethod
+    def get_all_after(cls, after=None, order_column=None, descending=False, limit=50, filter=None, join=None, options=None):
+        """
+        The get_all_after() method returns a page of rows using keyset (cursor) pagination:
+        instead of an offset, it seeks the rows that come after the (order column, id) values of the last row
+        of the previous page, so its cost does not grow with the page number.
+
+        Parameters
+        ----------
+        after : `tuple`
+            The (order column value, id) of the last row of the previous page. None for the first page.
+        order_column : `Column`
+            The column to order by, the id column by default. The id is always used to break ties.
+        descending : `bool`
+            If the order is descending. False by default.
+        limit : `int`
+            Max number of rows to return.
+        filter : `expr`
+            A parameter to filter the query, None by default.
+        join : `Model`
+            A list of model to join the query with. None by default.
+        options : `list`
+            Loader options to apply to the query. None by default.
+
+        Returns
+        -------
+        `list`
+            The rows of the page.
+        """
+        if order_column is None:
+            order_column = cls.id
+        filters = [filter] if filter is not None else []
+        if after is not None:
+            value, id = after
+            if order_column is cls.id:
+                filters.append(cls.id < id if descending else cls.id > id)
+            else:
+                # Row value comparison, MySQL resolves it as a range over the (order column, id) index
+                row_values, after_values = tuple_(order_column, cls.id), tuple_(value, id)
+                filters.append(row_values < after_values if descending else row_values > after_values)
+
+        if order_column is cls.id:
+            order_by = cls.id.desc() if descending else cls.id
+        else:
+            order_by = [order_column.desc(), cls.id.desc()] if descending else [order_column, cls.id]
+
+        return cls.get_all(filter=and_(*filters) if filters else None, limit=limit, order_by=order_by, join=join, options=options)
+
+    @classmethod
+    def estimate_count(cls):
+        """
+        The estimate_count() method returns the approximate number of rows of the table from the
+        table statistics, without scanning it. Filters are not taken into account, so it is only
+        meant for unfiltered listings.
+
+        Returns
+        -------
+        `int`
+            The approximate number of rows of the table, None if it could not be read.
+        """
+        try:
+            if DB.get_bind().dialect.name != "mysql":
+                return cls.count()
+            query = text(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name"
+            )
+            return DB.execute(query, {"table_name": cls.__tablename__}).scalar() or 0
+        except Exception as exc:
+            logger.error(exc)
+            return None
+
     def save(self):
         try:
             DB.add(self)
             DB.flush()
             DB.commit()
+            if self.cache_ttl:
+                ReferenceCache.get_instance().invalidate(type(self))
             return True
         except Exception as exc:
             DB.rollback()
@@ -201,6 +395,8 @@ class Model:
         try:
             DB.delete(self)
             DB.commit()
+            if self.cache_ttl:
+                ReferenceCache.get_instance().invalidate(type(self))
             return True
         except Exception as exc:
             DB.rollback()
@@ -215,6 +411,8 @@ class Model:
             DB.execute(query)
             DB.flush()
             DB.commit()
+            if cls.cache_ttl:
+                ReferenceCache.get_instance().invalidate(cls)
             return True
         except Exception as exc:
             logger.error(exc)
@@ -286,7 +484,7 @@ class Model:
             return False
 
     @classmethod
-    def max(cls, field, filter=None):
+    def max(cls, field, filter=None, session=None):
         """
         The max() method process a query and returns the max value of a field.
 
@@ -296,6 +494,8 @@ class Model:
             A string for field of model.
         filter : `None`
             None by default.
+        session : `Session`
+            The session that runs the query, the session of the request by default.
 
         Returns
         -------
@@ -309,7 +509,7 @@ class Model:
                 if filter is not None:
                     query = query.where(filter)
 
-                return DB.scalar(query)
+                return (session or DB).scalar(query)
         except Exception as exc:
             logger.error(exc)
             return False
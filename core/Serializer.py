@@ -0,0 +1,192 @@
+from sqlalchemy.orm import joinedload, selectinload
+
+class SerializerPlan:
+    """
+    Flat description of how to serialize instances of a model: the columns to read with their
+    formatter and the relationships to walk with the settings of the plan of the related instances.
+    """
+    __slots__ = ("columns", "relations")
+
+    def __init__(self, columns: list, relations: list):
+        # [(column_name, formatter or None)]
+        self.columns = columns
+        # [(relation_name, child_depth, child_blacklist, {model class: SerializerPlan})]
+        self.relations = relations
+
+    def run(self, object) -> dict:
+        result = {}
+        for name, formatter in self.columns:
+            value = getattr(object, name)
+            if formatter is not None and value:
+                value = formatter(value)
+            result[name] = value
+
+        for name, depth, blacklist, plans in self.relations:
+            value = getattr(object, name)
+            if not value:
+                result[name] = [] if isinstance(value, list) else None
+            elif isinstance(value, list):
+                result[name] = [Serializer.child_plan(plans, type(item), depth, blacklist).run(item) for item in value]
+            else:
+                # A related instance uses its own blacklist if its model has one
+                child_blacklist = getattr(value, "blacklist", blacklist)
+                result[name] = Serializer.child_plan(plans, type(value), depth, child_blacklist).run(value)
+
+        return result
+
+
+class Serializer:
+    """
+    Compiles and caches a SerializerPlan per (model, depth, blacklist, attributes_blacklist),
+    so the model introspection done by Utils.serialize_model happens once per model instead of once per row.
+    """
+
+    _plans: dict = {}
+    _load_options: dict = {}
+
+    @staticmethod
+    def serialize(object, recursive=False, formatters=None, recursiveLimit=2, blacklist=None, attributes_blacklist=None):
+        """
+        Same contract as Utils.serialize_model
+        """
+        if not object:
+            if isinstance(object, list):
+                return []
+            return
+
+        if isinstance(object, list):
+            plans = {}
+            return [
+                Serializer.get_plan(type(item), recursive, recursiveLimit, blacklist, attributes_blacklist, formatters, plans).run(item)
+                for item in object
+            ]
+
+        return Serializer.get_plan(type(object), recursive, recursiveLimit, blacklist, attributes_blacklist, formatters).run(object)
+
+    @staticmethod
+    def get_plan(model, recursive=False, recursiveLimit=2, blacklist=None, attributes_blacklist=None, formatters=None, local_plans=None):
+        """
+        Returns the SerializerPlan of *model*, compiling it the first time.
+
+        Parameters
+        ----------
+        model : `Model subclass`
+                The model of the instances to serialize.
+        local_plans : `dict`
+                Optional dict to memoize the plan for the lifetime of a single serialize call.
+
+        Returns
+        -------
+        `SerializerPlan`
+            The plan to serialize the instances of the model.
+        """
+        if local_plans is not None and (plan := local_plans.get(model)):
+            return plan
+
+        if blacklist is None:
+            blacklist = getattr(model, "blacklist", set())
+        if attributes_blacklist is None:
+            attributes_blacklist = getattr(model, "attributes_blacklist", set())
+        depth = recursiveLimit if recursive and recursiveLimit > 1 else 1
+
+        if formatters is not None:
+            # Custom formatters are given per call, their plans are not cached
+            plan = Serializer.compile(model, depth, frozenset(blacklist), frozenset(attributes_blacklist), formatters)
+        else:
+            key = (model, depth, frozenset(blacklist), frozenset(attributes_blacklist))
+            plan = Serializer._plans.get(key)
+            if plan is None:
+                plan = Serializer._plans[key] = Serializer.compile(model, *key[1:])
+
+        if local_plans is not None:
+            local_plans[model] = plan
+        return plan
+
+    @staticmethod
+    def child_plan(plans: dict, model, depth: int, blacklist) -> SerializerPlan:
+        plan = plans.get(model)
+        if plan is None:
+            plan = plans[model] = Serializer.get_plan(model, True, depth, blacklist)
+        return plan
+
+    @staticmethod
+    def compile(model, depth: int, blacklist: frozenset, attributes_blacklist: frozenset, formatters=None) -> SerializerPlan:
+        if formatters is None:
+            formatters = model.formatters if hasattr(model, "formatters") else model.get_formatters()
+
+        columns = [
+            (column, formatters.get(column))
+            for column in model.__table__.columns.keys()
+            if column != "password" and column not in attributes_blacklist
+        ]
+
+        relations = []
+        if depth > 1:
+            relations = [
+                (relation, depth - 1, blacklist, {})
+                for relation in model.__mapper__.relationships.keys()
+                if relation not in blacklist
+            ]
+
+        return SerializerPlan(columns, relations)
+
+    @staticmethod
+    def load_options(model, recursive=False, recursiveLimit=2, blacklist=None) -> list:
+        """
+        Returns the loader options that load every relationship the serialization of *model* walks
+        with these settings, so the rows and their relationships are loaded with a constant number of queries
+        instead of one lazy load per relationship per row.
+        Many-to-one relationships are joined in the same query, collections use one SELECT ... IN per level.
+
+        Parameters
+        ----------
+        model : `Model subclass`
+                The model of the instances to serialize.
+        recursive, recursiveLimit, blacklist :
+                The same values given to Utils.serialize_model.
+
+        Returns
+        -------
+        `list`
+            The options to give to Model.get or Model.get_all, empty if nothing is walked.
+        """
+        if blacklist is None:
+            blacklist = getattr(model, "blacklist", set())
+        depth = recursiveLimit if recursive and recursiveLimit > 1 else 1
+        key = (model, depth, frozenset(blacklist))
+        options = Serializer._load_options.get(key)
+        if options is None:
+            options = Serializer._load_options[key] = Serializer.compile_load_options(model, depth, blacklist)
+
+        return options
+
+    @staticmethod
+    def compile_load_options(model, depth: int, blacklist) -> list:
+        if depth <= 1:
+            return []
+
+        options = []
+        for name, relationship in model.__mapper__.relationships.items():
+            if name in blacklist or relationship.lazy in ("dynamic", "write_only", "noload"):
+                continue
+
+            child_model = relationship.mapper.class_
+            attribute = getattr(model, name)
+            if relationship.uselist:
+                loader = selectinload(attribute)
+                # Items of a collection are serialized with the blacklist of the parent
+                child_blacklist = blacklist
+            else:
+                loader = joinedload(attribute)
+                child_blacklist = getattr(child_model, "blacklist", blacklist)
+
+            if child_options := Serializer.compile_load_options(child_model, depth - 1, child_blacklist):
+                loader = loader.options(*child_options)
+            options.append(loader)
+
+        return options
+
+    @staticmethod
+    def clear():
+        Serializer._plans.clear()
+        Serializer._load_options.clear()
@@ -6,11 +6,16 @@ import os
 import random
 import re
 import string
+import time
 from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
 
 import pytz
 from dateutil.parser import parse
 
+from core.Serializer import Serializer
+
 
 def timetz(*args):
     return datetime.now(pytz.timezone("UTC")).timetuple()
@@ -21,6 +26,21 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - [ %(levelname)s ]:
 logging.Formatter.converter = timetz
 logger = logging.getLogger(__name__)
 
+# Timezone used to present dates, resolved once
+LOCAL_TIMEZONE = ZoneInfo("America/Mexico_City")
+# Day of the month in LOCAL_TIMEZONE and the UTC timestamp of the next local midnight, when it must be recomputed
+_local_today = {"day": None, "expires": 0.0}
+
+
+@lru_cache(maxsize=8192)
+def _local_isoformat(value: datetime) -> str:
+    """
+    Memoized UTC-0 (or aware) datetime to LOCAL_TIMEZONE iso string, rows repeat the same timestamps a lot.
+    """
+    if not value.tzinfo:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(LOCAL_TIMEZONE).isoformat(timespec="seconds")
+
 
 class Utils:
     @staticmethod
@@ -93,6 +113,19 @@ class Utils:
 
         return date.astimezone(pytz.utc)
 
+    @staticmethod
+    def today_day_in_tz():
+        """
+        Return the day of the month of today in LOCAL_TIMEZONE.
+        It is only computed again once the local midnight has passed.
+        """
+        if time.time() >= _local_today["expires"]:
+            today = datetime.now(LOCAL_TIMEZONE)
+            next_midnight = (today + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            _local_today["day"] = today.day
+            _local_today["expires"] = next_midnight.timestamp()
+        return _local_today["day"]
+
     @staticmethod
     def date_formatter(value):
         """
@@ -111,21 +144,18 @@ class Utils:
         if isinstance(value, date) and not isinstance(value, datetime):
             value = datetime(value.year, value.month, value.day)
 
-        today = Utils.today_in_tz()
+        if not isinstance(value, datetime):
+            return value
+
         if (
-            isinstance(value, datetime)
-            and value.hour == 0
+            value.hour == 0
             and value.minute == 0
             and value.second == 0
-            and value.day == today.day
+            and value.day == Utils.today_day_in_tz()
         ):
             return value.isoformat(timespec="seconds")
 
-        if not isinstance(value, datetime):
-            return value
-
-        local_time = Utils.change_datetime_timezone_from_utc0_to_another(value)
-        return local_time.isoformat(timespec="seconds")
+        return _local_isoformat(value)
 
     @staticmethod
     def get_hashed_string(data: str) -> str:
@@ -159,6 +189,7 @@ class Utils:
         Take an object that can be a model instance or a model instances list
         and serialize it in a dictionary recursively, which means that serialization
         will contain model relations. Recursive serilization limit is given by *recursiveLimit*.
+        The model introspection is compiled once per model and settings into a cached plan, see core.Serializer.
 
         Parameters
         ----------
@@ -181,52 +212,14 @@ class Utils:
         -------
         `dict`
             A dictionary with serialized data."""
-        if not object:
-            if isinstance(object, list):
-                return []
-            return
-
-        if isinstance(object, list):
-            return [
-                Utils.serialize_model(
-                    item,
-                    recursive,
-                    formatters,
-                    recursiveLimit=recursiveLimit,
-                    blacklist=blacklist,
-                    attributes_blacklist=attributes_blacklist,
-                )
-                for item in object
-            ]
-
-        result = {}
-        if blacklist is None:
-            blacklist = getattr(object, 'blacklist', set())
-        if attributes_blacklist is None:
-            attributes_blacklist = getattr(object, 'attributes_blacklist', set())
-        if formatters is None:
-            formatters = getattr(object, "formatters", object.get_formatters())
-        for c in object.__table__.columns.keys():
-            if c == "password" or c in attributes_blacklist:
-                continue
-            value = getattr(object, str(c))
-            if c in formatters and value:
-                value = formatters[c](value)
-            result[c] = value
-        if recursive and recursiveLimit > 1:
-            limit = recursiveLimit - 1
-            for relation in object.__mapper__.relationships.keys():
-                if relation not in blacklist:
-                    recursiveObj = getattr(object, relation)
-                    blacklistModel = getattr(recursiveObj, "blacklist", blacklist)
-                    result[relation] = Utils.serialize_model(
-                        recursiveObj,
-                        recursive,
-                        recursiveLimit=limit,
-                        blacklist=blacklistModel,
-                    )
-
-        return result
+        return Serializer.serialize(
+            object,
+            recursive,
+            formatters,
+            recursiveLimit=recursiveLimit,
+            blacklist=blacklist,
+            attributes_blacklist=attributes_blacklist,
+        )
 
     @staticmethod
     def float_formatter(value):
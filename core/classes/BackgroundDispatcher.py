@@ -0,0 +1,149 @@
+import atexit
+import configparser
+import os
+import queue
+import threading
+import time
+
+from core.database import db_session as DB
+from core.Utils import Utils, logger
+
+
+class BackgroundDispatcher:
+    """
+    Runs jobs out of the request, e.g. sending a notification right away, in a small set of worker threads
+    fed by a bounded queue. Jobs should receive ids instead of model instances, every job runs with its own
+    database session that is removed when the job ends.
+
+    When the queue is full the job runs in the caller (backpressure) instead of growing the queue without limit.
+    With 0 workers, and always on Lambda where the process is frozen between requests, jobs run in the caller.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, workers: int = 2, queue_size: int = 1000):
+        """
+        :param workers: Number of worker threads, 0 runs every job in the caller.
+        :param queue_size: Max number of jobs waiting for a worker.
+        """
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    @staticmethod
+    def get_instance() -> "BackgroundDispatcher":
+        """
+        Returns the dispatcher of the process, configured with the DISPATCHER section of the config file.
+        """
+        if BackgroundDispatcher._instance is None:
+            with BackgroundDispatcher._instance_lock:
+                if BackgroundDispatcher._instance is None:
+                    config = configparser.ConfigParser()
+                    config.read(Utils.get_config_ini_file_path())
+                    workers = config.getint("DISPATCHER", "workers", fallback=2)
+                    if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+                        workers = 0
+                    BackgroundDispatcher._instance = BackgroundDispatcher(
+                        workers=workers,
+                        queue_size=config.getint("DISPATCHER", "queue_size", fallback=1000),
+                    )
+                    atexit.register(BackgroundDispatcher._instance.shutdown)
+
+        return BackgroundDispatcher._instance
+
+    def submit(self, function, *args, **kwargs) -> bool:
+        """
+        Queues function(*args, **kwargs) to run in a worker.
+
+        :return: True if the job was queued, False if it ran in the caller.
+        """
+        if self.workers <= 0 or self._stopping:
+            self._run(function, args, kwargs, remove_session=False)
+            return False
+
+        self._start()
+        try:
+            self._queue.put_nowait((function, args, kwargs))
+            return True
+        except queue.Full:
+            logger.warning(f"[DISPATCHER] Queue full, running {function.__qualname__} in the request")
+            self._run(function, args, kwargs, remove_session=False)
+            return False
+
+    def try_submit(self, function, *args, **kwargs) -> bool:
+        """
+        Queues function(*args, **kwargs) to run in a worker, for optional jobs that must never run in the caller.
+
+        :return: True if the job was queued, False if it was dropped (no workers, stopping or queue full).
+        """
+        if self.workers <= 0 or self._stopping:
+            return False
+
+        self._start()
+        try:
+            self._queue.put_nowait((function, args, kwargs))
+            return True
+        except queue.Full:
+            return False
+
+    def pending(self) -> int:
+        """
+        Returns the number of jobs waiting for a worker.
+        """
+        return self._queue.qsize()
+
+    def shutdown(self, timeout: float = 30):
+        """
+        Stops accepting jobs and waits up to *timeout* seconds for the workers to finish the queued ones.
+        """
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+            threads = list(self._threads)
+
+        deadline = time.monotonic() + timeout
+        for _ in threads:
+            try:
+                self._queue.put(None, timeout=max(0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for thread in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+
+        if pending := self.pending():
+            logger.warning(f"[DISPATCHER] Shutdown timed out with {pending} jobs not run")
+
+    def _start(self):
+        if self._threads:
+            return
+
+        with self._lock:
+            if self._threads or self._stopping:
+                return
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"dispatcher-{number}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._run(*job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, function, args, kwargs, remove_session=True):
+        try:
+            function(*args, **kwargs)
+        except Exception as exc:
+            logger.exception(f"[DISPATCHER] Error running {function.__qualname__}: {exc}")
+        finally:
+            if remove_session:
+                DB.remove()
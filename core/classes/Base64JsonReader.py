@@ -0,0 +1,281 @@
+import base64
+import binascii
+import json
+
+
+class InvalidBase64Json(Exception):
+    """Exception raised when a base64 upload is not a JSON object or its file is not valid base64"""
+
+    def __init__(self, reason: str):
+        self.message = f"Invalid base64 upload: {reason}."
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class Base64JsonReader:
+    """
+    A file-like object that reads the file of a JSON body like {"file_name": "a.png", "base64": "iVBO..."}
+    from *stream* as it is received: read() returns the decoded content of the base64 field, so it can be written
+    to a StagedUpload in chunks without holding the body, the base64 text or the file in memory.
+
+    The other fields of the object are parsed as they are found and are in *fields* once read() returned b"".
+    Only the top level object is scanned incrementally, the other values are small and parsed with json.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    # filetype needs the first 261 bytes of a file to guess its type
+    HEAD_SIZE = 262
+    MAX_FIELD_SIZE = 64 * 1024
+
+    _WHITESPACE = b" \t\r\n"
+    _BASE64_ESCAPES = {ord("/"): b"/", ord("n"): b"", ord("r"): b"", ord("t"): b""}
+
+    def __init__(self, stream, field: str = "base64", check_head=None, chunk_size: int = CHUNK_SIZE):
+        """
+        :param stream: The body of the request, a file-like object with a read(size) method.
+        :param field: The field with the file in base64.
+        :param check_head: A function called once with the first HEAD_SIZE bytes of the file (or all of them if
+                           it is smaller) before the rest is read, e.g. to reject the file by its type by raising.
+                           It is not called if the body has no *field*.
+                           What it returns is kept in *head_result*.
+        :param chunk_size: Bytes of the body read at a time.
+        """
+        self.stream = stream
+        self.field = field
+        self.check_head = check_head
+        self.chunk_size = chunk_size
+        self.fields = {}
+        self.found = False
+        self.head_result = None
+
+        self._buffer = b""
+        self._state = self._start
+        self._key = None
+        self._value = bytearray()
+        self._pending = b""
+        self._output = bytearray()
+        self._head_checked = check_head is None
+        self._eof = False
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Returns up to *size* bytes of the decoded file, b"" when the whole body was read.
+        """
+        if not self._head_checked:
+            self._fill(self.HEAD_SIZE)
+            self._head_checked = True
+            if self.found:
+                self.head_result = self.check_head(bytes(self._output[:self.HEAD_SIZE]))
+
+        size = self.chunk_size if size is None or size < 0 else size
+        self._fill(size)
+        data = bytes(self._output[:size])
+        del self._output[:size]
+        return data
+
+    def _fill(self, size: int):
+        while len(self._output) < size and not self._eof:
+            chunk = self.stream.read(self.chunk_size)
+            if not chunk:
+                self._eof = True
+                if self._state != self._done:
+                    raise InvalidBase64Json("the JSON ended before the object was closed")
+                return
+
+            self._buffer += chunk
+            position = 0
+            while position < len(self._buffer):
+                next_position = self._state(position)
+                if next_position is None:
+                    # Needs more data
+                    break
+                position = next_position
+            self._buffer = self._buffer[position:]
+
+    # Each state consumes from self._buffer starting at *position* and returns where it stopped, or None if
+    # it needs the next chunk to go on, in which case the buffer is kept from *position*.
+
+    def _skip_whitespace(self, position: int) -> int:
+        while position < len(self._buffer) and self._buffer[position] in self._WHITESPACE:
+            position += 1
+        return position
+
+    def _start(self, position: int):
+        position = self._skip_whitespace(position)
+        if position == len(self._buffer):
+            return position
+        if self._buffer[position] != ord("{"):
+            raise InvalidBase64Json("the body must be a JSON object")
+
+        self._state = self._key_or_end
+        return position + 1
+
+    def _key_or_end(self, position: int):
+        position = self._skip_whitespace(position)
+        if position == len(self._buffer):
+            return position
+        if self._buffer[position] == ord("}") and not self.fields and not self.found:
+            self._state = self._done
+            return position + 1
+        if self._buffer[position] != ord('"'):
+            raise InvalidBase64Json("expected the name of a field")
+
+        self._value.clear()
+        self._state = self._key_string
+        return position
+
+    def _key_string(self, position: int):
+        end = self._scan_value(position)
+        if end is None:
+            # The value continues in the next chunk, what was read is already copied to it
+            return len(self._buffer)
+
+        self._key = json.loads(bytes(self._value))
+        self._value.clear()
+        self._state = self._colon
+        return end
+
+    def _colon(self, position: int):
+        position = self._skip_whitespace(position)
+        if position == len(self._buffer):
+            return position
+        if self._buffer[position] != ord(":"):
+            raise InvalidBase64Json("expected ':' after the name of a field")
+
+        self._state = self._value_start
+        return position + 1
+
+    def _value_start(self, position: int):
+        position = self._skip_whitespace(position)
+        if position == len(self._buffer):
+            return position
+
+        if self._key == self.field:
+            if self._buffer[position] != ord('"'):
+                raise InvalidBase64Json(f"'{self.field}' must be a string")
+            self.found = True
+            self._state = self._base64_string
+            return position + 1
+
+        self._value.clear()
+        self._state = self._value_raw
+        return position
+
+    def _value_raw(self, position: int):
+        end = self._scan_value(position)
+        if end is None:
+            # The value continues in the next chunk, what was read is already copied to it
+            return len(self._buffer)
+
+        try:
+            self.fields[self._key] = json.loads(bytes(self._value))
+        except ValueError as exc:
+            raise InvalidBase64Json(f"invalid value of '{self._key}'") from exc
+        self._value.clear()
+        self._state = self._comma_or_end
+        return end
+
+    def _scan_value(self, position: int):
+        """
+        Copies a JSON value to self._value until it ends: the closing quote of a string or, for other values,
+        a ',' or '}' out of any string, object or array. Returns the position after it or None if it continues
+        in the next chunk.
+        """
+        value = self._value
+        # The state of the scan is recalculated from the value copied so far, values are small
+        in_string, escaped, depth = False, False, 0
+        for byte in value:
+            in_string, escaped, depth = self._scan_byte(byte, in_string, escaped, depth)
+
+        is_string = bool(value) and value[0] == ord('"') or not value and self._buffer[position] == ord('"')
+        for index in range(position, len(self._buffer)):
+            byte = self._buffer[index]
+            if not in_string and depth == 0 and value and (byte in b",}" or byte in self._WHITESPACE and not is_string):
+                return index
+            value.append(byte)
+            if len(value) > self.MAX_FIELD_SIZE:
+                raise InvalidBase64Json(f"the value of '{self._key}' is too large")
+            in_string, escaped, depth = self._scan_byte(byte, in_string, escaped, depth)
+            if is_string and not in_string and len(value) > 1:
+                return index + 1
+
+        return None
+
+    @staticmethod
+    def _scan_byte(byte: int, in_string: bool, escaped: bool, depth: int):
+        if escaped:
+            return in_string, False, depth
+        if in_string:
+            if byte == ord("\\"):
+                return True, True, depth
+            return byte != ord('"'), False, depth
+        if byte == ord('"'):
+            return True, False, depth
+        if byte in b"{[":
+            return False, False, depth + 1
+        if byte in b"}]":
+            return False, False, depth - 1
+        return False, False, depth
+
+    def _base64_string(self, position: int):
+        buffer = self._buffer
+        end = len(buffer)
+        quote = buffer.find(b'"', position)
+        backslash = buffer.find(b"\\", position)
+        stop = min(index for index in (quote, backslash, end) if index >= 0)
+        if stop > position:
+            self._decode(buffer[position:stop])
+
+        if stop == end:
+            return end
+        if stop == quote:
+            self._decode(b"", final=True)
+            self._state = self._comma_or_end
+            return stop + 1
+
+        # Some encoders escape '/' or wrap the base64 in lines
+        if stop + 1 == end:
+            return None if stop == position else stop
+        escape = self._BASE64_ESCAPES.get(buffer[stop + 1])
+        if escape is None:
+            raise InvalidBase64Json(f"'{self.field}' is not valid base64")
+        self._decode(escape)
+        return stop + 2
+
+    def _decode(self, text: bytes, final: bool = False):
+        text = self._pending + text
+        if final:
+            # The padding is optional
+            text += b"=" * (-len(text) % 4)
+            length = len(text)
+        else:
+            length = len(text) - len(text) % 4
+        self._pending = text[length:]
+        if not length:
+            return
+
+        try:
+            self._output += base64.b64decode(text[:length], validate=True)
+        except binascii.Error as exc:
+            raise InvalidBase64Json(f"'{self.field}' is not valid base64") from exc
+
+    def _comma_or_end(self, position: int):
+        position = self._skip_whitespace(position)
+        if position == len(self._buffer):
+            return position
+        if self._buffer[position] == ord(","):
+            self._state = self._key_or_end
+            return position + 1
+        if self._buffer[position] == ord("}"):
+            self._state = self._done
+            return position + 1
+
+        raise InvalidBase64Json("expected ',' or '}' after a value")
+
+    def _done(self, position: int):
+        position = self._skip_whitespace(position)
+        if position < len(self._buffer):
+            raise InvalidBase64Json("unexpected data after the JSON object")
+        return position
@@ -1,11 +1,13 @@
 import os
 import tempfile
 
-import filetype
-
 from core.classes.aws.S3Handler import S3Handler
+from core.classes.LazyModule import LazyModule
+from core.classes.StagedUpload import StagedUpload
 from models.File import File, logger
 
+filetype = LazyModule("filetype")
+
 
 class FileManager:
     """
@@ -13,6 +15,9 @@ class FileManager:
     put a file or get a file using S3Handler Class.
     """
 
+    # Prefix of the blobs of the content addressed storage, named by the sha256 of their content
+    CAS_PREFIX = "cas"
+
     @staticmethod
     def get_file_info(file_path):
         """
@@ -55,12 +60,13 @@ class FileManager:
         metadata=None,
         is_thumbnail=0,
         url=None,
-        is_private=False
+        is_private=False,
+        skip_if_exists=False
     ):
         """
-        The putFile() method creates a temporary file and write inside it the content,
-        then creates a new handler of S3Handler class to use upload_file() method, finally
-        saves a record file with metadata of file and return an instance of saved file.
+        The putFile() method uploads the content from a file on disk using the S3Handler class, in parts
+        for large files so the content is never loaded in memory, finally saves a record file with metadata
+        of file and return an instance of saved file.
 
         Parameters
         ----------
@@ -68,14 +74,16 @@ class FileManager:
                 A string of bucket name.
         profile : `str`
                 A string of profile name.
-        content : `type`
-                Content of file.
+        content : `StagedUpload`, `bytes`
+                Content of file, bytes are staged to a temporary file first.
         key : `str`
                 A string of key.
         region : `str`
                 A string of region.
         metadata : `dict`
                 A dictionary of metadata, empty by default.
+        skip_if_exists : `bool`
+                If the key already exists the content is not uploaded again, for content addressed keys.
 
         Returns
         -------
@@ -84,18 +92,25 @@ class FileManager:
             """
         if metadata is None:
             metadata = {}
-        tmpFile = tempfile.NamedTemporaryFile()
-        tmpFile.write(content)
-        tmpFile.seek(0)
-        metadata_info = FileManager.get_file_info(tmpFile.name)
-        handler = S3Handler(bucket_name, region, profile)
-        obj = handler.upload_file(tmpFile, key, metadata=metadata)
+        upload = content
+        if not isinstance(content, StagedUpload):
+            upload = StagedUpload.from_bytes(content, tempfile.gettempdir(), file_type)
+
+        try:
+            handler = S3Handler(bucket_name, region, profile)
+            # An existing blob is refreshed instead, so the reaper does not remove it while its record is saved
+            if not (skip_if_exists and handler.refresh_object(key)):
+                handler.upload_file_path(upload.path, key, metadata=metadata)
+            size = os.stat(upload.path).st_size
+        finally:
+            if upload is not content:
+                upload.cleanup()
 
         record = File(
             object=key,
-            size=metadata_info.get("size"),
-            type=file_type or metadata_info.get("type"),
-            name=file_name or metadata_info.get("name"),
+            size=size,
+            type=file_type or upload.content_type or filetype.guess_mime(upload.path),
+            name=file_name or key,
             hash=key,
             is_thumbnail=is_thumbnail,
             user_who_uploaded_id=user_id,
@@ -103,8 +118,6 @@ class FileManager:
             is_private=is_private
         )
 
-        tmpFile.close()
-
         return record if record.save() else None
 
     @staticmethod
@@ -142,11 +155,60 @@ class FileManager:
         return None, None
 
     @staticmethod
-    def delete_file(bucket_name, public_bucket_name, file: File, aws_region, profile=None):
-        bucket = bucket_name
+    def get_bucket(bucket_name, public_bucket_name, file: File):
         # If the file has url that means is public and we should look in the public bucket
+        return public_bucket_name if file.url else bucket_name
+
+    @staticmethod
+    def get_file_stream(bucket_name, public_bucket_name, file: File, aws_region, byte_range=None, profile=None):
+        """
+        The get_file_stream() method gets the object of a file from its bucket without downloading it,
+        so it can be sent to the client while it is read from S3.
+
+        Parameters
+        ----------
+        bucket_name : `str`
+                A string of the private bucket name.
+        public_bucket_name : `str`
+                A string of the public bucket name.
+        file : `models.File.File`
+                The file to get.
+        aws_region : `str`
+                A string of Amazon web service region.
+        byte_range : `str`
+                Value of the Range header of the request, passed to S3.
+
+        Returns
+        -------
+        `dict`
+            The get_object() response of S3Handler.get_object_stream().
+            """
+        handler = S3Handler(FileManager.get_bucket(bucket_name, public_bucket_name, file), aws_region, profile=profile)
+        return handler.get_object_stream(file.object, byte_range)
+
+    @staticmethod
+    def get_download_url(bucket_name, public_bucket_name, file: File, aws_region, expires_in=300, profile=None):
+        """
+        The get_download_url() method returns a URL to download the file straight from S3:
+        the URL of public files, or a presigned URL valid for *expires_in* seconds.
+            """
         if file.url:
-            bucket = public_bucket_name
+            return file.url
+
+        handler = S3Handler(FileManager.get_bucket(bucket_name, public_bucket_name, file), aws_region, profile=profile)
+        return handler.generate_presigned_url(file.object, expires_in, file_name=file.name, content_type=file.type)
+
+    @staticmethod
+    def is_blob(key: str) -> bool:
+        return key.startswith(f"{FileManager.CAS_PREFIX}/")
+
+    @staticmethod
+    def delete_file(bucket_name, public_bucket_name, file: File, aws_region, profile=None):
+        if FileManager.is_blob(file.object):
+            # Other files may have the same content, the blob is removed by FileBlobReaperCrontab once unreferenced
+            return True
+
+        bucket = FileManager.get_bucket(bucket_name, public_bucket_name, file)
 
         handler = S3Handler(bucket, aws_region, profile=profile)
         try:
@@ -0,0 +1,244 @@
+import base64
+import json
+import os
+
+import falcon
+from falcon import Request, Response
+
+from core.Utils import logger
+
+
+class RangeFileReader:
+    """
+    A file-like object that reads *length* bytes of *file* starting at *offset*, used as the stream of 206 responses.
+
+    It exposes fileno() and tell() of the underlying file, so servers whose wsgi.file_wrapper uses
+    os.sendfile (e.g. gunicorn) send the range straight from the file, bounded by the Content-Length.
+    """
+
+    def __init__(self, file, offset: int, length: int):
+        """
+        :param file: A file opened in binary mode, it is closed with the reader.
+        :param offset: Position of the first byte of the range.
+        :param length: Number of bytes of the range.
+        """
+        self._file = file
+        self._file.seek(offset)
+        self._remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b""
+
+        size = self._remaining if size is None or size < 0 else min(size, self._remaining)
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class FileWrapper:
+    """
+    wsgi.file_wrapper for servers that do not provide one, like gevent.pywsgi, that reads the file in
+    large blocks instead of the 8KiB used by falcon, so a download takes fewer reads, writes and greenlet switches.
+    """
+
+    BLOCK_SIZE = 256 * 1024
+
+    def __init__(self, file, block_size: int = None):
+        # The block size falcon asks for is ignored, it is tuned for generic streams and not files
+        self.file = file
+        self.block_size = self.BLOCK_SIZE
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        data = self.file.read(self.block_size)
+        if not data:
+            raise StopIteration
+        return data
+
+    def close(self):
+        self.file.close()
+
+    @staticmethod
+    def middleware(app):
+        """
+        Wraps a WSGI application so its environ has a wsgi.file_wrapper, unless the server sets its own.
+        """
+        def wrapper(environ, start_response):
+            environ.setdefault("wsgi.file_wrapper", FileWrapper)
+            return app(environ, start_response)
+
+        return wrapper
+
+
+class FileResponse:
+    """
+    Sends files stored on disk with support for conditional (ETag / If-None-Match) and Range requests,
+    and streams files as JSON with their content in base64.
+    """
+
+    # Multiple of 3, so every chunk is encoded without padding and the chunks can be concatenated
+    BASE64_CHUNK_SIZE = 3 * 64 * 1024
+
+    @staticmethod
+    def send(req: Request, resp: Response, path: str, etag: str, content_type: str, file_name: str = None):
+        """
+        Sets *resp* to send the file in *path*.
+
+        The full file is sent as the raw file object, so falcon passes it to the wsgi.file_wrapper of the server
+        (os.sendfile where supported). A single byte range is answered with 206, or 416 if it is not satisfiable.
+
+        :param req: The request.
+        :param resp: The response.
+        :param path: Path of the file.
+        :param etag: Strong entity tag of the content, without quotes. It must change when the content does.
+        :param content_type: MIME type of the file.
+        :param file_name: Name of the file for the Content-Disposition header.
+        """
+        resp.etag = etag
+        resp.accept_ranges = "bytes"
+        if FileResponse.not_modified(req, etag):
+            resp.status = falcon.HTTP_304
+            return
+
+        size = os.stat(path).st_size
+        FileResponse.set_content_headers(resp, content_type, file_name)
+
+        byte_range = FileResponse.get_range(req, etag, size)
+        if byte_range is None:
+            resp.stream = open(path, "rb")
+            resp.content_length = size
+            return
+
+        start, end = byte_range
+        if start >= size:
+            FileResponse.range_not_satisfiable(resp, size)
+            return
+
+        resp.status = falcon.HTTP_206
+        resp.content_range = (start, end, size)
+        resp.content_length = end - start + 1
+        resp.stream = RangeFileReader(open(path, "rb"), start, end - start + 1)
+
+    @staticmethod
+    def set_content_headers(resp: Response, content_type: str, file_name: str = None):
+        resp.content_type = content_type
+        if file_name:
+            resp.set_header("content-disposition", f'inline; filename="{file_name}"')
+
+    @staticmethod
+    def range_not_satisfiable(resp: Response, size):
+        resp.status = falcon.HTTP_416
+        resp.set_header("content-range", f"bytes */{size}")
+        resp.content_length = 0
+
+    @staticmethod
+    def not_modified(req: Request, etag: str) -> bool:
+        """
+        Returns whether If-None-Match matches *etag*, with the weak comparison of RFC 9110.
+        """
+        if_none_match = req.if_none_match
+        if not if_none_match:
+            return False
+
+        return any(tag == "*" or tag == etag for tag in if_none_match)
+
+    @staticmethod
+    def get_range(req: Request, etag: str, size: int):
+        """
+        Returns the (start, end) inclusive byte positions requested by the Range header, clamped to *size*,
+        or None if the full file has to be sent: no Range header, another unit, or an If-Range that does not match.
+        A start past the end of the file is returned as is, so the caller can answer 416.
+        """
+        if req.get_header("Range") is None or req.range_unit != "bytes" or not FileResponse.if_range_matches(req, etag):
+            return None
+
+        first, last = req.range
+        if first < 0:
+            return max(0, size + first), size - 1
+        if size == 0:
+            return first, first
+        if last < 0 or last >= size:
+            last = size - 1
+
+        return first, last
+
+    @staticmethod
+    def if_range_matches(req: Request, etag: str) -> bool:
+        """
+        Returns whether a Range request can be answered with a part of the file: there is no If-Range or it matches *etag*.
+        """
+        if_range = req.get_header("If-Range")
+        # Only strong validators can be used with If-Range, and a date can not be checked against the ETag
+        return if_range is None or if_range == f'"{etag}"'
+
+    @staticmethod
+    def send_base64(resp: Response, items: list, envelope: dict = None):
+        """
+        Sets *resp* to stream the JSON of *items* with their content in a "base64" key, see base64_json().
+        """
+        resp.content_type = falcon.MEDIA_JSON
+        resp.stream = FileResponse.base64_json(items, envelope)
+
+    @staticmethod
+    def base64_json(items: list, envelope: dict = None, chunk_size: int = BASE64_CHUNK_SIZE):
+        """
+        Yields the JSON of one file object at a time, with its content encoded to base64 as it is read in
+        chunks of *chunk_size* bytes, so neither a file nor the whole response is held in memory.
+
+        The data of the items must be serialized before the response is sent, the database session is
+        closed by then. If reading a file fails the error is logged and the response ends there.
+
+        :param items: A list of (data, content) tuples: *data* is the serialized file and *content* a function
+                      that returns the file-like object with its content, or None to send *data* as is.
+        :param envelope: If given, the JSON of *envelope* with the items as a list in its "data" key,
+                         otherwise a single item.
+        :param chunk_size: Bytes read at a time, a multiple of 3.
+        """
+        if envelope is not None:
+            yield FileResponse._open_object(envelope) + b'"data": ['
+
+        for index, (data, content) in enumerate(items):
+            if index:
+                yield b", "
+            if content is None:
+                yield json.dumps(data, ensure_ascii=False).encode("utf-8")
+                continue
+
+            yield FileResponse._open_object(data) + b'"base64": "'
+            try:
+                with content() as stream:
+                    rest = b""
+                    while chunk := stream.read(chunk_size):
+                        # Streams like the body of S3 can return less than asked, only whole groups of 3 are encoded
+                        chunk = rest + chunk
+                        end = len(chunk) - len(chunk) % 3
+                        rest = chunk[end:]
+                        if end:
+                            yield base64.b64encode(chunk[:end])
+                    if rest:
+                        yield base64.b64encode(rest)
+            except Exception as exc:
+                logger.error(f"[ERROR-STREAMING-BASE64] file: {data.get('id')}, {exc}")
+                return
+            yield b'"}'
+
+        if envelope is not None:
+            yield b"]}"
+
+    @staticmethod
+    def _open_object(data: dict) -> bytes:
+        # The JSON of *data* without its closing brace, ready for one more key
+        data = json.dumps(data, ensure_ascii=False)[:-1]
+        return (data + ", " if data != "{" else data).encode("utf-8")
@@ -2,28 +2,27 @@ import base64
 import configparser
 import io
 import json
+import os
+import shutil
 import sys
+import tempfile
 from abc import ABC, abstractmethod
 
-import filetype
 from falcon.media.multipart import BodyPart
-from PIL import Image
 
+from core.classes.BackgroundDispatcher import BackgroundDispatcher
+from core.classes.Base64JsonReader import Base64JsonReader, InvalidBase64Json
+from core.classes.FileManager import FileManager
+from core.classes.FileResponse import FileResponse
+from core.classes.ImageProcessor import ImageProcessor, ImageProcessorBusy
+from core.classes.LazyModule import LazyModule
+from core.classes.StagedUpload import FileSizeGreaterThanAllowed, StagedUpload
 from core.Controller import (ROUTE_LOADER, Controller, Hooks, HTTPStatus,
                              Request, Response, Utils, datetime, falcon, json)
 from core.Utils import Utils, logger
 from models.File import File, User
 
-
-class FileSizeGreaterThanAllowed(Exception):
-    """Exception raised for errors in file processing"""
-
-    def __init__(self):
-        self.message = "The file size exceeds the allowed limit of 4MB."
-        super().__init__(self.message)
-
-    def __str__(self):
-        return self.message
+filetype = LazyModule("filetype")
 
 
 class ContentTypeNotAllowed(Exception):
@@ -53,39 +52,64 @@ class FileController(Controller):
     provides them with commonly used methods.
     """
 
-    CHUNK_SIZE = 8192
+    CHUNK_SIZE = 64 * 1024
     IMAGE_EXTENSIONS = {"image/jpeg", "image/png", "image/jpg"}
+    # Directory of the uploads while they are received, the subclasses storing files on disk use their storage path
+    staging_path = tempfile.gettempdir()
 
     def __init__(self):
         self.config = configparser.ConfigParser()
         self.config.read(Utils.get_config_ini_file_path())
         self.accepted_files = json.loads(self.config.get("FILES", "accepted_files"))
         self.max_file_size = int(self.config.get("FILES", "max_file_size"))
+        # Stores each content once, in a blob named by its sha256 shared by the files with that content
+        self.content_addressed = self.config.getboolean("FILES", "content_addressed", fallback=False)
 
-    def compress_image(self, image_data):
-        with Image.open(io.BytesIO(image_data)) as image_data_content:
-            b = io.BytesIO()
-            image_data_content.save(
-                b, image_data_content.format, optimize=True, quality=65
-            )
-        b.seek(0)
-        return b
-
-    def process_stream(self, part: BodyPart):
+    def compress_image(self, upload: StagedUpload) -> StagedUpload:
+        compressed_path = StagedUpload.temp_path(self.staging_path)
+        try:
+            ImageProcessor.get_instance().compress(upload.path, compressed_path)
+            compressed = StagedUpload.from_file(compressed_path, upload.content_type)
+        except BaseException:
+            os.remove(compressed_path)
+            raise
+
+        upload.cleanup()
+        return compressed
+
+    def process_stream(self, part: BodyPart) -> StagedUpload:
+        """
+        Writes the part to a staged upload as it is received, with at most one chunk in memory.
+        """
         self.check_if_valid_content_type(part.content_type)
 
-        read_so_far = 0
-        data = []
-        while chunk := part.stream.read(self.CHUNK_SIZE):
-            data.append(chunk)
-            read_so_far += len(chunk)
-            if read_so_far > self.max_file_size:
-                raise FileSizeGreaterThanAllowed()
-
+        upload = StagedUpload.from_stream(
+            part.stream, self.staging_path, self.max_file_size, part.content_type, chunk_size=self.CHUNK_SIZE
+        )
         if part.content_type in self.IMAGE_EXTENSIONS:
-            return self.compress_image(b"".join(data))
+            try:
+                return self.compress_image(upload)
+            except BaseException:
+                upload.cleanup()
+                raise
+
+        return upload
+
+    def stage(self, file_content, content_type) -> tuple[StagedUpload, bool]:
+        """
+        Returns *file_content* as a staged upload and if it was staged here, so the caller has to clean it up.
+        """
+        if isinstance(file_content, StagedUpload):
+            return file_content, False
 
-        return b"".join(data)
+        return StagedUpload.from_bytes(self.format_file_content(file_content), self.staging_path, content_type), True
+
+    def send_file(self, req: Request, resp: Response, file: File, path: str):
+        """
+        Sends the content of *file* stored in *path*, answering conditional and Range requests.
+        The hash of a file is unique and its content never changes, so it is used as its strong ETag.
+        """
+        FileResponse.send(req, resp, path, file.hash, file.type, file.name)
 
     def on_post(self, req: Request, resp: Response, id: int = None):
         if id:
@@ -97,26 +121,33 @@ class FileController(Controller):
             return
 
         make_thumbnail = self.check_if_make_thumbnail(req)
+        defer_thumbnail = self.check_if_defer_thumbnail(req)
         public_file = self.check_if_public_file(req)
         private_file = self.check_if_private_file(req)
         form = req.get_media()
         for part in form:
             part: BodyPart = part
             try:
-                stream_content = self.process_stream(part)
+                upload = self.process_stream(part)
+            except ImageProcessorBusy as e:
+                resp.set_header("Retry-After", "5")
+                self.response(resp, HTTPStatus.SERVICE_UNAVAILABLE, error=str(e))
+                return
             except Exception as e:
                 self.response(resp, HTTPStatus.BAD_REQUEST, error=str(e))
                 return
 
-            file_data, thumbnail_data, code = self.process_file(
-                part.filename,
-                stream_content,
-                part.content_type,
-                user=session.user,
-                make_thumbnail=make_thumbnail,
-                public=public_file,
-                private=private_file
-            )
+            with upload:
+                file_data, thumbnail_data, code = self.process_file(
+                    part.filename,
+                    upload,
+                    part.content_type,
+                    user=session.user,
+                    make_thumbnail=make_thumbnail,
+                    defer_thumbnail=defer_thumbnail,
+                    public=public_file,
+                    private=private_file
+                )
             data = [file_data]
             if thumbnail_data:
                 data.append(thumbnail_data)
@@ -133,32 +164,37 @@ class FileController(Controller):
         if not session:
             return
 
-        base64_info, file_name, error_message = self.get_base64_info(req)
-        if not base64_info:
-            self.response(resp, HTTPStatus.BAD_REQUEST, error=error_message)
-            return
-
-        base64_decoded = self.decode_base64_file(base64_info)
-        mimetype = self.get_mimetype(base64_decoded)
-
+        # The file is decoded from the body as it is received, its type is checked with its first bytes
+        # and the upload stops as soon as it is larger than the max file size
+        reader = Base64JsonReader(req.bounded_stream, check_head=self.check_base64_head, chunk_size=self.CHUNK_SIZE)
         try:
-            self.check_if_valid_content_type(mimetype)
-        except ContentTypeNotAllowed as e:
+            upload = StagedUpload.from_stream(reader, self.staging_path, self.max_file_size, chunk_size=self.CHUNK_SIZE)
+        except (InvalidBase64Json, ContentTypeNotAllowed, FileSizeGreaterThanAllowed) as e:
             self.response(resp, HTTPStatus.BAD_REQUEST, error=str(e))
             return
 
+        file_name = reader.fields.get("file_name")
+        if not file_name or not isinstance(file_name, str) or not reader.found:
+            upload.cleanup()
+            self.response(resp, HTTPStatus.BAD_REQUEST, error="'file_name' and 'base64' needed")
+            return
+        mimetype = upload.content_type = reader.head_result
+
         make_thumbnail = self.check_if_make_thumbnail(req)
+        defer_thumbnail = self.check_if_defer_thumbnail(req)
         public_file = self.check_if_public_file(req)
         private_file = self.check_if_private_file(req)
-        file, thumbnail, code = self.process_file(
-            file_name,
-            base64_decoded,
-            mimetype,
-            user=session.user,
-            make_thumbnail=make_thumbnail,
-            public=public_file,
-            private=private_file
-        )
+        with upload:
+            file, thumbnail, code = self.process_file(
+                file_name,
+                upload,
+                mimetype,
+                user=session.user,
+                make_thumbnail=make_thumbnail,
+                defer_thumbnail=defer_thumbnail,
+                public=public_file,
+                private=private_file
+            )
         data = file
         if thumbnail:
             data = [file, thumbnail]
@@ -173,7 +209,11 @@ class FileController(Controller):
         return sys.getsizeof(data) < self.max_file_size
 
     def check_if_make_thumbnail(self, req: Request):
-        return req.params.get("thumbnail") == "True"
+        return req.params.get("thumbnail") in ("True", "deferred")
+
+    def check_if_defer_thumbnail(self, req: Request):
+        # The file is returned right away and its thumbnail_id is set when the thumbnail is ready
+        return req.params.get("thumbnail") == "deferred"
 
     def check_if_public_file(self, req: Request):
         return req.params.get("public") == "True"
@@ -189,6 +229,7 @@ class FileController(Controller):
         user: User,
         encode_to_base64=False,
         make_thumbnail=False,
+        defer_thumbnail=False,
         public=False,
         private=False
     ):
@@ -199,76 +240,114 @@ class FileController(Controller):
 
         thumbnail = None
         if make_thumbnail and content_type in self.IMAGE_EXTENSIONS:
-            thumbnail = self.create_thumbnail(
-                data,
-                filename,
-                content_type,
-                encode_to_base64,
-                user=user,
-                public=public,
-                private=private
-            )
-            thumbnail = Utils.serialize_model(thumbnail) if thumbnail else {"Filename_thumbnail": filename, "error": self.PROBLEM_SAVING_TO_DB}
+            try:
+                if not defer_thumbnail:
+                    thumbnail = self.create_thumbnail(
+                        data,
+                        filename,
+                        content_type,
+                        encode_to_base64,
+                        user=user,
+                        public=public,
+                        private=private
+                    )
+                    if thumbnail:
+                        self.attach_thumbnail(file, thumbnail)
+                        thumbnail = Utils.serialize_model(thumbnail)
+                    else:
+                        thumbnail = {"Filename_thumbnail": filename, "error": self.PROBLEM_SAVING_TO_DB}
+            except ImageProcessorBusy:
+                # Every process is busy, the thumbnail is made when one is free
+                defer_thumbnail = True
+
+            if defer_thumbnail:
+                self.defer_thumbnail(file, data, filename, content_type, encode_to_base64, user=user, public=public)
 
         return Utils.serialize_model(file), thumbnail, 201
 
-    def create_thumbnail(self, image_data, filename, content_type, encode_to_base64, user: User, public=False, private=False):
-        thumbnail_content = self.create_thumbnail_image(image_data)
+    def create_thumbnail(self, image_data, filename, content_type, encode_to_base64, user: User, public=False, private=False, block=False):
         filename = filename.split(".")
         thumbnail_name = (
             filename[0]
             + "_thumbnail"
             + ("." + filename[1] if len(filename) > 1 else "")
         )
-        return self.create_file(
-            thumbnail_name,
-            thumbnail_content,
-            content_type,
-            user=user,
-            is_thumbnail=1,
-            encode_to_base64=encode_to_base64,
-            public=public,
-            private=False
-        )
+        with self.create_thumbnail_image(image_data, block=block) as thumbnail_content:
+            return self.create_file(
+                thumbnail_name,
+                thumbnail_content,
+                content_type,
+                user=user,
+                is_thumbnail=1,
+                encode_to_base64=encode_to_base64,
+                public=public,
+                private=False
+            )
 
-    def create_thumbnail_image(self, image_data):
-        if not isinstance(image_data, io.BytesIO):
-            image_data = io.BytesIO(image_data)
+    def create_thumbnail_image(self, image_data, block=False) -> StagedUpload:
+        upload, staged_here = self.stage(image_data, None)
+        thumbnail_path = StagedUpload.temp_path(self.staging_path)
+        try:
+            ImageProcessor.get_instance().thumbnail(upload.path, thumbnail_path, block=block)
+            return StagedUpload.from_file(thumbnail_path, upload.content_type)
+        except BaseException:
+            os.remove(thumbnail_path)
+            raise
+        finally:
+            if staged_here:
+                upload.cleanup()
+
+    def attach_thumbnail(self, file: File, thumbnail: File):
+        file.thumbnail_id = thumbnail.id
+        if not file.save():
+            logger.error(f"[ERROR-ATTACHING-THUMBNAIL] file: {file.id}, thumbnail: {thumbnail.id}")
+
+    def defer_thumbnail(self, file: File, image_data, filename, content_type, encode_to_base64, user: User, public=False):
+        """
+        Makes the thumbnail of *file* in the background dispatcher, from a copy of the image
+        since the upload is removed when the request ends.
+        """
+        upload, staged_here = self.stage(image_data, content_type)
+        if staged_here:
+            source_path = upload.path
+        else:
+            source_path = StagedUpload.temp_path(self.staging_path)
+            shutil.copyfile(upload.path, source_path)
+
+        BackgroundDispatcher.get_instance().submit(
+            self.create_deferred_thumbnail, file.id, source_path, filename, content_type, encode_to_base64, user.id, public
+        )
 
-        with Image.open(image_data) as image_data_content:
-            image_data_content.thumbnail(size=(640, 640))
-            b = io.BytesIO()
-            image_data_content.save(b, image_data_content.format)
-        b.seek(0)
-        return b
+    def create_deferred_thumbnail(self, file_id: int, source_path: str, filename, content_type, encode_to_base64, user_id: int, public=False):
+        try:
+            file = File.get(file_id)
+            if not file:
+                return
 
-    def decode_base64_file(self, base64_info):
-        return base64.b64decode(base64_info)
+            source = StagedUpload.from_file(source_path, content_type)
+            thumbnail = self.create_thumbnail(
+                source, filename, content_type, encode_to_base64, user=User.get(user_id), public=public, block=True
+            )
+            if thumbnail:
+                self.attach_thumbnail(file, thumbnail)
+        finally:
+            if os.path.exists(source_path):
+                os.remove(source_path)
 
     def encode_to_base64(self, data):
         return base64.b64encode(data)
 
     def get_mimetype(self, data):
-        return filetype.guess(data).mime
-
-    def get_base64_file_length(self, b64string):
-        return (len(b64string) * 3) / 4 - b64string.count("=", -1, -5)
-
-    def get_base64_info(self, req: Request):
-        try:
-            data: dict = json.loads(req.stream.read())
-        except Exception as exc:
-            return None, None, str(exc)
-
-        file_name = data.get("file_name")
-        base64_info: str = data.get("base64")
-        if not file_name or not base64_info:
-            return None, None, "'file_name' and 'base64' needed"
-
-        if self.get_base64_file_length(base64_info) > self.max_file_size:
-            return None, None, f"The file {file_name} is larger than 4mb."
-
-        return base64_info, file_name, None
+        kind = filetype.guess(data)
+        return kind.mime if kind else None
+
+    def check_base64_head(self, head: bytes):
+        """
+        Returns the type of a base64 upload from its first bytes, raises ContentTypeNotAllowed if it is not accepted.
+        """
+        mimetype = self.get_mimetype(head)
+        self.check_if_valid_content_type(mimetype)
+        return mimetype
 
     def format_file_content(self, file_content):
         if isinstance(file_content, str):
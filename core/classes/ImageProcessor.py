@@ -0,0 +1,148 @@
+import atexit
+import configparser
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from core.classes.LazyModule import LazyModule
+from core.Utils import Utils, logger
+
+Image = LazyModule("PIL.Image")
+
+
+def compress_image_file(source_path: str, destination_path: str):
+    """
+    Re-encodes the image in *source_path* to *destination_path* with a lower quality. Runs in the process pool.
+    """
+    with Image.open(source_path) as image:
+        image.save(destination_path, image.format, optimize=True, quality=65)
+
+
+def thumbnail_image_file(source_path: str, destination_path: str, size: tuple = (640, 640)):
+    """
+    Writes a thumbnail of the image in *source_path* to *destination_path*. Runs in the process pool.
+    """
+    with Image.open(source_path) as image:
+        image.thumbnail(size=size)
+        image.save(destination_path, image.format)
+
+
+class ImageProcessorBusy(Exception):
+    """Exception raised when the image processing queue is full"""
+
+    def __init__(self):
+        self.message = "The server is processing too many images, please try again later."
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class ImageProcessor:
+    """
+    Runs the CPU-bound image processing (compression, thumbnails) in a pool of processes, so it does not
+    block the gevent hub of the server nor hold the GIL. Images are passed by path, never by content.
+
+    At most workers + queue_size images are processed or waiting at the same time, when the queue is full
+    ImageProcessorBusy is raised, to answer 503 instead of piling up uploads. With 0 workers, always on Lambda,
+    or if the pool can not be used, the images are processed in the caller.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, workers: int = 2, queue_size: int = 8):
+        """
+        :param workers: Number of processes, 0 processes the images in the caller.
+        :param queue_size: Max number of images waiting for a process.
+        """
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max(1, workers) + queue_size)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_instance() -> "ImageProcessor":
+        """
+        Returns the processor of the process, configured with the IMAGES section of the config file.
+        """
+        if ImageProcessor._instance is None:
+            with ImageProcessor._instance_lock:
+                if ImageProcessor._instance is None:
+                    config = configparser.ConfigParser()
+                    config.read(Utils.get_config_ini_file_path())
+                    workers = config.getint("IMAGES", "workers", fallback=2)
+                    if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+                        workers = 0
+                    ImageProcessor._instance = ImageProcessor(
+                        workers=workers,
+                        queue_size=config.getint("IMAGES", "queue_size", fallback=8),
+                    )
+                    atexit.register(ImageProcessor._instance.shutdown)
+
+        return ImageProcessor._instance
+
+    def compress(self, source_path: str, destination_path: str, block: bool = False):
+        self.run(compress_image_file, source_path, destination_path, block=block)
+
+    def thumbnail(self, source_path: str, destination_path: str, size: tuple = (640, 640), block: bool = False):
+        self.run(thumbnail_image_file, source_path, destination_path, size, block=block)
+
+    def run(self, function, *args, block: bool = False):
+        """
+        Runs function(*args) in the pool and waits for it, yielding to other greenlets meanwhile.
+        If the queue is full raises ImageProcessorBusy, or waits for a free place if *block*, e.g. in background jobs.
+        """
+        if not self._slots.acquire(blocking=block):
+            raise ImageProcessorBusy()
+
+        try:
+            if self.workers <= 0:
+                return function(*args)
+
+            executor = self._get_executor()
+            if executor is None:
+                return function(*args)
+            try:
+                return self._wait(executor.submit(function, *args))
+            except BrokenProcessPool as exc:
+                logger.error(f"[IMAGE-PROCESSOR] Process pool broken, processing the image in the request: {exc}")
+                with self._lock:
+                    self._executor = None
+                return function(*args)
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    try:
+                        # spawn does not copy the gevent hub, threads and connections of the server into the workers
+                        self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                    except (OSError, NotImplementedError) as exc:
+                        # e.g. no /dev/shm for the semaphores
+                        logger.error(f"[IMAGE-PROCESSOR] Process pool not available, processing images in the request: {exc}")
+                        self.workers = 0
+                        return None
+
+        return self._executor
+
+    @staticmethod
+    def _wait(future):
+        if "gevent" in sys.modules:
+            import gevent
+            if isinstance(gevent.getcurrent(), gevent.Greenlet):
+                # Waits in a thread of the hub, so the other greenlets keep running
+                return gevent.get_hub().threadpool.apply(future.result)
+
+        return future.result()
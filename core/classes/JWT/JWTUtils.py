@@ -1,12 +1,29 @@
+import hashlib
 import os
+import threading
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple
 
 import jwt
+from cryptography.hazmat.primitives.serialization import (load_pem_private_key,
+                                                          load_pem_public_key)
+
+from core.classes.LRUCache import LRUCache
 
 
 class JWTUtils:
     ALGORITHM = "RS256"  # Use RS256 for RSA
+    # Seconds between checks of the key files modification time, for hot reload
+    KEY_RELOAD_INTERVAL = 5
+    # Verified tokens are kept at most this many seconds and never past their 'exp'
+    TOKEN_CACHE_SIZE = 4096
+    TOKEN_CACHE_TTL = 300
+
+    _keys: dict = {}
+    _keys_lock = threading.Lock()
+    _token_cache = LRUCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+    key_loads = 0
 
     @staticmethod
     def create_token(payload: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -28,6 +45,7 @@ class JWTUtils:
     def verify_token(token: str) -> Tuple[Optional[dict], Optional[str]]:
         """
         Verifies the JWT token and returns the payload if valid, otherwise returns an error message.
+        Recently verified tokens are served from a cache keyed by the token hash, skipping the signature check.
 
         :param token: JWT token to verify.
         :return: Tuple containing either (payload, None) if the token is valid, or (None, error message) if not.
@@ -36,7 +54,17 @@ class JWTUtils:
         try:
             if token.startswith("Bearer "):
                 token = token.split(" ")[1]
-            payload = jwt.decode(token, JWTUtils._get_public_key(), algorithms=[JWTUtils.ALGORITHM])
+            public_key = JWTUtils._get_public_key()
+            token_hash = hashlib.sha256(token.encode("utf-8")).digest()
+            payload = JWTUtils._token_cache.get(token_hash)
+            if payload is not None:
+                return dict(payload), err
+
+            payload = jwt.decode(token, public_key, algorithms=[JWTUtils.ALGORITHM])
+            ttl = JWTUtils.TOKEN_CACHE_TTL
+            if "exp" in payload:
+                ttl = min(ttl, payload["exp"] - time.time())
+            JWTUtils._token_cache.set(token_hash, dict(payload), ttl)
             return payload, err
         except jwt.ExpiredSignatureError as e:
             err = f"Token expired. Get a new one. {e}"
@@ -44,18 +72,57 @@ class JWTUtils:
             err = f"Invalid Token. Please pass a valid token. {e}"
         return None, err
 
+    @staticmethod
+    def get_cache_stats() -> dict:
+        """
+        Returns the hit/miss counters of the verified tokens cache and how many times the keys were loaded from disk.
+        """
+        return {"tokens": JWTUtils._token_cache.stats(), "key_loads": JWTUtils.key_loads}
+
+    @staticmethod
+    def load_keys():
+        """
+        Loads both keys so the first requests don't pay for reading and parsing them.
+        """
+        JWTUtils._get_private_key()
+        JWTUtils._get_public_key()
+
     @staticmethod
     def _get_private_key():
-        # Key should be in the same folder as this file
-        thisfolder = os.path.dirname(os.path.abspath(__file__))
-        private_key_path = os.path.abspath(os.path.join(thisfolder, "private_key.pem"))
-        with open(private_key_path, 'r') as key_file:
-            return key_file.read()
+        return JWTUtils._get_key("private_key.pem", lambda data: load_pem_private_key(data, password=None))
 
     @staticmethod
     def _get_public_key():
-        # Key should be in the same folder as this file
-        thisfolder = os.path.dirname(os.path.abspath(__file__))
-        public_key_path = os.path.abspath(os.path.join(thisfolder, "public_key.pem"))
-        with open(public_key_path, 'r') as key_file:
-            return key_file.read()
+        return JWTUtils._get_key("public_key.pem", load_pem_public_key)
+
+    @staticmethod
+    def _get_key(file_name: str, parser):
+        """
+        Returns the parsed key stored in *file_name*. The key is read from disk only the first time
+        and when the modification time of the file changes, which is checked every KEY_RELOAD_INTERVAL seconds.
+        """
+        now = time.monotonic()
+        cached = JWTUtils._keys.get(file_name)
+        if cached and now - cached["checked_at"] < JWTUtils.KEY_RELOAD_INTERVAL:
+            return cached["key"]
+
+        with JWTUtils._keys_lock:
+            cached = JWTUtils._keys.get(file_name)
+            # Key should be in the same folder as this file
+            thisfolder = os.path.dirname(os.path.abspath(__file__))
+            key_path = os.path.abspath(os.path.join(thisfolder, file_name))
+            mtime = os.stat(key_path).st_mtime_ns
+            if cached and cached["mtime"] == mtime:
+                cached["checked_at"] = now
+                return cached["key"]
+
+            with open(key_path, 'rb') as key_file:
+                key = parser(key_file.read())
+
+            JWTUtils._keys[file_name] = {"key": key, "mtime": mtime, "checked_at": now}
+            JWTUtils.key_loads += 1
+            if cached:
+                # The keys changed, tokens verified with the old key should be checked again
+                JWTUtils._token_cache.clear()
+
+            return key
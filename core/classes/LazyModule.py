@@ -0,0 +1,64 @@
+import importlib
+import threading
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    A module that is imported on the first access to one of its attributes, used for the heavy dependencies
+    of the request path (boto3, Pillow, filetype, jinja2) so they do not slow down the startup of the server,
+    e.g. a cold start on Lambda answering a health check.
+
+        boto3 = LazyModule("boto3")
+        ...
+        session = boto3.Session()  # boto3 is imported here
+
+    Dotted names import their parent packages when they are loaded, not when they are declared.
+    The modules can be imported ahead of the requests with load_all(), e.g. in a background warm-up.
+    """
+
+    _modules: list["LazyModule"] = []
+    _modules_lock = threading.Lock()
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_module"] = None
+        with LazyModule._modules_lock:
+            LazyModule._modules.append(self)
+
+    def __getattr__(self, name: str):
+        # Only called for the attributes this proxy does not have, which are the ones of the module
+        return getattr(self.load(), name)
+
+    def __repr__(self) -> str:
+        return f"<lazy module '{self.__name__}' ({'loaded' if self.loaded else 'not loaded'})>"
+
+    @property
+    def loaded(self) -> bool:
+        return self.__dict__["_module"] is not None
+
+    def load(self) -> types.ModuleType:
+        """
+        Imports the module, if it was not imported yet, and returns it.
+        """
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_module"] = module
+        return module
+
+    @staticmethod
+    def load_all() -> list[str]:
+        """
+        Imports every lazy module declared so far and returns the names of the ones that were not loaded yet.
+        """
+        with LazyModule._modules_lock:
+            modules = list(LazyModule._modules)
+
+        loaded = []
+        for module in modules:
+            if not module.loaded:
+                module.load()
+                loaded.append(module.__name__)
+        # Several proxies can share a module
+        return list(dict.fromkeys(loaded))
@@ -0,0 +1,184 @@
+import configparser
+import threading
+from bisect import bisect_left
+
+from core.Utils import Utils
+
+
+class Histogram:
+    """
+    A histogram with fixed buckets, observing a value is a bisect and two additions.
+    """
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple):
+        """
+        :param buckets: Sorted upper bounds of the buckets, a last +Inf bucket is added.
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class RouteMetrics:
+    __slots__ = ("latency", "statements", "db_time")
+
+    def __init__(self):
+        self.latency = Histogram(Metrics.LATENCY_BUCKETS)
+        self.statements = Histogram(Metrics.STATEMENT_BUCKETS)
+        self.db_time = Histogram(Metrics.DB_TIME_BUCKETS)
+
+
+class Metrics:
+    """
+    Metrics of the process rendered in the Prometheus text format: latency, SQL statements and SQL time
+    histograms per route and method, responses per status, requests in flight and the waits for a connection
+    of the database pool.
+
+    The counters are not locked: requests are handled by greenlets that never switch while updating them,
+    an update from another thread can rarely be lost, which is acceptable for metrics.
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+    DB_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+    POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+
+    # Route of the requests that did not match any route, so unknown paths do not create new series
+    UNMATCHED_ROUTE = "unmatched"
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, enabled: bool = True):
+        """
+        :param enabled: If False the middleware is not registered and nothing is recorded.
+        """
+        self.enabled = enabled
+        self.in_flight = 0
+        self.routes: dict[tuple[str, str], RouteMetrics] = {}
+        self.responses: dict[tuple[str, str, int], int] = {}
+        self.pool_wait = Histogram(self.POOL_WAIT_BUCKETS)
+        self.pool_timeouts = 0
+
+    @staticmethod
+    def get_instance() -> "Metrics":
+        """
+        Returns the metrics of the process, configured with the METRICS section of the config file.
+        """
+        if Metrics._instance is None:
+            with Metrics._instance_lock:
+                if Metrics._instance is None:
+                    config = configparser.ConfigParser()
+                    config.read(Utils.get_config_ini_file_path())
+                    Metrics._instance = Metrics(enabled=config.getboolean("METRICS", "enabled", fallback=True))
+
+        return Metrics._instance
+
+    def observe_request(self, route: str, method: str, status: int, seconds: float, statements: int, db_seconds: float):
+        """
+        Records a handled request.
+
+        :param route: The URI template of the route, or UNMATCHED_ROUTE.
+        :param method: The HTTP method.
+        :param status: The status code of the response.
+        :param seconds: Time spent handling the request.
+        :param statements: Number of SQL statements executed by the request.
+        :param db_seconds: Time spent executing them.
+        """
+        key = (route, method)
+        route_metrics = self.routes.get(key)
+        if route_metrics is None:
+            route_metrics = self.routes.setdefault(key, RouteMetrics())
+        route_metrics.latency.observe(seconds)
+        route_metrics.statements.observe(statements)
+        route_metrics.db_time.observe(db_seconds)
+
+        response_key = (route, method, status)
+        self.responses[response_key] = self.responses.get(response_key, 0) + 1
+
+    def observe_pool_wait(self, seconds: float, timed_out: bool = False):
+        self.pool_wait.observe(seconds)
+        if timed_out:
+            self.pool_timeouts += 1
+
+    def render(self) -> str:
+        """
+        Returns the metrics of the requests and of the pool waits in the Prometheus text format.
+        """
+        lines = []
+        routes = list(self.routes.items())
+
+        self.header(lines, "http_requests_in_flight", "gauge", "Requests being handled.")
+        lines.append(self.sample("http_requests_in_flight", self.in_flight))
+
+        self.header(lines, "http_responses_total", "counter", "Responses by route, method and status.")
+        for (route, method, status), count in list(self.responses.items()):
+            lines.append(self.sample("http_responses_total", count, {"route": route, "method": method, "status": status}))
+
+        for name, attribute, help in (
+            ("http_request_duration_seconds", "latency", "Time handling the request, until its body is sent."),
+            ("http_request_db_statements", "statements", "SQL statements executed per request."),
+            ("http_request_db_seconds", "db_time", "Time executing SQL statements per request."),
+        ):
+            self.header(lines, name, "histogram", help)
+            for (route, method), route_metrics in routes:
+                self.histogram(lines, name, getattr(route_metrics, attribute), {"route": route, "method": method})
+
+        self.header(lines, "db_pool_checkout_seconds", "histogram", "Time to get a connection of the pool, opening it if needed.")
+        self.histogram(lines, "db_pool_checkout_seconds", self.pool_wait)
+        self.header(lines, "db_pool_checkout_timeouts_total", "counter", "Checkouts that timed out waiting for a connection.")
+        lines.append(self.sample("db_pool_checkout_timeouts_total", self.pool_timeouts))
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def render_pool(pool) -> str:
+        """
+        Returns the current state of a QueuePool in the Prometheus text format.
+        """
+        lines = []
+        for name, value, help in (
+            ("db_pool_size", pool.size(), "Connections kept open by the pool."),
+            ("db_pool_checked_out", pool.checkedout(), "Connections in use."),
+            ("db_pool_checked_in", pool.checkedin(), "Idle connections."),
+            # Negative while the pool has not opened all its connections
+            ("db_pool_overflow", pool.overflow(), "Connections opened beyond the size of the pool."),
+        ):
+            Metrics.header(lines, name, "gauge", help)
+            lines.append(Metrics.sample(name, value))
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def header(lines: list, name: str, kind: str, help: str):
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    @staticmethod
+    def histogram(lines: list, name: str, histogram: Histogram, labels: dict = None):
+        labels = labels or {}
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+            cumulative += count
+            lines.append(Metrics.sample(f"{name}_bucket", cumulative, {**labels, "le": bound}))
+        lines.append(Metrics.sample(f"{name}_sum", histogram.sum, labels))
+        lines.append(Metrics.sample(f"{name}_count", cumulative, labels))
+
+    @staticmethod
+    def sample(name: str, value, labels: dict = None) -> str:
+        if not labels:
+            return f"{name} {value}"
+
+        rendered = ",".join(f'{key}="{Metrics.escape(value)}"' for key, value in labels.items())
+        return f"{name}{{{rendered}}} {value}"
+
+    @staticmethod
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -1,11 +1,16 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
-from models.Status import Model, Status, Utils, and_
+from sqlalchemy import insert, update
+
+from core.database import db_session as DB
+from models.Status import Model, Status, Utils, and_, logger, or_, select
 
 
 class NotificationCronsUtils:
 
     max_send_attempts = 3
+    # Rows left in processing status longer than this are claimed again, e.g. the worker that claimed them died
+    claim_timeout = timedelta(minutes=15)
 
     def main(self, limit):
         # Implemented in subclass
@@ -15,29 +20,79 @@ class NotificationCronsUtils:
         """Start the sending procces"""
         self.main(limit)
 
-    def get_rows_to_send(self, model: Model, query_limit):
-        return model.get_all(
-            and_(
-                model.status_id.in_([Status.PENDING, Status.ERROR]),
-                model.send_time <= datetime.now(timezone.utc)
-            ),
-            limit=query_limit,
-        )
+    def claim_rows_to_send(self, model: Model, query_limit: int, ids: list = None, options: list = None) -> list:
+        """
+        Claims up to *query_limit* rows of the pool ready to send. The rows are selected with
+        SELECT ... FOR UPDATE SKIP LOCKED and put in processing status in the same transaction,
+        so workers running in parallel never claim the same row.
+
+        :param model: The pool model.
+        :param query_limit: Max number of rows to claim.
+        :param ids: Only claim these rows, used to send a row right away.
+        :param options: Loader options for the claimed rows, e.g. the columns and relationships needed to send them.
+        :return: The claimed rows, empty if there is nothing to send.
+        """
+        now = datetime.now(timezone.utc)
+        ready = and_(model.status_id.in_([Status.PENDING, Status.ERROR]), model.send_time <= now)
+        stale = and_(model.status_id == Status.PROCESSING, model.updated <= now - self.claim_timeout)
+        query = select(model.id).where(or_(ready, stale))
+        if ids:
+            query = query.where(model.id.in_(ids))
+        query = query.order_by(model.id).limit(query_limit).with_for_update(skip_locked=True)
+
+        try:
+            claimed_ids = DB.scalars(query).all()
+            if claimed_ids:
+                DB.execute(
+                    update(model.__table__)
+                    .where(model.id.in_(claimed_ids))
+                    .values(status_id=Status.PROCESSING, updated=now)
+                )
+            # Releases the locks, from now the rows are skipped by the processing status
+            DB.commit()
+        except Exception as exc:
+            DB.rollback()
+            logger.error("[ERROR-CLAIMING-ROWS]")
+            logger.error(exc)
+            return []
+
+        if not claimed_ids:
+            return []
 
-    def put_rows_in_proccesing_status(self, data: list):
-        for row in data:
-            row.status_id = Status.PROCESSING
+        return model.get_all(model.id.in_(claimed_ids), order_by=model.id, options=options)
 
-        Model.save_all(data)
+    def finalize_rows(self, model: Model, sent_model: Model, sent_values: list, sent_rows: list, failed_rows: list):
+        """
+        Stores the outcome of a batch in a single transaction: inserts the sent rows in the sent table,
+        deletes them from the pool, and puts the failed rows back in error status, deleting the ones that
+        reached max_send_attempts.
 
-    def row_with_errors(self, row: Model):
-        row.send_attemps += 1
-        if row.send_attemps >= self.max_send_attempts:
-            row.delete()
-            return
+        :param model: The pool model.
+        :param sent_model: The model of the sent table.
+        :param sent_values: The values of the rows to insert in the sent table.
+        :param sent_rows: The pool rows that were sent.
+        :param failed_rows: The pool rows that could not be sent.
+        """
+        exhausted_ids = [row.id for row in failed_rows if row.send_attemps + 1 >= self.max_send_attempts]
+        retry_ids = [row.id for row in failed_rows if row.send_attemps + 1 < self.max_send_attempts]
+        delete_ids = [row.id for row in sent_rows] + exhausted_ids
 
-        row.status_id = Status.ERROR
-        row.save()
+        try:
+            if sent_values:
+                DB.execute(insert(sent_model.__table__), sent_values)
+            if delete_ids:
+                DB.execute(model.__table__.delete().where(model.id.in_(delete_ids)))
+            if retry_ids:
+                DB.execute(
+                    update(model.__table__)
+                    .where(model.id.in_(retry_ids))
+                    .values(status_id=Status.ERROR, send_attemps=model.send_attemps + 1)
+                )
+            DB.commit()
+        except Exception as exc:
+            DB.rollback()
+            logger.error("[ERROR-FINALIZING-ROWS]")
+            logger.error(exc)
 
     def show_results(self, selected: int, errors: int):
         send = selected - errors
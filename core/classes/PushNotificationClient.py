@@ -1,13 +1,16 @@
 import json
 from datetime import datetime, timezone
 
-# from crons.ExpoPushNotificationCrontab import ExpoPushNotificationCrontab
-from crons.OneSignalPushNotificationCrontab import \
-    OneSignalPushNotificationCrontab
+from core.classes.BackgroundDispatcher import BackgroundDispatcher
+from core.classes.LazyModule import LazyModule
 from models.PushNotificationPool import PushNotificationPool
 from models.PushNotificationTemplate import (PushNotificationCatalogue,
                                              PushNotificationTemplate)
 
+# The crontab imports the OneSignal SDK, only needed when the pool is processed
+# expo_crontab = LazyModule("crons.ExpoPushNotificationCrontab")
+onesignal_crontab = LazyModule("crons.OneSignalPushNotificationCrontab")
+
 
 class PushNotificationClient:
 
@@ -50,7 +53,7 @@ class PushNotificationClient:
             data = {}
         if extra is None:
             extra = {}
-        template = PushNotificationTemplate.get(template_id)
+        template = PushNotificationTemplate.get_cached(template_id)
         message = PushNotificationClient.__format_message(template, data)
 
         if isinstance(user, list):
@@ -61,9 +64,16 @@ class PushNotificationClient:
         PushNotificationClient.__save_to_pool(template, message, send_time, extra, user)
 
         if send_now and send_time.replace(tzinfo=timezone.utc) <= datetime.now(timezone.utc):
-            # client = ExpoPushNotificationCrontab.get_instance()
-            client = OneSignalPushNotificationCrontab.get_instance()
-            client.process_pool()
+            BackgroundDispatcher.get_instance().submit(PushNotificationClient.process_pool)
+
+    @staticmethod
+    def process_pool():
+        """
+        Sends the pending push notifications, runs in the background dispatcher.
+        """
+        # client = expo_crontab.ExpoPushNotificationCrontab.get_instance()
+        client = onesignal_crontab.OneSignalPushNotificationCrontab.get_instance()
+        client.procces_pool()
 
     @staticmethod
     def __format_message(template: PushNotificationTemplate, data: dict):
@@ -0,0 +1,170 @@
+import configparser
+import threading
+import time
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session, joinedload, undefer
+
+from core.classes.LRUCache import LRUCache
+from core.database import db_session as DB
+from core.Utils import Utils, logger
+
+
+class ReferenceCache:
+    """
+    Read-through in-process cache of the rows of small tables that rarely change (roles, statuses, templates,
+    app versions). Models opt in with a cache_ttl greater than 0, see Model.get_cached() and Model.cached().
+
+    The rows are loaded in a session of their own, never in the session of the caller, and kept detached; every
+    lookup returns the row merged into the session of the caller without running any SQL, so the row can be used,
+    lazy loaded or even modified like any other.
+    Saving or deleting a row of a cached model clears the model in this process and increments its version in the
+    cache_version table, the other processes check those versions every version_check_interval seconds.
+    Rows changed outside the models are stale until their ttl expires.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, maxsize: int = 1024, version_check_interval: float = 5, enabled: bool = True):
+        """
+        :param maxsize: Max number of rows cached per model.
+        :param version_check_interval: Seconds between checks of the versions of the other processes, 0 disables them.
+        :param enabled: If False every lookup goes to the database.
+        """
+        self.maxsize = maxsize
+        self.version_check_interval = version_check_interval
+        self.enabled = enabled
+        self.version_checks = 0
+        self._caches: dict[str, LRUCache] = {}
+        self._versions: dict[str, int] = {}
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_instance() -> "ReferenceCache":
+        """
+        Returns the cache of the process, configured with the CACHE section of the config file.
+        """
+        if ReferenceCache._instance is None:
+            with ReferenceCache._instance_lock:
+                if ReferenceCache._instance is None:
+                    config = configparser.ConfigParser()
+                    config.read(Utils.get_config_ini_file_path())
+                    ReferenceCache._instance = ReferenceCache(
+                        maxsize=config.getint("CACHE", "maxsize", fallback=1024),
+                        version_check_interval=config.getfloat("CACHE", "version_check_interval", fallback=5),
+                        enabled=config.getboolean("CACHE", "enabled", fallback=True),
+                    )
+
+        return ReferenceCache._instance
+
+    def get(self, model, key, loader):
+        """
+        Returns the row of *model* cached in *key*, calling loader(session, options) on a miss.
+        None results are not cached.
+
+        :param model: The model class, with a cache_ttl greater than 0.
+        :param key: Any hashable that identifies the row in the model, e.g. ("id", 1).
+        :param loader: A function that receives a session and the loader options of the model, and returns the row
+            queried with that session.
+        """
+        if not self.enabled or model.cache_ttl <= 0:
+            return loader(DB(), self.load_options(model))
+
+        self._check_versions()
+        cache = self._get_cache(model)
+        row = cache.get(key)
+        if row is None:
+            # A short-lived session, the objects of the session of the request (e.g. its user's role, or a template
+            # it modified) are never detached. Closing it detaches the row and the rows loaded with it.
+            with Session(bind=DB.get_bind()) as session:
+                row = loader(session, self.load_options(model))
+            if row is None:
+                return None
+            cache.set(key, row)
+
+        # The instance the request already has is returned as it is, merging would overwrite its changes
+        existing = DB.identity_map.get(inspect(row).key)
+        if existing is not None:
+            return existing
+        return DB.merge(row, load=False)
+
+    def invalidate(self, model):
+        """
+        Clears the rows of *model* in this process and increments its version for the other processes.
+        """
+        if model.__tablename__ in self._caches:
+            self._caches[model.__tablename__].clear()
+        if not self.version_check_interval:
+            return
+
+        name = model.__tablename__
+        increment = text("UPDATE cache_version SET version = version + 1 WHERE name = :name")
+        try:
+            try:
+                # In its own connection, the transaction of the caller is not touched
+                with DB.get_bind().begin() as connection:
+                    if not connection.execute(increment, {"name": name}).rowcount:
+                        connection.execute(text("INSERT INTO cache_version (name, version) VALUES (:name, 1)"), {"name": name})
+            except IntegrityError:
+                # Inserted by another process meanwhile
+                with DB.get_bind().begin() as connection:
+                    connection.execute(increment, {"name": name})
+        except SQLAlchemyError as exc:
+            logger.error(f"[REFERENCE-CACHE] Error incrementing the version of {name}: {exc}")
+
+    def clear(self):
+        with self._lock:
+            for cache in self._caches.values():
+                cache.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns the hit/miss counters of each model and how many times the versions were checked.
+        """
+        return {
+            "models": {name: cache.stats() for name, cache in self._caches.items()},
+            "version_checks": self.version_checks,
+        }
+
+    @staticmethod
+    def load_options(model) -> list:
+        """
+        Loader options of the cached rows: every column and the many-to-one relationships are loaded with the row,
+        so a cached row never needs a lazy load.
+        """
+        options = [undefer("*")]
+        for relationship in inspect(model).relationships:
+            if not relationship.uselist:
+                options.append(joinedload(getattr(model, relationship.key)))
+        return options
+
+    def _get_cache(self, model) -> LRUCache:
+        cache = self._caches.get(model.__tablename__)
+        if cache is None:
+            with self._lock:
+                cache = self._caches.setdefault(model.__tablename__, LRUCache(self.maxsize, model.cache_ttl))
+        return cache
+
+    def _check_versions(self):
+        if not self.version_check_interval or time.monotonic() < self._next_check:
+            return
+        if not self._lock.acquire(blocking=False):
+            # Another thread is checking them
+            return
+
+        try:
+            self._next_check = time.monotonic() + self.version_check_interval
+            self.version_checks += 1
+            with DB.get_bind().connect() as connection:
+                versions = dict(connection.execute(text("SELECT name, version FROM cache_version")).all())
+            for name, cache in self._caches.items():
+                if versions.get(name, 0) != self._versions.get(name, 0):
+                    cache.clear()
+            self._versions = versions
+        except SQLAlchemyError as exc:
+            logger.error(f"[REFERENCE-CACHE] Error checking the versions, the rows expire with their ttl: {exc}")
+        finally:
+            self._lock.release()
@@ -0,0 +1,80 @@
+import configparser
+import importlib
+import pkgutil
+
+from sqlalchemy import inspect
+from sqlalchemy.exc import SQLAlchemyError
+
+import models
+from core.database import Base, engine
+from core.Utils import Utils, logger
+
+
+class SchemaCheck:
+    """
+    Compares the tables declared by the models with the live schema of the database.
+    The models are not reflected when they are imported, so a column added to or removed from the database
+    without updating its model is only reported here.
+    """
+
+    @staticmethod
+    def is_enabled() -> bool:
+        config = configparser.ConfigParser()
+        config.read(Utils.get_config_ini_file_path())
+        return config.getboolean("DATABASE", "schema_check", fallback=True)
+
+    @staticmethod
+    def compare(engine, metadata) -> list[str]:
+        """
+        Returns the differences between the tables of *metadata* and the database of *engine*: missing tables,
+        declared columns missing in the database, and columns of the database that are not declared and can not
+        be left out of an INSERT (NOT NULL without a default).
+        """
+        problems = []
+        inspector = inspect(engine)
+        existing_tables = set(inspector.get_table_names())
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                problems.append(f"table '{table.name}' does not exist")
+                continue
+
+            live_columns = {column["name"]: column for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in live_columns:
+                    problems.append(f"column '{table.name}.{column.name}' does not exist")
+            for name, column in live_columns.items():
+                if name in table.columns:
+                    continue
+                if not column["nullable"] and column.get("default") is None and not column.get("autoincrement"):
+                    problems.append(f"column '{table.name}.{name}' is NOT NULL without a default and not declared in the model")
+                else:
+                    logger.info(f"[SCHEMA-CHECK] column '{table.name}.{name}' is not declared in the model")
+
+        return problems
+
+    @staticmethod
+    def load_models() -> int:
+        """
+        Imports every module of the models package, so the tables only used out of the server (e.g. by the crons)
+        are declared in the metadata too. Returns the number of tables declared.
+        """
+        for module in pkgutil.iter_modules(models.__path__):
+            importlib.import_module(f"{models.__name__}.{module.name}")
+        return len(Base.metadata.tables)
+
+    @staticmethod
+    def run():
+        """
+        Logs the differences between every model and the database, meant to run in the background at startup.
+        """
+        SchemaCheck.load_models()
+        try:
+            problems = SchemaCheck.compare(engine, Base.metadata)
+        except SQLAlchemyError as exc:
+            logger.error(f"[SCHEMA-CHECK] Error reading the schema of the database: {exc}")
+            return
+
+        for problem in problems:
+            logger.error(f"[SCHEMA-CHECK] {problem}")
+        if not problems:
+            logger.info(f"[SCHEMA-CHECK] {len(Base.metadata.tables)} tables match the models")
@@ -0,0 +1,291 @@
+import configparser
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+
+from core.classes.BackgroundDispatcher import BackgroundDispatcher
+from core.classes.LRUCache import LRUCache
+from core.database import request_query_stats
+from core.Utils import Utils, logger
+
+
+class SlowQueryLog:
+    """
+    Records the SQL statements of an engine that take longer than a threshold: their normalized SQL,
+    the types of their parameters (never the values), the route and code that executed them and, for the first
+    occurrence of each statement, its EXPLAIN plan run by the BackgroundDispatcher, at most explains_per_minute.
+    An EXPLAIN that can not be queued (queue full, dispatcher stopping) is dropped, it never runs in the request.
+
+    The recent statements are kept in a ring buffer, see top(), and written as JSON lines to a rotating file,
+    or to the logger on Lambda where the file system is read-only.
+    """
+
+    # Modules skipped when looking for the code that executed a statement
+    _INTERNAL_MODULES = ("sqlalchemy", "core.database", "core.Model", __name__)
+
+    _PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\?|:\w+")
+    _STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+    _NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+    _IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+    _WHITESPACE = re.compile(r"\s+")
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        threshold_ms: float = 200,
+        buffer_size: int = 1000,
+        explain: bool = True,
+        explains_per_minute: int = 30,
+        log_file: str = None,
+        log_max_bytes: int = 10 * 1024 * 1024,
+        log_backups: int = 5,
+    ):
+        """
+        :param enabled: If False install() does nothing.
+        :param threshold_ms: Statements that take at least these milliseconds are recorded.
+        :param buffer_size: Number of recent slow statements kept in memory.
+        :param explain: Whether to capture the EXPLAIN plan of the statements, only when the dispatcher has workers.
+        :param explains_per_minute: Max number of EXPLAIN run per minute.
+        :param log_file: Path of the rotating file, None to write to the logger.
+        :param log_max_bytes: Size of the file before it is rotated.
+        :param log_backups: Number of rotated files kept.
+        """
+        self.enabled = enabled
+        self.threshold = threshold_ms / 1000
+        self.entries: deque = deque(maxlen=buffer_size)
+        self.explain = explain
+        self.explain_interval = 60 / explains_per_minute if explains_per_minute > 0 else None
+        # EXPLAIN plan of each fingerprint, each statement is explained once an hour at most
+        self.plans = LRUCache(buffer_size, 3600)
+        self._next_explain = 0.0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._engines = []
+
+        self.file_logger = None
+        if log_file:
+            self.file_logger = logging.getLogger(f"{__name__}.file")
+            self.file_logger.propagate = False
+            self.file_logger.setLevel(logging.INFO)
+            if not self.file_logger.handlers:
+                handler = RotatingFileHandler(log_file, maxBytes=log_max_bytes, backupCount=log_backups)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                self.file_logger.addHandler(handler)
+
+    @staticmethod
+    def get_instance() -> "SlowQueryLog":
+        """
+        Returns the slow query log of the process, configured with the SLOW_QUERY section of the config file.
+        """
+        if SlowQueryLog._instance is None:
+            with SlowQueryLog._instance_lock:
+                if SlowQueryLog._instance is None:
+                    config = configparser.ConfigParser()
+                    config.read(Utils.get_config_ini_file_path())
+                    log_file = config.get("SLOW_QUERY", "log_file", fallback="")
+                    if not log_file or os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+                        log_file = None
+                    elif not os.path.isabs(log_file):
+                        log_file = os.path.join(os.path.dirname(Utils.get_config_ini_file_path()), log_file)
+                    SlowQueryLog._instance = SlowQueryLog(
+                        enabled=config.getboolean("SLOW_QUERY", "enabled", fallback=False),
+                        threshold_ms=config.getfloat("SLOW_QUERY", "threshold_ms", fallback=200),
+                        buffer_size=config.getint("SLOW_QUERY", "buffer_size", fallback=1000),
+                        explain=config.getboolean("SLOW_QUERY", "explain", fallback=True),
+                        explains_per_minute=config.getint("SLOW_QUERY", "explains_per_minute", fallback=30),
+                        log_file=log_file,
+                        log_max_bytes=config.getint("SLOW_QUERY", "log_max_bytes", fallback=10 * 1024 * 1024),
+                        log_backups=config.getint("SLOW_QUERY", "log_backups", fallback=5),
+                    )
+
+        return SlowQueryLog._instance
+
+    def install(self, engine):
+        """
+        Starts recording the slow statements of *engine*, if enabled.
+        """
+        if not self.enabled or engine in self._engines:
+            return
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        self._engines.append(engine)
+
+    def uninstall(self, engine):
+        if engine not in self._engines:
+            return
+        event.remove(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+        self._engines.remove(engine)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["slow_query_start"] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop("slow_query_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        if elapsed < self.threshold or getattr(self._local, "explaining", False):
+            return
+
+        self.record(conn.engine, statement, parameters, executemany, elapsed)
+
+    def record(self, engine, statement: str, parameters, executemany: bool, elapsed: float):
+        """
+        Records a slow statement and queues its EXPLAIN if its plan was not captured recently.
+        """
+        sql = self.normalize(statement)
+        fingerprint = hashlib.sha1(sql.encode("utf-8")).hexdigest()[:12]
+        stats = request_query_stats.get()
+        model_call, caller = self.find_caller()
+        entry = {
+            "fingerprint": fingerprint,
+            "sql": sql,
+            "parameters": self.parameter_shape(parameters, executemany),
+            "ms": round(elapsed * 1000, 3),
+            "origin": getattr(stats, "origin", None),
+            "model_call": model_call,
+            "caller": caller,
+            "timestamp": Utils.date_formatter(datetime.now(timezone.utc)),
+        }
+        self.entries.append(entry)
+        self._write(entry)
+
+        if not executemany and self._should_explain(fingerprint):
+            # Never in the request, it would run inside this cursor execution with a second connection of the pool
+            if not BackgroundDispatcher.get_instance().try_submit(self._explain, engine, fingerprint, statement, parameters):
+                self.plans.delete(fingerprint)
+
+    def top(self, limit: int = 20) -> list[dict]:
+        """
+        Returns the statements of the ring buffer grouped by fingerprint, ordered by their total time.
+        """
+        groups: dict[str, dict] = {}
+        for entry in list(self.entries):
+            group = groups.get(entry["fingerprint"])
+            if group is None:
+                group = groups[entry["fingerprint"]] = {
+                    "fingerprint": entry["fingerprint"],
+                    "sql": entry["sql"],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "parameters": entry["parameters"],
+                    "origins": [],
+                    "callers": [],
+                    "last_seen": None,
+                }
+            group["count"] += 1
+            group["total_ms"] += entry["ms"]
+            group["max_ms"] = max(group["max_ms"], entry["ms"])
+            group["last_seen"] = entry["timestamp"]
+            for key, value in (("origins", entry["origin"]), ("callers", entry["model_call"] or entry["caller"])):
+                if value and value not in group[key]:
+                    group[key].append(value)
+
+        offenders = sorted(groups.values(), key=lambda group: group["total_ms"], reverse=True)[:limit]
+        for group in offenders:
+            group["total_ms"] = round(group["total_ms"], 3)
+            group["avg_ms"] = round(group["total_ms"] / group["count"], 3)
+            group["explain"] = self.plans.get(group["fingerprint"])
+
+        return offenders
+
+    @staticmethod
+    def normalize(statement: str) -> str:
+        """
+        Returns *statement* with its parameters and literals replaced by ? and the lists of them collapsed,
+        e.g. IN (...), so the executions of a statement with different values or list lengths are grouped together.
+        """
+        sql = SlowQueryLog._STRING.sub("?", statement)
+        sql = SlowQueryLog._PLACEHOLDER.sub("?", sql)
+        sql = SlowQueryLog._NUMBER.sub("?", sql)
+        sql = SlowQueryLog._IN_LIST.sub("(...)", sql)
+        return SlowQueryLog._WHITESPACE.sub(" ", sql).strip()
+
+    @staticmethod
+    def parameter_shape(parameters, executemany: bool = False):
+        """
+        Returns the type names of *parameters*, the values are never recorded.
+        """
+        if executemany and isinstance(parameters, (list, tuple)):
+            first = SlowQueryLog.parameter_shape(parameters[0]) if parameters else None
+            return {"rows": len(parameters), "row": first}
+        if isinstance(parameters, dict):
+            return {key: type(value).__name__ for key, value in parameters.items()}
+        if isinstance(parameters, (list, tuple)):
+            return [type(value).__name__ for value in parameters]
+        return type(parameters).__name__
+
+    @staticmethod
+    def find_caller() -> tuple[str | None, str | None]:
+        """
+        Returns the Model method that executed the statement, e.g. "User.get_all", and the first frame out of
+        SQLAlchemy and the models as "module:line function".
+        """
+        model_call = None
+        frame = sys._getframe(1)
+        while frame is not None:
+            module = frame.f_globals.get("__name__", "")
+            if module == "core.Model" and model_call is None and "cls" in frame.f_locals:
+                model_call = f"{frame.f_locals['cls'].__name__}.{frame.f_code.co_name}"
+            elif module == "core.Model" and model_call is None and "self" in frame.f_locals:
+                model_call = f"{type(frame.f_locals['self']).__name__}.{frame.f_code.co_name}"
+            elif not module.startswith(SlowQueryLog._INTERNAL_MODULES):
+                return model_call, f"{module}:{frame.f_lineno} {frame.f_code.co_name}"
+            frame = frame.f_back
+
+        return model_call, None
+
+    def _should_explain(self, fingerprint: str) -> bool:
+        if not self.explain or self.explain_interval is None or BackgroundDispatcher.get_instance().workers <= 0:
+            return False
+
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_explain or self.plans.get(fingerprint) is not None:
+                return False
+            self._next_explain = now + self.explain_interval
+            # Reserved, so the same statement is not explained again while it runs
+            self.plans.set(fingerprint, [])
+            return True
+
+    def _explain(self, engine, fingerprint: str, statement: str, parameters):
+        if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT", "REPLACE", "WITH")):
+            self.plans.delete(fingerprint)
+            return
+
+        # The EXPLAIN goes through the same engine, it must not be recorded and explained again
+        self._local.explaining = True
+        try:
+            with engine.connect() as connection:
+                result = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+                plan = [dict(row._mapping) for row in result]
+            self.plans.set(fingerprint, plan)
+            self._write({"fingerprint": fingerprint, "explain": plan})
+        except SQLAlchemyError as exc:
+            self.plans.delete(fingerprint)
+            logger.warning(f"[SLOW-QUERY] Error explaining {fingerprint}: {exc}")
+        finally:
+            self._local.explaining = False
+
+    def _write(self, entry: dict):
+        line = json.dumps(entry, default=str, ensure_ascii=False)
+        if self.file_logger is not None:
+            self.file_logger.info(line)
+        else:
+            logger.warning(f"[SLOW-QUERY] {line}")
@@ -1,5 +1,6 @@
 from datetime import datetime, timezone
 
+from core.classes.BackgroundDispatcher import BackgroundDispatcher
 from core.Utils import logger
 from crons.SmsCrontab import SmsCrontab
 from models.SmsPool import SmsPool, SmsTemplate
@@ -13,7 +14,7 @@ class SmsClient:
         if data is None:
             data = {}
 
-        template = SmsTemplate.get(template_id)
+        template = SmsTemplate.get_cached(template_id)
         message = SmsClient.format_message(template, data)
 
         if isinstance(user, list):
@@ -27,7 +28,14 @@ class SmsClient:
             return
 
         if send_now and send_time.replace(tzinfo=timezone.utc) <= datetime.now(timezone.utc):
-            SmsCrontab().send_one_sms(sms_pool)
+            BackgroundDispatcher.get_instance().submit(SmsClient.send_from_pool, sms_pool.id)
+
+    @staticmethod
+    def send_from_pool(sms_pool_id: int):
+        """
+        Sends the sms of the pool right away, runs in the background dispatcher.
+        """
+        SmsCrontab().send_sms(1, ids=[sms_pool_id])
 
     @staticmethod
     def format_message(template: SmsTemplate, data: dict):
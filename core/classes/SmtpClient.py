@@ -1,20 +1,28 @@
 from datetime import datetime, timezone
 
-from jinja2 import Template
+from sqlalchemy.orm import undefer
 
+from core.classes.BackgroundDispatcher import BackgroundDispatcher
+from core.classes.LazyModule import LazyModule
+from core.classes.LRUCache import LRUCache
 from core.Utils import logger
 from crons.SmtpClientCrontab import SmtpClientCrontab
 from models.EmailPool import EmailPool, EmailTemplate, datetime
 from models.User import User
 
+jinja = LazyModule("jinja2")
+
 
 class SmtpClient:
+    _jinja_environment = None
+    # Compiled jinja2 templates by (template id, hash of its html), a template changed in the database is compiled again
+    _jinja_templates = LRUCache(256, 3600)
 
     @staticmethod
     def send_email_to_pool(template_id: int, email, data: dict = None, send_time: datetime = datetime.now(timezone.utc), send_now=False, jinja2=False):
         if data is None:
             data = {}
-        template = EmailTemplate.get(template_id)
+        template = EmailTemplate.get_cached(template_id)
         if jinja2:
             content = SmtpClient.format_content_jinja2(template, data)
         else:
@@ -31,8 +39,14 @@ class SmtpClient:
             return
 
         if send_now and send_time.replace(tzinfo=timezone.utc) <= datetime.now(timezone.utc):
-            client = SmtpClientCrontab()
-            client.send_one_email(email_pool)
+            BackgroundDispatcher.get_instance().submit(SmtpClient.send_from_pool, email_pool.id)
+
+    @staticmethod
+    def send_from_pool(email_pool_id: int):
+        """
+        Sends the email of the pool right away, runs in the background dispatcher.
+        """
+        SmtpClientCrontab().send_emails(1, ids=[email_pool_id])
 
     @staticmethod
     def format_content(template: EmailTemplate, data: dict):
@@ -44,10 +58,42 @@ class SmtpClient:
 
     @staticmethod
     def format_content_jinja2(template: EmailTemplate, data: dict):
-        jinja_template = Template(str(template.html))
+        jinja_template = SmtpClient.get_jinja_template(template)
 
         return jinja_template.render(data=data)
 
+    @staticmethod
+    def get_jinja_template(template: EmailTemplate):
+        """
+        Returns the html of *template* compiled by jinja2, compiling it only the first time.
+        """
+        html = str(template.html)
+        key = (template.id, hash(html))
+        jinja_template = SmtpClient._jinja_templates.get(key)
+        if jinja_template is None:
+            if SmtpClient._jinja_environment is None:
+                SmtpClient._jinja_environment = jinja.Environment()
+            jinja_template = SmtpClient._jinja_environment.from_string(html)
+            SmtpClient._jinja_templates.set(key, jinja_template)
+
+        return jinja_template
+
+    @staticmethod
+    def compile_templates() -> int:
+        """
+        Compiles the enabled email templates ahead of the first email, returns how many were compiled.
+        The templates that are not valid jinja2 are skipped, they are only sent with format_content().
+        """
+        compiled = 0
+        for template in EmailTemplate.get_all(options=[undefer(EmailTemplate.html)]):
+            try:
+                SmtpClient.get_jinja_template(template)
+                compiled += 1
+            except jinja.TemplateSyntaxError:
+                continue
+
+        return compiled
+
     @staticmethod
     def save_to_pool(template: EmailTemplate, content: str, send_time: datetime, email: str):
         email_pool = EmailPool(
@@ -0,0 +1,202 @@
+import atexit
+import configparser
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.Utils import Utils, logger
+
+
+class SmtpConnection:
+    """
+    An authenticated SMTP connection of the pool with the number of messages sent through it.
+    """
+    __slots__ = ("smtp", "sent", "last_used")
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+
+
+class SmtpConnectionPool:
+    """
+    A set of authenticated SMTP connections that are reused between sends, so the TCP, TLS and login
+    round trips are paid once per connection instead of once per email, and used concurrently to send batches.
+    A connection is replaced after max_messages_per_connection messages, when it was idle longer than
+    idle_timeout, and when the server closes it.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        server: str,
+        port: int,
+        username: str = None,
+        password: str = None,
+        pool_size: int = 4,
+        max_messages_per_connection: int = 100,
+        security: str = "starttls",
+        timeout: float = 30,
+        idle_timeout: float = 60,
+    ):
+        """
+        :param server: SMTP server host.
+        :param port: SMTP server port.
+        :param username: Login username, the connections are not authenticated if empty.
+        :param password: Login password.
+        :param pool_size: Max number of connections open at the same time.
+        :param max_messages_per_connection: Messages sent through a connection before it is opened again.
+        :param security: starttls, ssl (implicit TLS, usually port 465) or none.
+        :param timeout: Socket timeout of the connections in seconds.
+        :param idle_timeout: Idle connections older than this many seconds are not reused, servers close them.
+        """
+        self.server = server
+        self.port = int(port)
+        self.username = username
+        self.password = password
+        self.pool_size = max(1, pool_size)
+        self.max_messages_per_connection = max_messages_per_connection
+        self.security = security
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self.connections_opened = 0
+
+    @staticmethod
+    def get_instance() -> "SmtpConnectionPool":
+        """
+        Returns the pool of the process, configured with the SMTP section of the config file.
+        """
+        if SmtpConnectionPool._instance is None:
+            with SmtpConnectionPool._instance_lock:
+                if SmtpConnectionPool._instance is None:
+                    config = configparser.ConfigParser()
+                    config.read(Utils.get_config_ini_file_path())
+                    SmtpConnectionPool._instance = SmtpConnectionPool(
+                        server=config.get("SMTP", "server").strip(),
+                        port=config.getint("SMTP", "port"),
+                        username=config.get("SMTP", "username").strip(),
+                        password=config.get("SMTP", "password"),
+                        pool_size=config.getint("SMTP", "pool_size", fallback=4),
+                        max_messages_per_connection=config.getint("SMTP", "max_messages_per_connection", fallback=100),
+                        security=config.get("SMTP", "security", fallback="starttls").strip(),
+                    )
+                    atexit.register(SmtpConnectionPool._instance.close)
+
+        return SmtpConnectionPool._instance
+
+    def sendmail(self, from_addr: str, to_addrs, msg: str) -> dict:
+        """
+        Sends *msg* through a connection of the pool, waiting for one if all are in use.
+        If the server closed the connection, the message is sent again once through a new connection.
+
+        :return: The refused recipients like smtplib.SMTP.sendmail, empty if all were accepted.
+        """
+        for attempt in range(2):
+            connection = self._acquire()
+            try:
+                refused = connection.smtp.sendmail(from_addr, to_addrs, msg)
+            except smtplib.SMTPServerDisconnected:
+                self._release(connection, discard=True)
+                if attempt:
+                    raise
+                continue
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+                # The transaction was reset by smtplib, the connection is still usable
+                connection.sent += 1
+                self._release(connection)
+                raise
+            except BaseException:
+                self._release(connection, discard=True)
+                raise
+
+            connection.sent += 1
+            self._release(connection)
+            return refused
+
+    def send_many(self, messages: list) -> list:
+        """
+        Sends the messages concurrently through the connections of the pool.
+
+        :param messages: A list of (from_addr, to_addrs, msg) tuples.
+        :return: A list with the result of each message in the same order: None if it was sent,
+                 the refused recipients dict or the exception otherwise.
+        """
+        def send(message):
+            try:
+                return self.sendmail(*message) or None
+            except (smtplib.SMTPException, OSError) as exc:
+                logger.error(f"[ERROR-SENDING-EMAIL] {message[1]}: {exc}")
+                return exc
+
+        if len(messages) <= 1 or self.pool_size == 1:
+            return [send(message) for message in messages]
+
+        with ThreadPoolExecutor(max_workers=min(self.pool_size, len(messages)), thread_name_prefix="smtp") as executor:
+            return list(executor.map(send, messages))
+
+    def close(self):
+        """
+        Closes the idle connections.
+        """
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _acquire(self) -> SmtpConnection:
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    connection = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if time.monotonic() - connection.last_used < self.idle_timeout:
+                    return connection
+                connection.close()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, connection: SmtpConnection, discard: bool = False):
+        try:
+            if discard or connection.sent >= self.max_messages_per_connection:
+                connection.close()
+            else:
+                connection.last_used = time.monotonic()
+                self._idle.put(connection)
+        finally:
+            self._slots.release()
+
+    def _connect(self) -> SmtpConnection:
+        if self.security == "ssl":
+            smtp = smtplib.SMTP_SSL(self.server, self.port, timeout=self.timeout, context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        try:
+            if self.security == "starttls":
+                smtp.starttls(context=ssl.create_default_context())
+            if self.username:
+                smtp.login(self.username, self.password)
+        except BaseException:
+            smtp.close()
+            raise
+
+        self.connections_opened += 1
+        return SmtpConnection(smtp)
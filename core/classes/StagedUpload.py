@@ -0,0 +1,140 @@
+import base64
+import hashlib
+import io
+import os
+import tempfile
+
+
+class FileSizeGreaterThanAllowed(Exception):
+    """Exception raised for errors in file processing"""
+
+    def __init__(self, max_file_size: int = None):
+        limit = f"{max_file_size / 1_000_000:g}MB" if max_file_size else "4MB"
+        self.message = f"The file size exceeds the allowed limit of {limit}."
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class StagedUpload:
+    """
+    An uploaded file written to a temporary file chunk by chunk while it is hashed and its size checked,
+    so an upload never has to be held in memory. The temporary file is removed by cleanup()
+    unless it was moved to its final place with move_to().
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, path: str, size: int, sha256: str, content_type: str = None):
+        """
+        :param path: Path of the temporary file.
+        :param size: Size of the file in bytes.
+        :param sha256: Hex digest of the content of the file.
+        :param content_type: MIME type of the file.
+        """
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.content_type = content_type
+        self._owned = True
+
+    @staticmethod
+    def from_stream(stream, directory: str, max_file_size: int = None, content_type: str = None, chunk_size: int = CHUNK_SIZE) -> "StagedUpload":
+        """
+        Writes *stream* to a temporary file in *directory*.
+
+        :param stream: A file-like object with a read(size) method.
+        :param directory: Directory of the temporary file, in the same file system as the final place of the file
+                          it can be moved without copying it.
+        :param max_file_size: Max size in bytes, FileSizeGreaterThanAllowed is raised as soon as it is exceeded.
+        :param content_type: MIME type of the file.
+        :return: The staged upload.
+        """
+        path = StagedUpload.temp_path(directory)
+        sha256 = hashlib.sha256()
+        size = 0
+        try:
+            with open(path, "wb") as file:
+                while chunk := stream.read(chunk_size):
+                    size += len(chunk)
+                    if max_file_size is not None and size > max_file_size:
+                        raise FileSizeGreaterThanAllowed(max_file_size)
+                    sha256.update(chunk)
+                    file.write(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+
+        return StagedUpload(path, size, sha256.hexdigest(), content_type)
+
+    @staticmethod
+    def from_bytes(data: bytes, directory: str, content_type: str = None) -> "StagedUpload":
+        return StagedUpload.from_stream(io.BytesIO(data), directory, content_type=content_type)
+
+    @staticmethod
+    def from_file(path: str, content_type: str = None, chunk_size: int = CHUNK_SIZE) -> "StagedUpload":
+        """
+        Stages a temporary file already written in *path*, e.g. by PIL.
+        """
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as file:
+            while chunk := file.read(chunk_size):
+                sha256.update(chunk)
+
+        return StagedUpload(path, os.stat(path).st_size, sha256.hexdigest(), content_type)
+
+    @staticmethod
+    def temp_path(directory: str) -> str:
+        """
+        Returns the path of a new empty temporary file in *directory*.
+        """
+        os.makedirs(directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=directory, suffix="~")
+        os.close(fd)
+        return path
+
+    def open(self):
+        return open(self.path, "rb")
+
+    def read(self) -> bytes:
+        with self.open() as file:
+            return file.read()
+
+    def encode_to_base64(self, chunk_size: int = 3 * CHUNK_SIZE):
+        """
+        Replaces the content of the file with its base64, encoding it in chunks.
+        The size and hash still describe the original content.
+        """
+        encoded_path = StagedUpload.temp_path(os.path.dirname(self.path))
+        try:
+            with self.open() as source, open(encoded_path, "wb") as encoded:
+                # Chunks multiple of 3 bytes are encoded without padding, so they can be concatenated
+                while chunk := source.read(chunk_size):
+                    encoded.write(base64.b64encode(chunk))
+            os.replace(encoded_path, self.path)
+        except BaseException:
+            os.remove(encoded_path)
+            raise
+
+    def move_to(self, path: str):
+        """
+        Moves the file to *path*, it is not removed by cleanup() anymore.
+        """
+        os.replace(self.path, path)
+        self.path = path
+        self._owned = False
+
+    def cleanup(self):
+        """
+        Removes the temporary file, if it was not moved.
+        """
+        if self._owned and os.path.exists(self.path):
+            os.remove(self.path)
+        self._owned = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
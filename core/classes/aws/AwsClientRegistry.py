@@ -0,0 +1,146 @@
+import configparser
+import threading
+import time
+
+from core.classes.LazyModule import LazyModule
+from core.Utils import Utils
+
+boto3 = LazyModule("boto3")
+botocore_config = LazyModule("botocore.config")
+
+
+class AwsClientRegistry:
+    """
+    Process-wide cache of boto3 sessions, clients and resources keyed by (service, region, profile).
+
+    Creating a session or a client reads the credentials and loads the service model of botocore, which takes
+    tens of milliseconds, so they are created once and reused. Clients are thread-safe and shared by every
+    thread and greenlet. Resources are not, so they are cached per thread.
+    Creation and lookup times are recorded per key, see stats().
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_pool_connections: int = 50, connect_timeout: float = 5, read_timeout: float = 60):
+        """
+        :param max_pool_connections: Max number of open HTTP connections of each client, botocore keeps 10 by default.
+        :param connect_timeout: Seconds to wait for a connection.
+        :param read_timeout: Seconds to wait for a response.
+        """
+        self.config = botocore_config.Config(
+            max_pool_connections=max_pool_connections,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retries={"mode": "standard"},
+        )
+        self._sessions: dict[str, "boto3.Session"] = {}
+        self._clients: dict[tuple, object] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats: dict[tuple, dict] = {}
+
+    @staticmethod
+    def get_instance() -> "AwsClientRegistry":
+        """
+        Returns the registry of the process, configured with the AWS section of the config file.
+        """
+        if AwsClientRegistry._instance is None:
+            with AwsClientRegistry._instance_lock:
+                if AwsClientRegistry._instance is None:
+                    config = configparser.ConfigParser()
+                    config.read(Utils.get_config_ini_file_path())
+                    AwsClientRegistry._instance = AwsClientRegistry(
+                        max_pool_connections=config.getint("AWS", "max_pool_connections", fallback=50),
+                        connect_timeout=config.getfloat("AWS", "connect_timeout", fallback=5),
+                        read_timeout=config.getfloat("AWS", "read_timeout", fallback=60),
+                    )
+
+        return AwsClientRegistry._instance
+
+    def client(self, service: str, region: str = None, profile: str = None):
+        """
+        Returns the client of *service* in *region* with the credentials of *profile*, creating it the first time.
+        """
+        key = (service, region or None, profile or None)
+        start = time.perf_counter()
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._get_session(key[2]).client(service, region_name=key[1], config=self.config)
+                    self._clients[key] = client
+                    self._record(key, "client", time.perf_counter() - start, cold=True)
+                    return client
+
+        self._record(key, "client", time.perf_counter() - start)
+        return client
+
+    def resource(self, service: str, region: str = None, profile: str = None):
+        """
+        Returns the resource of *service* in *region* with the credentials of *profile* for the current thread.
+        """
+        key = (service, region or None, profile or None)
+        start = time.perf_counter()
+        resources = getattr(self._local, "resources", None)
+        if resources is None:
+            resources = self._local.resources = {}
+
+        resource = resources.get(key)
+        if resource is None:
+            # Sessions are not thread-safe either, the resource is created from the shared one under the lock
+            with self._lock:
+                resource = self._get_session(key[2]).resource(service, region_name=key[1], config=self.config)
+                # Under the lock, the first record of a key adds it to the stats that stats() iterates
+                self._record(key, "resource", time.perf_counter() - start, cold=True)
+            resources[key] = resource
+            return resource
+
+        self._record(key, "resource", time.perf_counter() - start)
+        return resource
+
+    def stats(self) -> dict:
+        """
+        Returns, per "kind:service:region:profile", how many were created and reused and their average latency in ms.
+        """
+        with self._lock:
+            return {
+                ":".join(str(part) for part in key): {
+                    "created": stats["created"],
+                    "reused": stats["reused"],
+                    "cold_ms": round(stats["cold_seconds"] / stats["created"] * 1000, 3) if stats["created"] else None,
+                    "warm_ms": round(stats["warm_seconds"] / stats["reused"] * 1000, 3) if stats["reused"] else None,
+                }
+                for key, stats in list(self._stats.items())
+            }
+
+    def clear(self):
+        """
+        Drops every cached session, client and resource, e.g. after the credentials changed.
+        """
+        with self._lock:
+            self._sessions.clear()
+            self._clients.clear()
+            self._local = threading.local()
+
+    def _get_session(self, profile: str = None) -> "boto3.Session":
+        # Called with the lock held
+        session = self._sessions.get(profile)
+        if session is None:
+            session = boto3.Session(profile_name=profile) if profile else boto3.Session()
+            self._sessions[profile] = session
+
+        return session
+
+    def _record(self, key: tuple, kind: str, seconds: float, cold: bool = False):
+        stats = self._stats.setdefault(
+            (kind, *key), {"created": 0, "reused": 0, "cold_seconds": 0.0, "warm_seconds": 0.0}
+        )
+        # Counters updated without the lock, a lost increment only skews the stats
+        if cold:
+            stats["created"] += 1
+            stats["cold_seconds"] += seconds
+        else:
+            stats["reused"] += 1
+            stats["warm_seconds"] += seconds
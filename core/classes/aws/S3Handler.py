@@ -1,6 +1,10 @@
 import tempfile
-import boto3
-from core.Utils import logger
+
+from core.classes.aws.AwsClientRegistry import AwsClientRegistry
+from core.classes.LazyModule import LazyModule
+
+botocore_exceptions = LazyModule("botocore.exceptions")
+s3_transfer = LazyModule("boto3.s3.transfer")
 
 
 class S3Handler(object):
@@ -9,10 +13,17 @@ class S3Handler(object):
     has methods to upload an download files and set parameters for Amazon S3.
     """
 
+    # Files larger than the threshold are uploaded in parts read from disk on demand
+    TRANSFER_SETTINGS = {
+        "multipart_threshold": 8 * 1024 * 1024,
+        "multipart_chunksize": 8 * 1024 * 1024,
+        "max_concurrency": 4,
+    }
+
     def __init__(self, bucket_name, region, profile=None):
         """
-        The __init__() method sets the bucket name, session by boto3.Session() method giving the profile name,
-        s3 using session.resource() method by region name and bucket by se3.Bucket() method with bucket name.
+        The __init__() method sets the bucket name and gets the s3 client for the region and profile
+        from the AwsClientRegistry, so the session and client are created once per process.
 
         Parameters
         ----------
@@ -24,16 +35,20 @@ class S3Handler(object):
                 A stringr for region name.
         """
         self.bucket_name = bucket_name
-        if profile:
-            self.session = boto3.Session(profile_name=profile)
-        else:
-            self.session = boto3.Session()
-        self.s3 = self.session.resource("s3", region_name=region)
-        self.bucket = self.s3.Bucket(bucket_name)
+        self.region = region
+        self.profile = profile
+        self.client = AwsClientRegistry.get_instance().client("s3", region, profile)
+
+    @property
+    def bucket(self):
+        """
+        The Bucket resource of the current thread, for the operations the client does not have.
+        """
+        return AwsClientRegistry.get_instance().resource("s3", self.region, self.profile).Bucket(self.bucket_name)
 
     def upload_file(self, fileObj, path, metadata={}, public="private"):
         """
-        The upload_file() method uploads a new file if a bucket exists using bucket.put_object() method.
+        The upload_file() method uploads a new file using the put_object() method of the client.
 
         Parameters
         ----------
@@ -48,30 +63,54 @@ class S3Handler(object):
 
         Returns
         -------
-        `instance`
-                A instance of bucket.put_object() method.
-        """
-        if self.bucket:
-            if "Content-Type" in metadata:
-                return self.bucket.put_object(
-                    Key=path,
-                    Body=fileObj,
-                    ACL=public,
-                    Metadata=metadata,
-                    ContentType=metadata["Content-Type"]
-                )
-            return self.bucket.put_object(
+        `dict`
+                The response of the put_object() method.
+        """
+        if "Content-Type" in metadata:
+            return self.client.put_object(
+                Bucket=self.bucket_name,
                 Key=path,
                 Body=fileObj,
                 ACL=public,
-                Metadata=metadata
+                Metadata=metadata,
+                ContentType=metadata["Content-Type"]
             )
-        return None
+        return self.client.put_object(
+            Bucket=self.bucket_name,
+            Key=path,
+            Body=fileObj,
+            ACL=public,
+            Metadata=metadata
+        )
+
+    def upload_file_path(self, file_path, key, metadata=None, public="private"):
+        """
+        The upload_file_path() method uploads the file in *file_path* using upload_file() of the client, which reads it
+        from disk as it is sent and uses a multipart upload for large files.
+
+        Parameters
+        ----------
+        file_path : `str`
+                Path of the file to upload.
+        key : `str`
+                A string of the key of the object.
+        metadata : `dict`
+                A dictionary of metadata.
+        public : `str`
+                A string for public, set as private by default.
+        """
+        if metadata is None:
+            metadata = {}
+        extra_args = {"ACL": public, "Metadata": metadata}
+        if "Content-Type" in metadata:
+            extra_args["ContentType"] = metadata["Content-Type"]
+
+        self.client.upload_file(file_path, self.bucket_name, key, ExtraArgs=extra_args, Config=s3_transfer.TransferConfig(**self.TRANSFER_SETTINGS))
 
     def download_file(self, path):
         """
-        The download_file() method downloads a file in a temporary file if a bucket exists
-        using bucket.download_fileobj() method.
+        The download_file() method downloads a file in a temporary file
+        using the download_fileobj() method of the client.
 
         Parameters
         ----------
@@ -83,18 +122,113 @@ class S3Handler(object):
         `instance`
                 A instance of a file.
         """
-        if self.bucket:
-            tmpFile = tempfile.NamedTemporaryFile()
-            self.bucket.download_fileobj(path, tmpFile)
-            tmpFile.seek(0)
-            return tmpFile
-        logger.error("No Bucket")
-        return None
+        tmpFile = tempfile.NamedTemporaryFile()
+        self.client.download_fileobj(self.bucket_name, path, tmpFile)
+        tmpFile.seek(0)
+        return tmpFile
+
+    def refresh_object(self, key):
+        """
+        The refresh_object() method copies an object onto itself, with its same metadata, so its LastModified
+        is updated without sending its content. Used to tell an object is still in use.
+
+        Parameters
+        ----------
+        key : `str`
+                A string of the key of the object.
+
+        Returns
+        -------
+        `bool`
+                True if the object exists and was refreshed, False if it does not exist.
+        """
+        try:
+            head = self.client.head_object(Bucket=self.bucket_name, Key=key)
+        except botocore_exceptions.ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+        self.client.copy_object(
+            Bucket=self.bucket_name,
+            Key=key,
+            CopySource={"Bucket": self.bucket_name, "Key": key},
+            Metadata=head.get("Metadata", {}),
+            ContentType=head.get("ContentType", "binary/octet-stream"),
+            MetadataDirective="REPLACE",
+        )
+        return True
+
+    def list_objects(self, prefix=""):
+        """
+        The list_objects() method yields the objects of the bucket whose key starts with *prefix*,
+        as the dictionaries of list_objects_v2() with "Key", "Size" and "LastModified".
+        """
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            yield from page.get("Contents", [])
+
+    def get_object_stream(self, key, byte_range=None):
+        """
+        The get_object_stream() method gets an object without downloading it, its body is read from S3
+        as it is read by the caller, so it can be sent while it is received.
+
+        Parameters
+        ----------
+        key : `str`
+                A string of the key of the object.
+        byte_range : `str`
+                Value of a Range header, e.g. "bytes=0-1023", to get only part of the object.
+
+        Returns
+        -------
+        `dict`
+                The get_object() response, with the streaming body in "Body" and
+                "ContentLength", "ContentRange" and "ContentType".
+
+        Raises
+        ------
+        `botocore.exceptions.ClientError`
+                With the code "NoSuchKey" if there is no such object, or "InvalidRange" if the range is not satisfiable.
+        """
+        params = {"Bucket": self.bucket_name, "Key": key}
+        if byte_range:
+            params["Range"] = byte_range
+
+        return self.client.get_object(**params)
+
+    def generate_presigned_url(self, key, expires_in=300, file_name=None, content_type=None):
+        """
+        The generate_presigned_url() method returns a temporary URL to download an object straight from S3.
+
+        Parameters
+        ----------
+        key : `str`
+                A string of the key of the object.
+        expires_in : `int`
+                Seconds the URL is valid for.
+        file_name : `str`
+                Name of the file for the Content-Disposition of the response.
+        content_type : `str`
+                Content-Type of the response.
+
+        Returns
+        -------
+        `str`
+                The presigned URL.
+        """
+        params = {"Bucket": self.bucket_name, "Key": key}
+        if file_name:
+            params["ResponseContentDisposition"] = f'inline; filename="{file_name}"'
+        if content_type:
+            params["ResponseContentType"] = content_type
+
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in)
 
     def delete_file(self, key):
         """
-        The delete_file() method deletes a file if a bucket exists
-        using bucket.delete_key() method.
+        The delete_file() method deletes a file
+        using the delete_objects() method of the client.
 
         Parameters
         ----------
@@ -106,8 +240,7 @@ class S3Handler(object):
         `bool`
                 True if file was deleted successfully, False otherwise
         """
-        if self.bucket:
-            deleted = self.bucket.delete_objects(Delete={"Objects": [{"Key": key}]})
-            if len(deleted.get("Deleted")) == 1:
-                return True
+        deleted = self.client.delete_objects(Bucket=self.bucket_name, Delete={"Objects": [{"Key": key}]})
+        if len(deleted.get("Deleted", [])) == 1:
+            return True
         return False
\ No newline at end of file
@@ -1,8 +1,10 @@
 import json
 import logging
 
-import boto3
-from botocore.exceptions import ClientError
+from core.classes.aws.AwsClientRegistry import AwsClientRegistry
+from core.classes.LazyModule import LazyModule
+
+botocore_exceptions = LazyModule("botocore.exceptions")
 
 logger = logging.getLogger(__name__)
 
@@ -12,9 +14,17 @@ class SnsHandler:
 
     def __init__(self, region_name: str):
         """
-        :param sns_resource: A Boto3 Amazon SNS resource.
+        :param region_name: The region of Amazon SNS, the client is shared by every handler of the process.
+        """
+        self.region_name = region_name
+        self.client = AwsClientRegistry.get_instance().client('sns', region_name)
+
+    @property
+    def sns_resource(self):
+        """
+        The Boto3 Amazon SNS resource of the current thread.
         """
-        self.sns_resource = boto3.resource('sns', region_name=region_name)
+        return AwsClientRegistry.get_instance().resource('sns', self.region_name)
 
     def publish_text_message(self, phone_number, message, prefix="+52"):
         """
@@ -28,11 +38,11 @@ class SnsHandler:
         :return: The ID of the message, None if any error
         """
         try:
-            response = self.sns_resource.meta.client.publish(
+            response = self.client.publish(
                 PhoneNumber=f"{prefix}{phone_number}", Message=message)
             message_id = response['MessageId']
             logger.info("Published message to %s.", f"{prefix}{phone_number}")
-        except ClientError:
+        except botocore_exceptions.ClientError:
             logger.exception("Couldn't publish message to %s.", f"{prefix}{phone_number}")
             return None
         else:
@@ -48,7 +58,7 @@ class SnsHandler:
         try:
             topic = self.sns_resource.create_topic(Name=name)
             logger.info("Created topic %s with ARN %s.", name, topic.arn)
-        except ClientError:
+        except botocore_exceptions.ClientError:
             logger.exception("Couldn't create topic %s.", name)
             raise
         else:
@@ -63,7 +73,7 @@ class SnsHandler:
         try:
             topics_iter = self.sns_resource.topics.all()
             logger.info("Got topics.")
-        except ClientError:
+        except botocore_exceptions.ClientError:
             logger.exception("Couldn't get topics.")
             raise
         else:
@@ -77,7 +87,7 @@ class SnsHandler:
         try:
             topic.delete()
             logger.info("Deleted topic %s.", topic.arn)
-        except ClientError:
+        except botocore_exceptions.ClientError:
             logger.exception("Couldn't delete topic %s.", topic.arn)
             raise
 
@@ -100,7 +110,7 @@ class SnsHandler:
             subscription = topic.subscribe(
                 Protocol=protocol, Endpoint=endpoint, ReturnSubscriptionArn=True)
             logger.info("Subscribed %s %s to topic %s.", protocol, endpoint, topic.arn)
-        except ClientError:
+        except botocore_exceptions.ClientError:
             logger.exception(
                 "Couldn't subscribe %s %s to topic %s.", protocol, endpoint, topic.arn)
             raise
@@ -121,7 +131,7 @@ class SnsHandler:
             else:
                 subs_iter = topic.subscriptions.all()
             logger.info("Got subscriptions.")
-        except ClientError:
+        except botocore_exceptions.ClientError:
             logger.exception("Couldn't get subscriptions.")
             raise
         else:
@@ -142,7 +152,7 @@ class SnsHandler:
             subscription.set_attributes(
                 AttributeName='FilterPolicy', AttributeValue=json.dumps(att_policy))
             logger.info("Added filter to subscription %s.", subscription.arn)
-        except ClientError:
+        except botocore_exceptions.ClientError:
             logger.exception(
                 "Couldn't add filter to subscription %s.", subscription.arn)
             raise
@@ -155,7 +165,7 @@ class SnsHandler:
         try:
             subscription.delete()
             logger.info("Deleted subscription %s.", subscription.arn)
-        except ClientError:
+        except botocore_exceptions.ClientError:
             logger.exception("Couldn't delete subscription %s.", subscription.arn)
             raise
 
@@ -184,7 +194,7 @@ class SnsHandler:
             logger.info(
                 "Published message with attributes %s to topic %s.", attributes,
                 topic.arn)
-        except ClientError:
+        except botocore_exceptions.ClientError:
             logger.exception("Couldn't publish message to topic %s.", topic.arn)
             raise
         else:
@@ -218,7 +228,7 @@ class SnsHandler:
                 Message=json.dumps(message), Subject=subject, MessageStructure='json')
             message_id = response['MessageId']
             logger.info("Published multi-format message to topic %s.", topic.arn)
-        except ClientError:
+        except botocore_exceptions.ClientError:
             logger.exception("Couldn't publish message to topic %s.", topic.arn)
             raise
         else:
@@ -1,12 +1,13 @@
-import re
 from http import HTTPStatus
 
 from falcon.request import Request
 from falcon.response import Response
 from sqlalchemy import and_
+from sqlalchemy.orm import joinedload
 
 from core.classes.JWT.JWTUtils import JWTUtils, datetime, timedelta, timezone
 from core.Utils import Utils, logger
+from engine.RouteLoader import RouteAuth
 from models.Device import Device
 from models.Session import Session
 from models.User import User
@@ -15,6 +16,10 @@ from models.Role import role_access
 
 class Authenticator(object):
 
+    def __init__(self):
+        # RouteAuth of every (uri_template, HTTP method), filled by the RouteLoader as the routes are added
+        self.routes: dict[tuple[str, str], RouteAuth] = {}
+
     def process_request(self, req: Request, resp: Response):
         # Process the request before routing it.
         pass
@@ -40,7 +45,8 @@ class Authenticator(object):
            - Validate the role associated with the token can access the resource.
            - If the role does not have access, respond with HTTP 403 Forbidden and mark the response as complete.
         """
-        if self.should_skip_authentication(req, resource, params):
+        route_auth = self.get_route_auth(req, resource)
+        if route_auth.skip_auth:
             req.context.token_data = None
         else:
             self.handle_authentication(req, resp, resource)
@@ -48,56 +54,28 @@ class Authenticator(object):
             if resp.complete:
                 return
             # Validate that the role can access the resource
-            role_id = req.context.token_data.get("role_id")
-            if role_accesses := role_access.get(role_id):
-                if resource.__class__.__name__ not in role_accesses:
-                    resource.response(resp, HTTPStatus.FORBIDDEN, error="Forbidden")
-                    resp.complete = True
+            if req.context.token_data.get("role_id") in route_auth.forbidden_roles:
+                resource.response(resp, HTTPStatus.FORBIDDEN, error="Forbidden")
+                resp.complete = True
 
-    def should_skip_authentication(self, req: Request, resource, params: dict):
+    def get_route_auth(self, req: Request, resource) -> RouteAuth:
         """
-        Determine if authentication should be skipped based on the URL and resource method
-        The URL is expected to contain the version (v1, v2, v20, etc.) in every URL: vx/{resource}
+        Returns the authentication requirement of the responder of the request, computed by the RouteLoader
+        when the route was added: the resource or its responder have a 'skip_auth' attribute set to True
+        (see Decorators.no_authorization_needed) and the roles that can not access the resource.
 
         Args:
-            req (Request): The incoming request object.
+            req (Request): The incoming request object, already routed.
             resource: The resource being accessed.
-            params (dict): The parameters extracted from the request URL.
 
         Returns:
-            bool: True if authentication should be skipped, False otherwise.
+            RouteAuth: The requirement of the route, or of the resource if the route was not added by the RouteLoader.
         """
-        # Check if the 'skip_auth' attribute of the resources is True
-        if getattr(resource, 'skip_auth', False):
-            return True
-
-        url_parts = req.path.split('/')
-        # Use a regular expression to find the version segment (e.g., v1, v2, v10, etc.)
-        version_pattern = re.compile(r'^v\d+$')
-        version_index = next((i for i, part in enumerate(url_parts) if version_pattern.match(part)), None)
-
-        # If a version segment is found, remove everything up to and including the version segment
-        if version_index is not None:
-            url_parts = url_parts[version_index + 1:]
+        route_auth = self.routes.get((req.uri_template, req.method))
+        if route_auth is None:
+            route_auth = RouteAuth.build(resource, None, role_access)
 
-        # If there is params, find that segment of the value and remove it from the URL parts
-        if params:
-            for value in params.values():
-                if value in url_parts:
-                    url_parts.remove(value)
-
-        # Construct the method name by prefixing 'on_' to the lowercase HTTP method of the request
-        method_name = 'on_' + req.method.lower()
-
-        # If there is more than one part in the URL, use the last part as a suffix
-        suffix = url_parts[-1] if len(url_parts) > 1 else None
-
-        # If a suffix is present, replace hyphens with underscores and append it to the method_name
-        if suffix:
-            method_name += '_' + suffix.replace('-', '_')
-
-        # Check if the resource has the method_name attribute and if the 'skip_auth' attribute of the method is True
-        return hasattr(resource, method_name) and getattr(getattr(resource, method_name), 'skip_auth', False)
+        return route_auth
 
     def handle_authentication(self, req, resp, resource):
         """
@@ -126,6 +104,27 @@ class Authenticator(object):
 
         req.context.token_data = token_data
 
+    @staticmethod
+    def get_session(req: Request) -> Session | None:
+        """
+        Returns the session of the token of the request.
+        The session, its user and the user role are resolved with a single joined query the first time
+        they are needed and stored in req.context, so later calls in the same request are free.
+
+        Args:
+            req (Request): The incoming request object, already authenticated.
+
+        Returns:
+            Session | None: The session of the request, None if it does not exist or it was closed.
+        """
+        session = getattr(req.context, "session", None)
+        if session is None:
+            session_id = req.context.token_data.get("session_id")
+            session = Session.get(Session.id == session_id, options=[joinedload(Session.user).joinedload(User.role)])
+            req.context.session = session
+
+        return session
+
     def process_response(self, req: Request, resp: Response, resource, req_succeeded):
         # Post-processing of the response (after routing).
         pass
@@ -0,0 +1,34 @@
+import time
+
+from core.classes.Metrics import Metrics
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, status and SQL statements of every request in Metrics.
+    It must be the first middleware, so its process_response runs last and the time includes the other middlewares
+    and the commit of SQLAlchemySessionManager. Streamed bodies are sent after it and are not included.
+    """
+
+    def __init__(self, metrics: Metrics = None):
+        self.metrics = metrics or Metrics.get_instance()
+
+    def process_request(self, req, resp):
+        req.context.request_start = time.perf_counter()
+        self.metrics.in_flight += 1
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        start = getattr(req.context, "request_start", None)
+        if start is None:
+            return
+
+        self.metrics.in_flight -= 1
+        query_stats = getattr(req.context, "query_stats", None)
+        self.metrics.observe_request(
+            req.uri_template or Metrics.UNMATCHED_ROUTE,
+            req.method,
+            resp.status_code,
+            time.perf_counter() - start,
+            query_stats.count if query_stats else 0,
+            query_stats.time if query_stats else 0.0,
+        )
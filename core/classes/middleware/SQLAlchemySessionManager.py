@@ -1,8 +1,29 @@
+import configparser
+
+from core.database import QueryStats
 from core.database import db_session as DB
+from core.database import request_query_stats
+from core.Utils import Utils
 
 
 class SQLAlchemySessionManager:
+    def __init__(self):
+        config = configparser.ConfigParser()
+        config.read(Utils.get_config_ini_file_path())
+        # Adds the X-Query-Count header with the number of SQL statements executed by the request
+        self.query_count_header = config.getboolean("DATABASE", "query_count_header", fallback=False)
+
+    def process_request(self, req, resp):
+        req.context.query_stats = QueryStats()
+        request_query_stats.set(req.context.query_stats)
+
+    def process_resource(self, req, resp, resource, params):
+        if resource is not None:
+            req.context.query_stats.origin = f"{resource.__class__.__name__} {req.method} {req.uri_template}"
+
     def process_response(self, req, resp, resource, req_succeeded):
+        if self.query_count_header and (stats := getattr(req.context, "query_stats", None)):
+            resp.set_header("X-Query-Count", str(stats.count))
         if DB:
             if not req_succeeded:
                 DB.rollback()
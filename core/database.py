@@ -1,11 +1,17 @@
 import configparser
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
+from typing import Optional
 
-from sqlalchemy import create_engine, event, exc, select
+from sqlalchemy import Engine, create_engine, event, exc, select
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import (DeclarativeBase, MappedAsDataclass, mapped_column,
                             scoped_session, sessionmaker)
+from sqlalchemy.pool import QueuePool
 
+from core.classes.Metrics import Metrics
 from core.Utils import Utils
 
 Config = configparser.ConfigParser()
@@ -17,8 +23,27 @@ database = Config.get("DATABASE", "database")
 user = Config.get("DATABASE", "user")
 password = Config.get("DATABASE", "password")
 
+
+class MeteredQueuePool(QueuePool):
+    """
+    QueuePool that records in Metrics how long each checkout waits for a connection, including opening a new one,
+    and the checkouts that time out.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            Metrics.get_instance().observe_pool_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        Metrics.get_instance().observe_pool_wait(time.perf_counter() - start)
+        return connection
+
+
 engine = create_engine(
     f"mysql+mysqlconnector://{user}:{password}@{host}:{port}/{database}",
+    poolclass=MeteredQueuePool,
     pool_size=20,
     max_overflow=10,
     pool_recycle=3600,
@@ -33,6 +58,59 @@ class Base(DeclarativeBase):
     pass
 
 
+class QueryStats:
+    """
+    Counts the SQL statements executed while handling a request and the seconds spent executing them
+    """
+    __slots__ = ("count", "time", "origin")
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        # Controller and route of the request, e.g. "UserController GET /v1/users", for the SlowQueryLog
+        self.origin = None
+
+
+# Stats of the request being handled, set by the SQLAlchemySessionManager middleware
+request_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    stats = request_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        conn.info["query_start"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def time_query(conn, cursor, statement, parameters, context, executemany):
+    stats = request_query_stats.get()
+    if stats is not None and (start := conn.info.pop("query_start", None)) is not None:
+        stats.time += time.perf_counter() - start
+
+
+@contextmanager
+def count_queries(max_queries: Optional[int] = None):
+    """
+    Counts the SQL statements executed inside the block, in any engine.
+    If *max_queries* is given, raises AssertionError when the block executed more statements.
+
+        with count_queries(max_queries=2) as stats:
+            Utils.serialize_model(User.get_all(options=...), recursive=True)
+        print(stats.count)
+    """
+    stats = QueryStats()
+    token = request_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        request_query_stats.reset(token)
+
+    if max_queries is not None and stats.count > max_queries:
+        raise AssertionError(f"{stats.count} queries executed, expected at most {max_queries}")
+
+
 """@event.listens_for(engine, "engine_connect")
 def ping_connection(connection, branch):
     if branch:
@@ -0,0 +1,94 @@
+import configparser
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from core.classes.aws.S3Handler import S3Handler
+from core.classes.FileManager import FileManager
+from core.Utils import Utils, logger
+from models.File import File
+
+
+class FileBlobReaperCrontab:
+    """
+    Removes the blobs of the content addressed storage ([FILES] content_addressed) that are not referenced
+    by any file anymore, on disk and in both S3 buckets.
+
+    A blob is only removed when it was not written or reused for the grace period: an upload of the same content
+    refreshes the blob before saving its file, so a blob is never removed between the upload and its record.
+    """
+
+    config = configparser.ConfigParser()
+    config.read(Utils.get_config_ini_file_path())
+
+    BATCH_SIZE = 500
+
+    def __init__(self):
+        self.grace_period = timedelta(hours=self.config.getfloat("FILES", "blob_grace_hours", fallback=24))
+        self.blob_path = os.path.join(self.config.get("FILES", "storage_path"), FileManager.CAS_PREFIX)
+        self.region = self.config.get("S3", "region")
+        self.buckets = [self.config.get("S3", "bucket_name"), self.config.get("S3", "public_bucket_name")]
+
+    def reap_local(self) -> int:
+        if not os.path.isdir(self.blob_path):
+            return 0
+
+        oldest = time.time() - self.grace_period.total_seconds()
+        blobs = [
+            os.path.join(self.blob_path, entry.name)
+            for entry in os.scandir(self.blob_path)
+            if entry.is_file() and entry.stat().st_mtime < oldest
+        ]
+
+        removed = 0
+        for unreferenced in self.get_unreferenced(blobs):
+            try:
+                os.remove(unreferenced)
+                removed += 1
+            except FileNotFoundError:
+                pass
+
+        return removed
+
+    def reap_s3(self, bucket_name: str) -> int:
+        handler = S3Handler(bucket_name, self.region)
+        oldest = datetime.now(timezone.utc) - self.grace_period
+        blobs = [
+            s3_object["Key"]
+            for s3_object in handler.list_objects(f"{FileManager.CAS_PREFIX}/")
+            if s3_object["LastModified"] < oldest
+        ]
+
+        removed = 0
+        for unreferenced in self.get_unreferenced(blobs):
+            if handler.delete_file(unreferenced):
+                removed += 1
+
+        return removed
+
+    def get_unreferenced(self, blobs: list) -> list:
+        """
+        Returns the blobs with no file referencing them, counting the references in batches of BATCH_SIZE.
+        """
+        unreferenced = []
+        for start in range(0, len(blobs), self.BATCH_SIZE):
+            batch = blobs[start:start + self.BATCH_SIZE]
+            referenced = File.get_referenced_objects(batch)
+            unreferenced += [blob for blob in batch if blob not in referenced]
+
+        return unreferenced
+
+    def main(self):
+        removed = self.reap_local()
+        logger.info(f"[BLOB-REAPER] {removed} local blobs removed")
+        for bucket_name in self.buckets:
+            try:
+                removed = self.reap_s3(bucket_name)
+                logger.info(f"[BLOB-REAPER] {removed} blobs removed from {bucket_name}")
+            except Exception as exc:
+                logger.error(f"[BLOB-REAPER] Error reaping {bucket_name}: {exc}")
+
+
+if __name__ == "__main__":
+    client = FileBlobReaperCrontab()
+    client.main()
@@ -1,5 +1,7 @@
 import configparser
 
+from sqlalchemy.orm import joinedload
+
 from core.classes.aws.SnsHandler import SnsHandler
 from core.classes.NotificationCronsUtils import NotificationCronsUtils, Utils
 from models.SmsPool import SmsPool, User
@@ -13,50 +15,43 @@ class SmsCrontab(NotificationCronsUtils):
     def __init__(self):
         self.client = SnsHandler(self.config.get("SNS", "region"))
 
-    def send_sms(self, query_limit: int):
-        sms_to_send = self.get_rows_to_send(SmsPool, query_limit)
+    def send_sms(self, query_limit: int, ids: list = None):
+        sms_to_send = self.claim_rows_to_send(SmsPool, query_limit, ids, options=[joinedload(SmsPool.user)])
         if not sms_to_send:
             self.nothing_to_send()
             return
 
-        errors = sum(self.send_message(sms_pool) for sms_pool in sms_to_send)
-        self.show_results(len(sms_to_send), errors)
+        sent, failed = [], []
+        for sms_pool in sms_to_send:
+            (failed if self.send_message(sms_pool) else sent).append(sms_pool)
+
+        self.finalize_rows(SmsPool, SmsSent, [self.sent_values(sms_pool) for sms_pool in sent], sent, failed)
+        self.show_results(len(sms_to_send), len(failed))
 
-    def save_to_sent(self, sms_pool: SmsPool, user: User):
-        sms = SmsSent(
-            user_id=user.id,
-            template_id=sms_pool.template_id,
-            message=sms_pool.message
-        )
-        if not sms.save():
-            print("[ERROR SAVING SENT SMS]")
+    def sent_values(self, sms_pool: SmsPool) -> dict:
+        return {
+            "user_id": sms_pool.user_id,
+            "template_id": sms_pool.template_id,
+            "message": sms_pool.message,
+        }
 
     def send_message(self, sms_pool: SmsPool) -> int:
         user: User = sms_pool.user
-        error = not Utils.check_if_valid_ten_digits_number(user.phone)
-
-        if not error:
-            sms_id = self.client.publish_text_message(user.phone, sms_pool.message)
-            if not sms_id:
-                error = True
-
-        if error:
-            self.row_with_errors(sms_pool)
+        if not Utils.check_if_valid_ten_digits_number(user.phone):
             return 1
 
-        self.save_to_sent(sms_pool, user)
-        sms_pool.delete()
-
-        return 0
-
-    def send_one_sms(self, sms_pool: SmsPool):
         try:
-            error = self.send_message(sms_pool)
-            self.show_results(1, error)
+            if not self.client.publish_text_message(user.phone, sms_pool.message):
+                return 1
         except Exception as exc:
             print(exc)
             print("Error sending sms")
-            self.row_with_errors(sms_pool)
+            return 1
+
+        return 0
+
+    def send_one_sms(self, sms_pool: SmsPool):
+        self.send_sms(1, ids=[sms_pool.id])
 
     def main(self, query_limit: int):
         self.send_sms(query_limit)
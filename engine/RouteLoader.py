@@ -1,14 +1,71 @@
 import configparser
+import inspect
+import re
 
 from falcon import App
+from falcon.constants import COMBINED_METHODS
+from falcon.routing import map_http_methods
 
 from core.Utils import Utils, logger
 
 
+# Names of the fields of a URI template, e.g. "id" of "/v1/users/{id:int}"
+_TEMPLATE_FIELD = re.compile(r"{(\w+)")
+
+
+class RouteAuth:
+    """
+    Authentication requirement of a responder, computed once when its route is added so the
+    Authenticator middleware resolves it with a dict lookup per request.
+    """
+    __slots__ = ("skip_auth", "forbidden_roles")
+
+    def __init__(self, skip_auth: bool, forbidden_roles: frozenset):
+        self.skip_auth = skip_auth
+        # Roles that can not access the resource of the responder
+        self.forbidden_roles = forbidden_roles
+
+    @staticmethod
+    def build(resource, responder, role_access: dict, fields: tuple = ()) -> "RouteAuth":
+        """
+        :param resource: The resource of the route.
+        :param responder: The responder of the method, None if the resource does not implement it.
+        :param role_access: The names of the resources each role is limited to, a role without names can access all of them.
+        :param fields: The fields of the URI template of the route.
+        """
+        skip_auth = getattr(resource, "skip_auth", False) or (
+            getattr(responder, "skip_auth", False) and RouteAuth.accepts_fields(responder, fields)
+        )
+        resource_name = resource.__class__.__name__
+        forbidden_roles = frozenset(
+            role_id for role_id, accesses in role_access.items() if accesses and resource_name not in accesses
+        )
+        return RouteAuth(bool(skip_auth), forbidden_roles)
+
+    @staticmethod
+    def accepts_fields(responder, fields: tuple) -> bool:
+        """
+        Whether *responder* can be called with the fields of the route, e.g. on_post(self, req, resp) decorated with
+        no_authorization_needed does not skip the authentication of "/v1/users/{id:int}", where falcon would call it
+        with an id it does not accept.
+        """
+        try:
+            inspect.signature(responder).bind(None, None, **dict.fromkeys(fields))
+        except TypeError:
+            return False
+        except ValueError:
+            # No signature available, keep the requirement of the resource
+            return False
+        return True
+
+
 class RouteLoader:
-    def __init__(self, server):
+    def __init__(self, server, role_access: dict = None):
         self._server: App = server
         self._registry = {}
+        self._role_access = role_access if role_access is not None else {}
+        # RouteAuth of every (uri_template, HTTP method) added
+        self.auth_routes: dict[tuple[str, str], RouteAuth] = {}
         self.config = configparser.ConfigParser()
         self.config.read(Utils.get_config_ini_file_path())
         self.context_from_config = self.config.get('ROUTES', 'context')
@@ -20,7 +77,20 @@ class RouteLoader:
             if instance is None:
                 instance = self._registry[cls] = cls()
             self._server.add_route(self.context_prefix + route, instance, suffix=suffix)
+            self.add_auth_route(self.context_prefix + route, instance, suffix)
             logger.info(f"Route: {self.context_prefix + route}, {instance.__class__.__name__}, suffix={suffix} ")
             return cls
 
         return decorator
+
+    def add_auth_route(self, uri_template: str, resource, suffix: str = None):
+        """
+        Stores the RouteAuth of every method of the route, the methods the resource does not implement
+        (answered by falcon with 405 or the default OPTIONS) get the requirement of the resource.
+        """
+        method_map = map_http_methods(resource, suffix=suffix)
+        fields = tuple(_TEMPLATE_FIELD.findall(uri_template))
+        for method in COMBINED_METHODS:
+            self.auth_routes[(uri_template, method)] = RouteAuth.build(
+                resource, method_map.get(method), self._role_access, fields
+            )
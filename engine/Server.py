@@ -1,17 +1,36 @@
+import os
+
 import falcon
 
+from core.classes.Metrics import Metrics
+from core.classes.SlowQueryLog import SlowQueryLog
 from core.classes.middleware.Authenticator import Authenticator
+from core.classes.middleware.MetricsMiddleware import MetricsMiddleware
 from core.classes.middleware.SQLAlchemySessionManager import \
     SQLAlchemySessionManager
+from core.database import engine
 from engine.RouteLoader import RouteLoader
+from engine.WarmUp import WarmUp
+from models.Role import role_access
 
 authorization_middleware = Authenticator()
 sqlalchemy_session_manager = SQLAlchemySessionManager()
 
+SlowQueryLog.get_instance().install(engine)
+
 # Create server
-server = falcon.App(cors_enable=True, middleware=[authorization_middleware, sqlalchemy_session_manager])
+middleware = [authorization_middleware, sqlalchemy_session_manager]
+if Metrics.get_instance().enabled:
+    # First, so its time includes the other middlewares
+    middleware.insert(0, MetricsMiddleware())
+server = falcon.App(cors_enable=True, middleware=middleware)
 
 # Load routes
-route_loader = RouteLoader(server)
+route_loader = RouteLoader(server, role_access)
+authorization_middleware.routes = route_loader.auth_routes
 # initialize all controllers
 from controllers import *
+
+if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+    # Lambda init phase, before the first invocation. run.py warms up before serve_forever()
+    WarmUp.run(server)
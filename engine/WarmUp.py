@@ -0,0 +1,153 @@
+import configparser
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from falcon import App, testing
+from sqlalchemy import event
+
+from core.classes.aws.AwsClientRegistry import AwsClientRegistry
+from core.classes.JWT.JWTUtils import JWTUtils
+from core.classes.LazyModule import LazyModule
+from core.classes.SmtpClient import SmtpClient
+from core.database import db_session as DB
+from core.database import engine
+from core.Utils import Utils, logger
+
+
+class WarmUp:
+    """
+    Pays the costs of the first requests before the server accepts traffic: compiles the router, opens the
+    connections of the database pool, loads the JWT keys, the lazy modules and the AWS clients, compiles the
+    jinja2 email templates and replays synthetic requests. Every step is timed and logged, a failing step is logged and the next one runs.
+
+    It runs before serve_forever() in run.py and in the init phase on Lambda, the readiness check
+    (/v1/health-check/ready) answers 503 until it completes.
+    """
+
+    _ready = threading.Event()
+
+    def __init__(self, server: App):
+        self.server = server
+        self.config = configparser.ConfigParser()
+        self.config.read(Utils.get_config_ini_file_path())
+        self.enabled = self.config.getboolean("WARMUP", "enabled", fallback=True)
+        self.db_connections = self.config.getint("WARMUP", "db_connections", fallback=5)
+        if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+            # A container serves one request at a time, more connections only multiply them by the containers
+            self.db_connections = min(self.db_connections, 1)
+        self.db_connect_timeout = self.config.getint("WARMUP", "db_connect_timeout", fallback=3)
+        self.load_modules = self.config.getboolean("WARMUP", "load_modules", fallback=True)
+        self.aws_clients = self.config.getboolean("WARMUP", "aws_clients", fallback=True)
+        self.email_templates = self.config.getboolean("WARMUP", "email_templates", fallback=True)
+        # "METHOD /path" separated by commas, e.g. "GET /v1/health-check/ping"
+        self.requests = [
+            request.split(maxsplit=1)
+            for request in self.config.get("WARMUP", "requests", fallback="").split(",")
+            if request.strip()
+        ]
+
+    @staticmethod
+    def is_ready() -> bool:
+        return WarmUp._ready.is_set()
+
+    @staticmethod
+    def run(server: App):
+        """
+        Runs the warm-up of *server* with the WARMUP section of the config file and marks the process as ready.
+        """
+        WarmUp(server).warm_up()
+
+    def warm_up(self):
+        if not self.enabled:
+            WarmUp._ready.set()
+            return
+
+        start = time.perf_counter()
+        steps = [
+            ("router", self.compile_router),
+            ("database pool", self.open_db_connections),
+            ("jwt keys", JWTUtils.load_keys),
+        ]
+        if self.load_modules:
+            steps.append(("lazy modules", lambda: ", ".join(LazyModule.load_all())))
+        if self.aws_clients:
+            steps.append(("aws clients", self.create_aws_clients))
+        if self.email_templates:
+            steps.append(("email templates", self.compile_email_templates))
+        if self.requests:
+            steps.append(("requests", self.replay_requests))
+
+        for name, step in steps:
+            self.timed(name, step)
+
+        WarmUp._ready.set()
+        logger.info(f"[WARMUP] Ready in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    @staticmethod
+    def timed(name: str, step):
+        start = time.perf_counter()
+        try:
+            result = step()
+        except Exception as exc:
+            logger.error(f"[WARMUP] {name} failed after {(time.perf_counter() - start) * 1000:.1f} ms: {exc}")
+            return
+
+        detail = f" ({result})" if result else ""
+        logger.info(f"[WARMUP] {name}: {(time.perf_counter() - start) * 1000:.1f} ms{detail}")
+
+    def compile_router(self):
+        # The router of falcon generates and compiles its code on the first lookup
+        return f"{len(self.server._router.finder_src.splitlines())} lines"
+
+    def open_db_connections(self):
+        """
+        Checks out db_connections connections at the same time, so the pool opens them, and returns them to it.
+        """
+        connections = []
+        try:
+            with self.connect_timeout():
+                for _ in range(min(self.db_connections, engine.pool.size())):
+                    connections.append(engine.connect())
+        finally:
+            for connection in connections:
+                connection.close()
+        return f"{len(connections)} connections"
+
+    @contextmanager
+    def connect_timeout(self):
+        """
+        The connections opened inside the block have a connect timeout of db_connect_timeout seconds, so an
+        unreachable database does not stall the start (or the init phase on Lambda) for the timeout of the driver.
+        """
+        event.listen(engine, "do_connect", self._set_connect_timeout)
+        try:
+            yield
+        finally:
+            event.remove(engine, "do_connect", self._set_connect_timeout)
+
+    def _set_connect_timeout(self, dialect, conn_rec, cargs, cparams):
+        if dialect.driver == "mysqlconnector":
+            cparams["connection_timeout"] = self.db_connect_timeout
+
+    def create_aws_clients(self):
+        registry = AwsClientRegistry.get_instance()
+        registry.client("s3", self.config.get("S3", "region", fallback=None), self.config.get("S3", "profile_name", fallback=None))
+        registry.client("sns", self.config.get("SNS", "region", fallback=None))
+        return "s3, sns"
+
+    def compile_email_templates(self):
+        try:
+            with self.connect_timeout():
+                return f"{SmtpClient.compile_templates()} templates"
+        finally:
+            DB.remove()
+
+    def replay_requests(self):
+        client = testing.TestClient(self.server)
+        statuses = []
+        for method, path in self.requests:
+            result = client.simulate_request(method.upper(), path.strip())
+            statuses.append(f"{method.upper()} {path.strip()} {result.status_code}")
+        return ", ".join(statuses)
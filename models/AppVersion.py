@@ -3,7 +3,7 @@ from core.Model import *
 
 class AppVersion(Base, Model):
     __tablename__ = "app_version"
-    __autoload_with__ = engine
+    cache_ttl = 300
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     version: Mapped[float] = mapped_column(Float, nullable=False)
@@ -15,4 +15,7 @@ class AppVersion(Base, Model):
 
     @staticmethod
     def get_actual_version_class():
-        return AppVersion.get(AppVersion.max("id"))
+        return AppVersion.cached(
+            "actual_version",
+            lambda session, options: AppVersion.get(AppVersion.max("id", session=session), options=options, session=session),
+        )
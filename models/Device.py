@@ -5,7 +5,6 @@ from models.User import User
 
 class Device(Base, Model):
     __tablename__ = "device"
-    __autoload_with__ = engine
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     uuid: Mapped[str]
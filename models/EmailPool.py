@@ -5,7 +5,6 @@ from models.Status import Status
 
 class EmailPool(Base, Model):
     __tablename__ = "email_pool"
-    __autoload_with__ = engine
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     email: Mapped[str]
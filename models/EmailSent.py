@@ -4,7 +4,6 @@ from models.EmailTemplate import EmailTemplate
 
 class EmailSent(Base, Model):
     __tablename__ = "email_sent"
-    __autoload_with__ = engine
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     email: Mapped[str]
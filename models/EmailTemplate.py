@@ -8,7 +8,7 @@ class EmailTemplate(Base, Model):
     ERROR = 3  # flow, title, description, date, procedure
 
     __tablename__ = "email_template"
-    __autoload_with__ = engine
+    cache_ttl = 300
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     name: Mapped[str]
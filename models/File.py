@@ -4,7 +4,6 @@ from models.User import User
 
 class File(Base, Model):
     __tablename__ = "file"
-    __autoload_with__ = engine
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     object: Mapped[str]
@@ -16,12 +15,23 @@ class File(Base, Model):
     url: Mapped[Optional[str]]  # If a file has an url means that the file is publicly available
     is_private: Mapped[bool] = mapped_column(default=False)  # If private only the user_who_uploaded and admin can get the file
     user_who_uploaded_id: Mapped[int] = mapped_column(ForeignKey(User.id))
+    thumbnail_id: Mapped[Optional[int]] = mapped_column(BigInteger, ForeignKey("file.id"))  # Set when the thumbnail of an image is ready
     created: Mapped[datetime] = mapped_column(default=func.now())
     updated: Mapped[datetime] = mapped_column(default=func.now(), onupdate=func.now())
     enable: Mapped[bool] = mapped_column(default=True)
 
     user_who_uploaded: Mapped[User] = relationship(User)
 
+    @staticmethod
+    def get_referenced_objects(objects: list) -> set:
+        """
+        Returns which of *objects* (paths or keys) are still referenced by a file, i.e. their reference count is not 0.
+        """
+        if not objects:
+            return set()
+
+        return set(File.get_all(filter=File.object.in_(objects), attributes=[File.object]))
+
     def delete_file_from_s3(self, req, resp):
         logger.info(f"Borrando file: {self.id} del s3")
         from controllers import files3Controller
@@ -6,7 +6,6 @@ from models.User import User
 
 class PushNotificationPool(Base, Model):
     __tablename__ = "push_notification_pool"
-    __autoload_with__ = engine
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey(User.id), default=None)
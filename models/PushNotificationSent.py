@@ -6,7 +6,6 @@ from models.User import User
 
 class PushNotificationSent(Base, Model):
     __tablename__ = "push_notification_sent"
-    __autoload_with__ = engine
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey(User.id))
@@ -6,7 +6,7 @@ class PushNotificationTemplate(Base, Model):
     # Templates                                  #Data
 
     __tablename__ = "push_notification_template"
-    __autoload_with__ = engine
+    cache_ttl = 300
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     name: Mapped[str]
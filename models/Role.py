@@ -8,7 +8,7 @@ class Role(Base, Model):
     IMAGES = 3
 
     __tablename__ = "role"
-    __autoload_with__ = engine
+    cache_ttl = 300
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     name: Mapped[str]
@@ -6,7 +6,6 @@ from models.User import User
 
 class SmsPool(Base, Model):
     __tablename__ = "sms_pool"
-    __autoload_with__ = engine
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey(User.id), nullable=False)
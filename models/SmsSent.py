@@ -5,7 +5,6 @@ from models.User import User
 
 class SmsSent(Base, Model):
     __tablename__ = "sms_sent"
-    __autoload_with__ = engine
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey(User.id))
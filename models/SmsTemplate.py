@@ -6,7 +6,7 @@ class SmsTemplate(Base, Model):
     OTP = 1  # {{otp}}
 
     __tablename__ = "sms_template"
-    __autoload_with__ = engine
+    cache_ttl = 300
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     name: Mapped[str]
@@ -16,7 +16,7 @@ class Status(Base, Model):
     VERIFIED = 9
 
     __tablename__ = "status"
-    __autoload_with__ = engine
+    cache_ttl = 300
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     description: Mapped[str]
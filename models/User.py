@@ -11,7 +11,6 @@ class PasswordType(String):
 
 class User(Base, Model):
     __tablename__ = "user"
-    __autoload_with__ = engine
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     username: Mapped[str]
@@ -38,6 +37,14 @@ class User(Base, Model):
 
     attributes_blacklist = {"salt"}
 
+    # Backed by the user_email_idx, user_username_idx and user_name_ft_idx indexes
+    filter_strategies = {
+        "email": ("exact", "prefix"),
+        "username": ("prefix", "exact"),
+        "phone": ("exact", "prefix"),
+    }
+    search_fields = {"name": ("first_name", "last_name")}
+
     def __repr__(self):
         return f"{self.username}, {self.email}"
 
@@ -6,7 +6,6 @@ from models.User import User
 
 class UserVerification(Base, Model):
     __tablename__ = "user_verification"
-    __autoload_with__ = engine
 
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey(User.id), primary_key=True, nullable=False)
     curp: Mapped[Optional[str]]
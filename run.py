@@ -1,7 +1,14 @@
+import signal
+
+import gevent
 from gevent.pywsgi import WSGIServer
 
+from core.classes.BackgroundDispatcher import BackgroundDispatcher
+from core.classes.FileResponse import FileWrapper
+from core.classes.SchemaCheck import SchemaCheck
 from core.Utils import logger
 from engine.Server import server
+from engine.WarmUp import WarmUp
 
 
 def _force_https(app):
@@ -12,6 +19,17 @@ def _force_https(app):
     return wrapper
 
 
-http_server = WSGIServer(("0.0.0.0", 3000), _force_https(server))
-logger.info("Server started on port 3000")
-http_server.serve_forever()
+if __name__ == "__main__":
+    # Guarded so the processes of the ImageProcessor pool, started with spawn, can import this module
+    http_server = WSGIServer(("0.0.0.0", 3000), FileWrapper.middleware(_force_https(server)))
+    # Stop accepting requests on SIGTERM, so the background jobs are drained below
+    gevent.signal_handler(signal.SIGTERM, http_server.stop)
+    WarmUp.run(server)
+    logger.info("Server started on port 3000")
+    if SchemaCheck.is_enabled():
+        # The models are not reflected, their tables are checked against the database without delaying the startup
+        BackgroundDispatcher.get_instance().submit(SchemaCheck.run)
+    try:
+        http_server.serve_forever()
+    finally:
+        BackgroundDispatcher.get_instance().shutdown()
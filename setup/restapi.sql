@@ -113,6 +113,10 @@ CREATE TABLE `user` (
   `birthday` date DEFAULT NULL,
   PRIMARY KEY (`id`),
   KEY `fk_user_role_id_idx` (`role_id`),
+  KEY `user_email_idx` (`email`),
+  KEY `user_username_idx` (`username`),
+  KEY `user_phone_idx` (`phone`),
+  FULLTEXT KEY `user_name_ft_idx` (`first_name`,`last_name`),
   CONSTRAINT `fk_user_role_id` FOREIGN KEY (`role_id`) REFERENCES `role` (`id`) ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB AUTO_INCREMENT=44 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -279,8 +283,12 @@ CREATE TABLE `file` (
   `created` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
   `updated` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
   `enable` tinyint(1) NOT NULL DEFAULT '1',
+  `thumbnail_id` bigint DEFAULT NULL,
   PRIMARY KEY (`id`),
   KEY `fk_file_user_who_uploaded_idx` (`user_who_uploaded_id`),
+  KEY `fk_file_thumbnail_id_idx` (`thumbnail_id`),
+  KEY `file_object_idx` (`object`),
+  CONSTRAINT `fk_file_thumbnail_id` FOREIGN KEY (`thumbnail_id`) REFERENCES `file` (`id`) ON DELETE SET NULL ON UPDATE CASCADE,
   CONSTRAINT `fk_file_user_who_uploaded` FOREIGN KEY (`user_who_uploaded_id`) REFERENCES `user` (`id`) ON UPDATE CASCADE
 ) ENGINE=InnoDB AUTO_INCREMENT=4 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -291,7 +299,7 @@ CREATE TABLE `file` (
 
 LOCK TABLES `file` WRITE;
 /*!40000 ALTER TABLE `file` DISABLE KEYS */;
-INSERT INTO `file` VALUES (1,'./files\\af87925edc86fdbaecb33346e6d2437cc9aab8e57dced701e1238c8693ae01eb',377207,'image/png','sure_steam.png','af87925edc86fdbaecb33346e6d2437cc9aab8e57dced701e1238c8693ae01eb',0,NULL,0,1,'2023-07-03 03:38:19','2023-07-03 03:38:19',1),(2,'./files\\e987a74e2828cb98268e43aff69ffbe797e24c4b83c85ba6e651a337e9e0c525',147326,'image/jpeg','WIN_20221022_16_58_06_Pro.jpg','e987a74e2828cb98268e43aff69ffbe797e24c4b83c85ba6e651a337e9e0c525',0,NULL,0,1,'2023-07-03 17:52:52','2023-07-03 17:52:52',1),(3,'./files\\0b8e97acf66ed47d770f9b9ec3c62fa5b13fbc61cd9c74686d09fa34e5d35821',5285038,'image/png','ScreenShot-2022-6-10_23-30-57.png','0b8e97acf66ed47d770f9b9ec3c62fa5b13fbc61cd9c74686d09fa34e5d35821',0,NULL,1,1,'2023-07-03 18:36:13','2023-07-03 18:36:13',1);
+INSERT INTO `file` VALUES (1,'./files\\af87925edc86fdbaecb33346e6d2437cc9aab8e57dced701e1238c8693ae01eb',377207,'image/png','sure_steam.png','af87925edc86fdbaecb33346e6d2437cc9aab8e57dced701e1238c8693ae01eb',0,NULL,0,1,'2023-07-03 03:38:19','2023-07-03 03:38:19',1,NULL),(2,'./files\\e987a74e2828cb98268e43aff69ffbe797e24c4b83c85ba6e651a337e9e0c525',147326,'image/jpeg','WIN_20221022_16_58_06_Pro.jpg','e987a74e2828cb98268e43aff69ffbe797e24c4b83c85ba6e651a337e9e0c525',0,NULL,0,1,'2023-07-03 17:52:52','2023-07-03 17:52:52',1,NULL),(3,'./files\\0b8e97acf66ed47d770f9b9ec3c62fa5b13fbc61cd9c74686d09fa34e5d35821',5285038,'image/png','ScreenShot-2022-6-10_23-30-57.png','0b8e97acf66ed47d770f9b9ec3c62fa5b13fbc61cd9c74686d09fa34e5d35821',0,NULL,1,1,'2023-07-03 18:36:13','2023-07-03 18:36:13',1,NULL);
 /*!40000 ALTER TABLE `file` ENABLE KEYS */;
 UNLOCK TABLES;
 
@@ -595,3 +603,16 @@ INSERT INTO `user_verification` VALUES (1,NULL,5,NULL,5,NULL,'2024-09-16 20:56:3
 /*!40000 ALTER TABLE `user_verification` ENABLE KEYS */;
 UNLOCK TABLES;
 
+--
+-- Table structure for table `cache_version`
+--
+
+DROP TABLE IF EXISTS `cache_version`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `cache_version` (
+  `name` varchar(64) NOT NULL,
+  `version` bigint NOT NULL DEFAULT '0',
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;